@@ -2,20 +2,135 @@
 # Single-file Pygame cybersecurity game: 10 enhanced levels, auto-progress, overall win/lose.
 # Requires: pygame  (pip install pygame)
 
+import time
+START_TIME = time.perf_counter()
+
 import pygame
 import sys
 import random
-import time
+import os
 import re
+import json
+import argparse
+import tracemalloc
+import struct
+import mmap
+import stat
+import hashlib
+import math
+import tempfile
+import atexit
+import weakref
+import getpass
+import base64
+from array import array
+from collections import OrderedDict, namedtuple
+from itertools import repeat, zip_longest
+from contextlib import contextmanager
 
 # =========================
 # Setup
 # =========================
-pygame.init()
+# Nothing is initialized at import: init_display() brings up only the display and
+# font subsystems (no audio/joystick), and fonts load on first use. Headless tools
+# (bot simulation) never touch SDL at all.
+#
+# Everything is laid out and drawn at the fixed WIDTH x HEIGHT logical size, and SDL
+# scales the finished frame to the window: pygame.SCALED on the surface backend, the
+# renderer's logical size on the texture backend. Either way the frame is drawn
+# and uploaded at 1000x720 whatever the display, and mouse events arrive already
+# mapped to logical coordinates, so hit tests need no changes. The window opens at
+# the largest whole multiple of the logical size that fits the desktop (at 1x the
+# surface backend skips SCALED and flips as before); --fullscreen
+# (CYBERQUIZ_FULLSCREEN=1) fills wall displays, letterboxed. The upscale is flat in
+# cost on an accelerated renderer; SDL's software renderer pays per output pixel.
 WIDTH, HEIGHT = 1000, 720
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Cybersecurity Awareness – Full Game (Enhanced, Auto Progress)")
+CAPTION = "Cybersecurity Awareness – Full Game (Enhanced, Auto Progress)"
 CLOCK = pygame.time.Clock()
+screen = None
+
+# Where launch time goes: phases are reported once the first frame is on screen
+# (--startup-report or CYBERQUIZ_STARTUP_REPORT=1).
+class StartupTimer:
+    def __init__(self, t0, enabled=False):
+        self.t0 = t0
+        self.enabled = enabled
+        self.phases = []
+        self.done = False
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if not self.done:
+                self.phases.append((name, start - self.t0, time.perf_counter() - start))
+
+    # Renderer observer hooks: the first presented frame ends startup.
+    def begin_frame(self):
+        pass
+
+    def end_frame(self):
+        if self.done:
+            return
+        self.done = True
+        total = time.perf_counter() - self.t0
+        if self.enabled:
+            print(self.report(total))
+
+    def report(self, total):
+        lines = ["Startup (ms):"]
+        for name, at, dur in self.phases:
+            lines.append(f"  {name:28} {dur * 1000:8.1f}   (at {at * 1000:7.1f})")
+        other = total - sum(dur for _, _, dur in self.phases)
+        lines.append(f"  {'other (python, menu setup)':28} {other * 1000:8.1f}")
+        lines.append(f"  {'first frame presented':28} {total * 1000:8.1f}")
+        return "\n".join(lines)
+
+STARTUP = StartupTimer(START_TIME, enabled=os.environ.get("CYBERQUIZ_STARTUP_REPORT", "0") == "1")
+STARTUP.phases.append(("import pygame", 0.0, time.perf_counter() - START_TIME))
+
+def init_display(backend=None, fullscreen=None, window_size=None):
+    global screen
+    if screen is None:
+        backend = backend or os.environ.get("CYBERQUIZ_BACKEND", "surface")
+        if fullscreen is None:
+            fullscreen = os.environ.get("CYBERQUIZ_FULLSCREEN", "0") == "1"
+        with STARTUP.phase("display init"):
+            pygame.display.init()
+        with STARTUP.phase("font init"):
+            pygame.font.init()
+        with STARTUP.phase("open window"):
+            if backend == "texture":
+                screen = open_texture_window(fullscreen, window_size)
+            if screen is None:
+                screen = open_surface_window(fullscreen, window_size or scaled_window_size())
+                pygame.display.set_caption(CAPTION)
+    return screen
+
+def open_surface_window(fullscreen, size):
+    if not fullscreen and size == (WIDTH, HEIGHT):
+        # Unscaled: flip the window surface directly, skipping SCALED's texture upload.
+        return pygame.display.set_mode((WIDTH, HEIGHT))
+    surf = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED | (pygame.FULLSCREEN if fullscreen else 0))
+    # A SCALED flip uploads and scales the whole frame; with dirty rects on, frames
+    # where nothing changed skip it. An explicit CYBERQUIZ_DIRTY_RECTS still wins.
+    if "CYBERQUIZ_DIRTY_RECTS" not in os.environ:
+        RENDERER.set_enabled(True)
+    if not fullscreen:
+        from pygame._sdl2.video import Window
+        Window.from_display_module().size = size
+    return surf
+
+def scaled_window_size():
+    # Largest whole multiple of the logical size within 90% of the desktop.
+    sizes = pygame.display.get_desktop_sizes()
+    if not sizes:
+        return WIDTH, HEIGHT
+    dw, dh = sizes[0]
+    k = max(1, min(dw * 9 // 10 // WIDTH, dh * 9 // 10 // HEIGHT))
+    return WIDTH * k, HEIGHT * k
 
 # Colors
 WHITE = (255, 255, 255)
@@ -28,65 +143,807 @@ YELLOW = (235, 180, 0)
 RED = (220, 0, 0)
 ORANGE = (255, 120, 0)
 PURPLE = (140, 70, 180)
+SELECTED_GREEN = (160, 235, 160)
 
 # Fonts
-FONT = pygame.font.SysFont(None, 26)
-FONT_SM = pygame.font.SysFont(None, 22)
-FONT_LG = pygame.font.SysFont(None, 32)
-FONT_XL = pygame.font.SysFont(None, 44)
+# SysFont() scans the installed system fonts before it can answer, even for the
+# default font. The game uses pygame's bundled font unless CYBERQUIZ_FONT names
+# a font file or a system font; a system font name is resolved once and the path
+# persisted in FONT_PATH_CACHE so later launches skip the scan.
+FONT_PATH_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "cyberquiz", "fonts.json")
+_font_path = False
+
+def resolve_font_path():
+    global _font_path
+    if _font_path is not False:
+        return _font_path
+    name = os.environ.get("CYBERQUIZ_FONT", "")
+    path = None
+    if os.path.isfile(name):
+        path = name
+    elif name:
+        try:
+            with open(FONT_PATH_CACHE, encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        path = cache.get(name)
+        if not path or not os.path.isfile(path):
+            with STARTUP.phase("system font lookup"):
+                path = pygame.font.match_font(name)
+            cache[name] = path
+            try:
+                os.makedirs(os.path.dirname(FONT_PATH_CACHE), exist_ok=True)
+                with open(FONT_PATH_CACHE, "w", encoding="utf-8") as f:
+                    json.dump(cache, f)
+            except OSError:
+                pass
+    _font_path = path
+    return path
+
+class LazyFont:
+    # Stands in for pygame.font.Font; the real font is created on first use.
+    def __init__(self, size_px):
+        self.size_px = size_px
+        self.font = None
+
+    def load(self):
+        if self.font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            with STARTUP.phase(f"load font {self.size_px}px"):
+                self.font = pygame.font.Font(resolve_font_path(), self.size_px)
+        return self.font
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+FONT = LazyFont(26)
+FONT_SM = LazyFont(22)
+FONT_LG = LazyFont(32)
+FONT_XL = LazyFont(44)
+
+# =========================
+# Text render cache
+# =========================
+# Font.render rasterizes the glyphs on every call. Almost everything on screen is
+# static text redrawn every frame, so rendered surfaces are kept in a bounded LRU
+# keyed by (font, text, antialias, color). Surfaces are shared: blit them, never draw on them.
+class TextCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, color):
+        key = (font, text, antialias, tuple(color))
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        self.entries[key] = surf
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surf
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+TEXT_CACHE = TextCache()
+
+def render_text(font, text, antialias, color):
+    return TEXT_CACHE.render(font, text, antialias, color)
+
+# =========================
+# Frame presentation (dirty rectangles)
+# =========================
+# Every loop redraws the whole back buffer, but usually only a highlight or a timer
+# digit differs from the previous frame. Each draw on the screen is recorded as
+# (rect, key); present() diffs that list against the previous frame and pushes only
+# the regions that changed with display.update(rects). Disabled, it is a plain flip().
+class DirtyRectRenderer:
+    def __init__(self, enabled=False, full_flip_ratio=0.6):
+        self.enabled = enabled
+        self.full_flip_ratio = full_flip_ratio
+        # A TextureBackend when frames are composed by an SDL2 renderer.
+        self.backend = None
+        self.ops = []
+        self.prev_ops = set()
+        self.force_full = True
+        self.frames = 0
+        self.draw_calls = 0
+        self.pixels_last_frame = 0
+        self.pixels_total = 0
+        # Objects with begin_frame()/end_frame() methods, e.g. the benchmark recorder.
+        self.observers = []
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.ops = []
+        self.prev_ops = set()
+        self.force_full = True
+
+    def track(self, rect, key):
+        if self.enabled:
+            self.ops.append((tuple(rect), key))
+
+    def begin_frame(self, surf, background):
+        # background is a fill color or a prerendered static layer.
+        for obs in self.observers:
+            obs.begin_frame()
+        self.ops = []
+        if self.backend is not None:
+            self.draw_calls += 1
+            self.backend.begin_frame(background)
+        elif isinstance(background, pygame.Surface):
+            self.draw_calls += 1
+            surf.blit(background, (0, 0))
+            self.track(surf.get_rect(), ("layer", background))
+        else:
+            surf.fill(background)
+            self.track(surf.get_rect(), ("fill", tuple(background)))
+
+    def dirty_rects(self):
+        ops = set(self.ops)
+        changed = ops.symmetric_difference(self.prev_ops)
+        self.prev_ops = ops
+        bounds = screen.get_rect()
+        rects = []
+        for r, _ in changed:
+            r = bounds.clip(pygame.Rect(r))
+            if r.width and r.height:
+                rects.append(r)
+        return rects
+
+    def present(self):
+        self.frames += 1
+        PROFILER.before_present(screen)
+        full = WIDTH * HEIGHT
+        with PROFILER.span("flip"):
+            if self.backend is not None:
+                pushed = full if self.backend.present(self.force_full or window_exposed()) else 0
+                self.force_full = False
+            elif not self.enabled:
+                pygame.display.flip()
+                pushed = full
+            else:
+                rects = self.dirty_rects()
+                pushed = sum(r.width * r.height for r in rects)
+                if self.force_full or pushed >= full * self.full_flip_ratio or window_exposed():
+                    self.force_full = False
+                    pygame.display.flip()
+                    pushed = full
+                elif rects:
+                    pygame.display.update(rects)
+        self.pixels_last_frame = pushed
+        self.pixels_total += pushed
+        for obs in self.observers:
+            obs.end_frame()
+
+RENDERER = DirtyRectRenderer(enabled=os.environ.get("CYBERQUIZ_DIRTY_RECTS", "0") == "1")
+
+def window_exposed():
+    expose = getattr(pygame, "WINDOWEXPOSED", pygame.VIDEOEXPOSE)
+    return pygame.event.peek(expose)
+
+def begin_frame(background):
+    RENDERER.begin_frame(screen, background)
+
+def present():
+    RENDERER.present()
+
+def blit(dst, src, pos):
+    RENDERER.draw_calls += 1
+    if dst is screen and RENDERER.backend is not None:
+        return RENDERER.backend.blit(src, pos)
+    r = dst.blit(src, pos)
+    if dst is screen:
+        RENDERER.track(r, src)
+    return r
+
+def draw_rect(dst, color, rect, width=0, border_radius=0):
+    if dst is screen and RENDERER.backend is not None:
+        # The renderer needs a surface to upload: draw it as a cached sprite.
+        rect = pygame.Rect(rect)
+        if not rect.width or not rect.height:
+            return rect
+        return draw_box(dst, rect, None if width else color, color if width else None, border_radius, width)
+    RENDERER.draw_calls += 1
+    r = pygame.draw.rect(dst, color, rect, width, border_radius=border_radius)
+    if dst is screen:
+        RENDERER.track(r, ("rect", tuple(color), width, border_radius))
+    return r
+
+# =========================
+# Texture backend (SDL2 renderer)
+# =========================
+# With --backend texture (or CYBERQUIZ_BACKEND=texture) frames are composed by an
+# SDL2 Renderer from pygame._sdl2.video instead of CPU blits into the window
+# surface. The drawing code is unchanged: it still targets `screen`, which is then
+# an off-screen surface that only identifies the frame. Blits onto it are recorded
+# as (texture, position) and replayed by the renderer in present(). Every source
+# surface (cached text, widget sprites, static layers) is uploaded once and its
+# texture lives as long as the surface does. Without pygame._sdl2 or a usable
+# renderer the game falls back to the surface path. SDL_RENDER_DRIVER=software
+# picks the software renderer, so both backends can be benchmarked on a box
+# without a GPU.
+class TextureBackend:
+    def __init__(self, window, renderer, texture_cls):
+        self.window = window
+        self.renderer = renderer
+        self.texture_cls = texture_cls
+        self.textures = weakref.WeakKeyDictionary()
+        self.ops = []
+        self.prev_ops = None
+        self.clear_color = pygame.Color(WHITE)
+        self.uploads = 0
+
+    def texture(self, surf):
+        tex = self.textures.get(surf)
+        if tex is None:
+            tex = self.texture_cls.from_surface(self.renderer, surf)
+            self.textures[surf] = tex
+            self.uploads += 1
+        return tex
+
+    def begin_frame(self, background):
+        self.ops = []
+        if isinstance(background, pygame.Surface):
+            self.ops.append((self.texture(background), (0, 0)))
+        else:
+            self.clear_color = pygame.Color(background)
+
+    def blit(self, src, pos):
+        w, h = src.get_size()
+        if w and h:
+            self.ops.append((self.texture(src), (pos[0], pos[1])))
+        return pygame.Rect(pos[0], pos[1], w, h)
+
+    def present(self, force=False):
+        # A frame identical to the last one is not presented again: the window keeps
+        # showing it, and an idle frame costs nothing however large the display is.
+        if not force and self.ops == self.prev_ops:
+            return False
+        self.prev_ops = self.ops
+        self.renderer.draw_color = self.clear_color
+        self.renderer.clear()
+        for tex, pos in self.ops:
+            tex.draw(dstrect=pos)
+        self.renderer.present()
+        return True
+
+def open_texture_window(fullscreen=False, window_size=None):
+    # Returns the off-screen target for the texture backend, or None to fall back.
+    try:
+        from pygame._sdl2.video import Renderer, Texture, Window
+    except ImportError:
+        print("Texture backend needs pygame._sdl2 (pygame 2); using the surface backend.", file=sys.stderr)
+        return None
+    window = None
+    try:
+        window = Window(CAPTION, window_size or scaled_window_size(), resizable=True, fullscreen_desktop=fullscreen)
+        renderer = Renderer(window)
+        renderer.logical_size = (WIDTH, HEIGHT)
+    except pygame.error as exc:
+        if window is not None:
+            window.destroy()
+        print(f"No SDL renderer ({exc}); using the surface backend.", file=sys.stderr)
+        return None
+    RENDERER.backend = TextureBackend(window, renderer, Texture)
+    return pygame.Surface((WIDTH, HEIGHT))
+
+# =========================
+# Widget background sprites
+# =========================
+# Options, buttons, toggles and input boxes are rounded rectangles drawn as a fill
+# plus an outline, and rasterizing the corners costs more than copying pixels. Each
+# (size, fill, outline, radius) is drawn once into a colorkeyed surface and blitted
+# after that; an RLE colorkey blit of a full-width option row is about 4x cheaper than
+# the two draw.rect calls. Sprites not used by the last two layouts (static layers
+# built) are dropped when a new one is laid out.
+class BoxSprites:
+    def __init__(self, keep_layouts=2):
+        self.keep_layouts = keep_layouts
+        self.entries = {}
+        self.layout = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0  # draw.rect calls replaced by a sprite blit
+
+    def new_layout(self):
+        self.layout += 1
+        cutoff = self.layout - self.keep_layouts
+        for key in [k for k, e in self.entries.items() if e[1] < cutoff]:
+            del self.entries[key]
+
+    def get(self, size, fill, border, width, radius):
+        key = (size, fill, border, width, radius)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.saved += (fill is not None) + (border is not None)
+            entry[1] = self.layout
+            return entry[0]
+        self.misses += 1
+        used = {fill, border}
+        colorkey = next(c for c in ((255, 0, 255), (0, 255, 255), (255, 255, 0)) if c not in used)
+        surf = pygame.Surface(size)
+        surf.fill(colorkey)
+        rect = surf.get_rect()
+        if fill is not None:
+            pygame.draw.rect(surf, fill, rect, border_radius=radius)
+        if border is not None:
+            pygame.draw.rect(surf, border, rect, width, border_radius=radius)
+        if screen is not None:
+            surf = surf.convert(screen)
+        surf.set_colorkey(colorkey, pygame.RLEACCEL)
+        self.entries[key] = [surf, self.layout]
+        return surf
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0
+
+SPRITES = BoxSprites()
+
+def draw_box(dst, rect, fill, border=BLACK, radius=6, width=2):
+    # A rounded rectangle with an optional fill and outline, from the sprite cache.
+    rect = pygame.Rect(rect)
+    fill = tuple(fill) if fill is not None else None
+    border = tuple(border) if border is not None else None
+    return blit(dst, SPRITES.get(rect.size, fill, border, width, radius), rect.topleft)
+
+# =========================
+# Static layers
+# =========================
+# Most of a screen (title, scenario text, the option list in its unselected look)
+# only changes with the scenario. Each screen draws that part once into an
+# off-screen surface keyed by its scenario, and a frame is then one blit of the
+# layer plus the few dynamic widgets (selection highlights, timers, input text).
+# A layer's draw function may return data (e.g. the option rects it laid out),
+# which is cached with the surface.
+class LayerCache:
+    def __init__(self, max_layers=6):
+        self.max_layers = max_layers
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, draw, color=WHITE):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        SPRITES.new_layout()
+        surf = pygame.Surface((WIDTH, HEIGHT))
+        if screen is not None:
+            surf = surf.convert(screen)
+        surf.fill(color)
+        with PROFILER.span("static layer"):
+            entry = (surf, draw(surf))
+        self.entries[key] = entry
+        if len(self.entries) > self.max_layers:
+            self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+LAYERS = LayerCache()
+
+def begin_layer(key, draw, color=WHITE):
+    # Starts a frame from the static layer for key; returns the layer's data.
+    surf, data = LAYERS.get(key, draw, color)
+    begin_frame(surf)
+    return data
+
+# =========================
+# Event scheduling (idle waits)
+# =========================
+# The screens only change in response to input, so instead of polling at 60 fps the
+# loop sleeps in pygame.event.wait() until something arrives. Timed levels start a
+# COUNTDOWN_EVENT timer while their clock runs, armed for the moment the displayed
+# second changes, which wakes the loop to redraw it.
+COUNTDOWN_EVENT = pygame.USEREVENT + 1
+# Window events after which the whole frame must be presented again.
+WINDOW_REDRAW_EVENTS = {getattr(pygame, name) for name in ("WINDOWEXPOSED", "WINDOWSIZECHANGED", "WINDOWRESTORED")
+                        if hasattr(pygame, name)}
+
+# Timed levels count down on LEVEL_CLOCK rather than time.time(): it is monotonic,
+# so NTP steps and wall-clock changes neither eat into nor extend a countdown. With
+# CYBERQUIZ_VIRTUAL_CLOCK=1 it only moves through advance(), so headless runs and
+# tests can expire a timer at once instead of waiting it out; the interactive
+# frontends switch back to the real clock.
+class LevelClock:
+    def __init__(self, virtual=False):
+        self.virtual = virtual
+        self.offset = 0.0
+
+    def now(self):
+        return self.offset if self.virtual else time.monotonic() + self.offset
+
+    def advance(self, seconds):
+        # Fast-forward; on the real clock too.
+        self.offset += seconds
+
+    def countdown(self, seconds):
+        return Countdown(self, seconds)
+
+class Countdown:
+    def __init__(self, clock, seconds):
+        self.clock = clock
+        self.deadline = clock.now() + seconds
+
+    def remaining(self):
+        return max(0.0, self.deadline - self.clock.now())
+
+    def left(self):
+        # Whole seconds, for display only (rounded up, so 0 shows exactly at expiry).
+        # Every frontend times out on expired().
+        return math.ceil(self.remaining())
+
+    def expired(self):
+        return self.remaining() == 0.0
+
+    def until_change(self):
+        # Seconds until left() drops to the next whole second.
+        r = self.remaining()
+        return (r - int(r)) or 1.0
+
+LEVEL_CLOCK = LevelClock(virtual=os.environ.get("CYBERQUIZ_VIRTUAL_CLOCK", "0") == "1")
+
+def real_level_clock():
+    # Nothing advances the virtual clock during play, so timed levels would never run out.
+    if LEVEL_CLOCK.virtual:
+        print("CYBERQUIZ_VIRTUAL_CLOCK only applies to tests, --benchmark and --simulate; using the real clock.", file=sys.stderr)
+        LEVEL_CLOCK.virtual = False
+
+class ScriptFinished(Exception):
+    pass
+
+class EventScheduler:
+    def __init__(self, idle_wait=True, fps=60):
+        self.idle_wait = idle_wait
+        self.countdown = None
+        self.wakeups = 0
+        self.fps = fps
+        # An iterator of event lists replaces the real queue for synthetic runs;
+        # ScriptFinished unwinds the running loop once it is exhausted.
+        self.script = None
+
+    def poll(self):
+        if self.script is not None:
+            events = next(self.script, None)
+            if events is None:
+                raise ScriptFinished()
+            return PROFILER.filter_events(events)
+        events = pygame.event.get()
+        if not events and self.idle_wait:
+            with PROFILER.span("idle"):
+                ev = pygame.event.wait()
+            self.wakeups += 1
+            if ev.type != pygame.NOEVENT:
+                events.append(ev)
+            events.extend(pygame.event.get())
+        for ev in events:
+            if ev.type == COUNTDOWN_EVENT and self.countdown is not None:
+                self.arm_countdown()
+            elif ev.type in WINDOW_REDRAW_EVENTS:
+                RENDERER.force_full = True
+        return PROFILER.filter_events(events)
+
+    def start_countdown(self, countdown):
+        self.countdown = countdown
+        self.arm_countdown()
+
+    def arm_countdown(self):
+        # One shot per displayed second instead of a fixed-rate timer.
+        pygame.time.set_timer(COUNTDOWN_EVENT, int(self.countdown.until_change() * 1000) + 1, 1)
+
+    def stop_countdown(self):
+        pygame.time.set_timer(COUNTDOWN_EVENT, 0)
+        self.countdown = None
+
+    def tick(self):
+        # fps=0 leaves the loops uncapped (benchmarks).
+        PROFILER.events_done()
+        with PROFILER.span("tick"):
+            return CLOCK.tick(self.fps)
+
+SCHEDULER = EventScheduler(idle_wait=os.environ.get("CYBERQUIZ_IDLE_WAIT", "1") == "1")
+
+def poll_events():
+    return SCHEDULER.poll()
+
+# =========================
+# Profiling (overlay and trace)
+# =========================
+# F3 toggles an on-screen overlay with frame time, FPS, events handled, draw calls,
+# Font.render calls and cache hit rates for the current screen. With --trace PATH
+# (or CYBERQUIZ_TRACE=PATH) every frame is also recorded as Chrome trace events
+# (events, layout, draw, flip, idle, tick spans inside per-screen spans) and written
+# on exit; open the file in chrome://tracing or Perfetto.
+class Profiler:
+    def __init__(self, max_trace_events=500000):
+        self.overlay = False
+        self.trace_path = None
+        self.trace_events = []
+        self.max_trace_events = max_trace_events
+        self.t_origin = time.perf_counter()
+        self.scopes = []
+        self.frame_start = None
+        self.events_start = None
+        self.last_present = None
+        self.frame_ms = 0.0
+        self.fps = 0.0
+        self.events_frame = 0
+        self.events_last_frame = 0
+        self.draw_calls0 = 0
+        self.renders0 = 0
+        self.draws_last_frame = 0
+        self.renders_last_frame = 0
+
+    def enable_trace(self, path):
+        if self.trace_path is None:
+            atexit.register(self.write_trace)
+        self.trace_path = path
+
+    def now_us(self):
+        return (time.perf_counter() - self.t_origin) * 1e6
+
+    def emit(self, name, start_us, end_us, cat="frame"):
+        if len(self.trace_events) < self.max_trace_events:
+            self.trace_events.append({"name": name, "cat": cat, "ph": "X", "ts": round(start_us, 1),
+                                      "dur": round(end_us - start_us, 1), "pid": 1, "tid": 1})
+
+    @contextmanager
+    def span(self, name, cat="frame"):
+        if self.trace_path is None:
+            yield
+            return
+        start = self.now_us()
+        try:
+            yield
+        finally:
+            self.emit(name, start, self.now_us(), cat)
+
+    def push_scope(self, name):
+        # A screen (menu, level, feedback); cache hit rates in the overlay are per scope.
+        self.scopes.append((name, TEXT_CACHE.hits, TEXT_CACHE.misses, TEXT_LAYOUT.hits, TEXT_LAYOUT.misses, self.now_us()))
+
+    def pop_scope(self):
+        name, *_, start = self.scopes.pop()
+        if self.trace_path is not None:
+            self.emit(name, start, self.now_us(), "screen")
+
+    def filter_events(self, events):
+        kept = []
+        for ev in events:
+            if ev.type == pygame.KEYDOWN and ev.key == pygame.K_F3:
+                self.overlay = not self.overlay
+            else:
+                kept.append(ev)
+        self.events_frame += len(kept)
+        if self.trace_path is not None:
+            self.events_start = self.now_us()
+        return kept
+
+    def events_done(self):
+        if self.events_start is not None:
+            self.emit("events", self.events_start, self.now_us())
+            self.events_start = None
+
+    # Renderer observer hooks
+    def begin_frame(self):
+        self.events_done()
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        pass
+
+    def before_present(self, surf):
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.frame_ms = (now - self.frame_start) * 1000.0
+            if self.trace_path is not None:
+                self.emit("draw", (self.frame_start - self.t_origin) * 1e6, (now - self.t_origin) * 1e6)
+        if self.last_present is not None and now > self.last_present:
+            self.fps = 1.0 / (now - self.last_present)
+        self.last_present = now
+        self.events_last_frame, self.events_frame = self.events_frame, 0
+        self.draws_last_frame = RENDERER.draw_calls - self.draw_calls0
+        self.renders_last_frame = TEXT_CACHE.misses - self.renders0
+        if self.overlay:
+            self.draw_overlay(surf)
+        self.draw_calls0 = RENDERER.draw_calls
+        self.renders0 = TEXT_CACHE.misses
+
+    def hit_rates(self):
+        _, th, tm, lh, lm, _ = self.scopes[-1] if self.scopes else ("main", 0, 0, 0, 0, 0)
+        th, tm = TEXT_CACHE.hits - th, TEXT_CACHE.misses - tm
+        lh, lm = TEXT_LAYOUT.hits - lh, TEXT_LAYOUT.misses - lm
+        return th / max(1, th + tm), lh / max(1, lh + lm)
+
+    def draw_overlay(self, surf):
+        text_rate, layout_rate = self.hit_rates()
+        lines = [
+            self.scopes[-1][0] if self.scopes else "main",
+            f"{self.frame_ms:6.2f} ms/frame  {self.fps:5.1f} fps",
+            f"events {self.events_last_frame}  draws {self.draws_last_frame}  renders {self.renders_last_frame}",
+            f"text cache {text_rate:6.1%}  layout {layout_rate:6.1%}",
+            f"pixels pushed {RENDERER.pixels_last_frame}  layers built {LAYERS.misses}",
+            f"box sprites {len(SPRITES.entries)}  draw calls saved {SPRITES.saved}",
+        ]
+        # Rendered outside TEXT_CACHE: the numbers change every frame.
+        surfs = [FONT_SM.render(line, True, WHITE) for line in lines]
+        w = max(t.get_width() for t in surfs) + 16
+        box = pygame.Rect(WIDTH - w - 8, 8, w, len(surfs) * 18 + 10)
+        draw_rect(surf, (20, 20, 20), box, border_radius=6)
+        for i, t in enumerate(surfs):
+            blit(surf, t, (box.x + 8, box.y + 6 + i * 18))
+
+    def write_trace(self):
+        if not self.trace_path:
+            return
+        with open(self.trace_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events, "displayTimeUnit": "ms"}, f)
+
+PROFILER = Profiler()
+RENDERER.observers.append(PROFILER)
+RENDERER.observers.append(STARTUP)
+if os.environ.get("CYBERQUIZ_TRACE"):
+    PROFILER.enable_trace(os.environ["CYBERQUIZ_TRACE"])
+
+# =========================
+# Scene stack
+# =========================
+# One frame loop drives every screen. A scene (menu, level sequence, level, feedback
+# modal, summary) updates, draws a frame and handles events, and changes the stack
+# explicitly: push() opens a scene on top, pop(result) closes the top one and hands
+# the result to the scene below through resume(), replace() swaps the top. Once a
+# handler changes the stack the rest of that event batch is dropped, as the old
+# per-screen loops did. Quitting, pacing and profiler scopes live here only.
+class Scene:
+    name = "scene"
+
+    def enter(self):
+        pass
+
+    def resume(self, result):
+        pass
+
+    def update(self):
+        pass
+
+    def draw(self):
+        pass
+
+    def handle(self, ev):
+        pass
+
+class SceneStack:
+    def __init__(self):
+        self.scenes = []
+
+    def top(self):
+        return self.scenes[-1] if self.scenes else None
+
+    def push(self, scene):
+        self.scenes.append(scene)
+        PROFILER.push_scope(scene.name)
+        scene.enter()
+
+    def pop(self, result=None):
+        self.scenes.pop()
+        PROFILER.pop_scope()
+        if self.scenes:
+            self.scenes[-1].resume(result)
+
+    def replace(self, scene):
+        self.scenes.pop()
+        PROFILER.pop_scope()
+        self.push(scene)
+
+    def run(self, root):
+        self.push(root)
+        try:
+            while self.scenes:
+                scene = self.scenes[-1]
+                scene.update()
+                if self.top() is not scene:
+                    continue
+                scene.draw()
+                present()
+                for ev in poll_events():
+                    if ev.type == pygame.QUIT:
+                        pygame.quit(); sys.exit()
+                    scene.handle(ev)
+                    if self.top() is not scene:
+                        break
+                SCHEDULER.tick()
+        finally:
+            while self.scenes:
+                self.scenes.pop()
+                PROFILER.pop_scope()
+
+SCENES = SceneStack()
 
 # =========================
 # UI Helpers
 # =========================
-class Button:
-    def __init__(self, rect, text, callback=None, font=FONT, fill=GRAY, text_color=BLACK):
+# Screens are retained widget trees: a WidgetTree is laid out once per scenario (in
+# the static layer's draw function, and cached with the layer). Widgets keep their
+# own hover/selected state, which the level syncs from the engine state. Static
+# widgets are drawn into the layer in their plain look and redrawn on screen only
+# while hovered or selected; the others (toggles, input boxes) every frame.
+class Widget:
+    static = True
+
+    def __init__(self, rect, action=None, key=None):
         self.rect = pygame.Rect(rect)
+        self.action = action
+        self.key = action if key is None else key
+        self.hover = False
+        self.selected = False
+
+    def draw(self, surf):
+        pass
+
+    def dynamic(self):
+        return not self.static or self.hover or self.selected
+
+class Button(Widget):
+    def __init__(self, rect, text, callback=None, font=FONT, fill=GRAY, text_color=BLACK):
+        super().__init__(rect)
         self.text = text
         self.callback = callback
         self.fill = fill
         self.text_color = text_color
         self.font = font
-        self.hover = False
 
     def draw(self, surf):
-        color = LIGHT_GRAY if self.hover else self.fill
-        pygame.draw.rect(surf, color, self.rect, border_radius=6)
-        pygame.draw.rect(surf, BLACK, self.rect, 2, border_radius=6)
-        txt = self.font.render(self.text, True, self.text_color)
-        surf.blit(txt, (self.rect.centerx - txt.get_width() // 2,
+        draw_box(surf, self.rect, LIGHT_GRAY if self.hover else self.fill)
+        txt = render_text(self.font, self.text, True, self.text_color)
+        blit(surf, txt, (self.rect.centerx - txt.get_width() // 2,
                         self.rect.centery - txt.get_height() // 2))
 
-    def is_clicked(self, pos):
-        return self.rect.collidepoint(pos)
+class Toggle(Widget):
+    static = False
 
-    def update_hover(self, pos):
-        self.hover = self.rect.collidepoint(pos)
-
-class Toggle:
-    def __init__(self, x, y, w, h, label, initial=False):
-        self.rect = pygame.Rect(x, y, w, h)
+    def __init__(self, x, y, w, h, label, initial=False, action=None):
+        super().__init__((x, y, w, h), action)
         self.label = label
         self.value = initial
 
     def draw(self, surf):
-        pygame.draw.rect(surf, LIGHT_GRAY, self.rect, border_radius=12)
-        pygame.draw.rect(surf, BLACK, self.rect, 2, border_radius=12)
+        draw_box(surf, self.rect, LIGHT_GRAY, radius=12)
         knob_w = self.rect.height - 6
         knob_x = self.rect.x + 3 if not self.value else self.rect.right - knob_w - 3
-        pygame.draw.rect(surf, GREEN if self.value else GRAY,
-                         (knob_x, self.rect.y + 3, knob_w, knob_w), border_radius=8)
-        lab = FONT.render(f"{self.label}: {'ON' if self.value else 'OFF'}", True, BLACK)
-        surf.blit(lab, (self.rect.right + 10, self.rect.y + (self.rect.height - lab.get_height()) // 2))
-
-    def toggle(self, pos):
-        if self.rect.collidepoint(pos):
-            self.value = not self.value
-            return True
-        return False
-
-class InputBox:
-    def __init__(self, rect, placeholder="", password=False, maxlen=50, font=FONT):
-        self.rect = pygame.Rect(rect)
+        draw_box(surf, (knob_x, self.rect.y + 3, knob_w, knob_w), GREEN if self.value else GRAY, None, radius=8)
+        lab = render_text(FONT, f"{self.label}: {'ON' if self.value else 'OFF'}", True, BLACK)
+        blit(surf, lab, (self.rect.right + 10, self.rect.y + (self.rect.height - lab.get_height()) // 2))
+
+class InputBox(Widget):
+    static = False
+
+    def __init__(self, rect, placeholder="", password=False, maxlen=50, font=FONT, key=None):
+        super().__init__(rect, key=key)
         self.text = ""
         self.placeholder = placeholder
         self.password = password
@@ -114,94 +971,239 @@ class InputBox:
         self.text = ""
 
     def draw(self, surf):
-        pygame.draw.rect(surf, BLUE if self.active else GRAY, self.rect, 2, border_radius=6)
+        draw_box(surf, self.rect, None, BLUE if self.active else GRAY)
         display_text = ("*" * len(self.text)) if self.password else self.text
         if not display_text and not self.active:
             display_text = self.placeholder
             color = (120,120,120)
         else:
             color = BLACK
-        txt = self.font.render(display_text, True, color)
-        surf.blit(txt, (self.rect.x + 8, self.rect.y + (self.rect.height - txt.get_height()) // 2))
+        txt = render_text(self.font, display_text, True, color)
+        blit(surf, txt, (self.rect.x + 8, self.rect.y + (self.rect.height - txt.get_height()) // 2))
 
-def draw_text_multiline(surf, text, x, y, font, color=BLACK, max_width=920, line_spacing=6):
-    words = text.split(' ')
+class OptionRow(Widget):
+    def __init__(self, rect, text, action, dy=7, note=None):
+        super().__init__(rect, action)
+        self.text = text
+        self.dy = dy
+        self.note = note
+
+    def draw(self, surf):
+        draw_option(surf, self.rect, self.text, self.selected, self.dy, self.note)
+
+class WidgetTree:
+    # Hit-testing goes through a grid of cell x cell buckets, so a click or hover
+    # tests only the widgets overlapping its cell.
+    def __init__(self, widgets=(), cell=64):
+        self.widgets = []
+        self.cell = cell
+        self.grid = {}
+        self.keys = {}
+        self.hovered = None
+        for w in widgets:
+            self.add(w)
+
+    def add(self, widget):
+        widget.hover = False
+        self.widgets.append(widget)
+        if widget.key is not None:
+            self.keys[widget.key] = widget
+        r, c = widget.rect, self.cell
+        for cx in range(r.left // c, (r.right - 1) // c + 1):
+            for cy in range(r.top // c, (r.bottom - 1) // c + 1):
+                self.grid.setdefault((cx, cy), []).append(widget)
+        return widget
+
+    def find(self, key):
+        return self.keys[key]
+
+    def hit(self, pos):
+        for w in reversed(self.grid.get((pos[0] // self.cell, pos[1] // self.cell), ())):
+            if w.rect.collidepoint(pos):
+                return w
+        return None
+
+    def action_at(self, pos):
+        w = self.hit(pos)
+        return w.action if w is not None else None
+
+    def hover(self, pos):
+        w = self.hit(pos)
+        if w is not self.hovered:
+            if self.hovered is not None:
+                self.hovered.hover = False
+            if w is not None:
+                w.hover = True
+            self.hovered = w
+
+    def select(self, actions):
+        # Marks the widgets whose action is in `actions` as selected.
+        for w in self.widgets:
+            w.selected = w.action in actions
+
+    def draw_static(self, surf):
+        for w in self.widgets:
+            if w.static:
+                w.draw(surf)
+
+    def draw_dynamic(self, surf):
+        for w in self.widgets:
+            if w.dynamic():
+                w.draw(surf)
+
+# Word wrapping measures every word with font.size(), and the same paragraphs are
+# drawn every frame. Wrapped lines are computed once per (font, text, max_width,
+# line_spacing) and reused; explicit newlines start a new line.
+class TextLayoutCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def layout(self, text, font, max_width, line_spacing=6):
+        key = (font, text, max_width, line_spacing)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        with PROFILER.span("layout"):
+            lines = wrap_lines(text, font, max_width)
+        entry = (lines, len(lines) * (font.get_height() + line_spacing))
+        self.entries[key] = entry
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+TEXT_LAYOUT = TextLayoutCache()
+
+def wrap_lines(text, font, max_width):
     lines = []
-    cur = ""
-    for w in words:
-        t = cur + w + " "
-        if font.size(t)[0] > max_width:
-            lines.append(cur)
-            cur = w + " "
-        else:
-            cur = t
-    if cur:
-        lines.append(cur)
+    for paragraph in text.split("\n"):
+        cur = ""
+        for w in paragraph.split(' '):
+            t = cur + w + " "
+            if cur and font.size(t)[0] > max_width:
+                lines.append(cur.rstrip())
+                cur = w + " "
+            else:
+                cur = t
+        lines.append(cur.rstrip())
+    return tuple(lines)
+
+def draw_text_multiline(surf, text, x, y, font, color=BLACK, max_width=920, line_spacing=6):
+    lines, height = TEXT_LAYOUT.layout(text, font, max_width, line_spacing)
+    step = font.get_height() + line_spacing
     yy = y
     for line in lines:
-        surf.blit(font.render(line, True, color), (x, yy))
-        yy += font.get_height() + line_spacing
-    return yy
-
-def wait_for_key_or_click():
-    while True:
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if ev.type == pygame.KEYDOWN or ev.type == pygame.MOUSEBUTTONDOWN:
-                return
-        CLOCK.tick(60)
+        if line:
+            blit(surf, render_text(font, line, True, color), (x, yy))
+        yy += step
+    return y + height
 
-def show_feedback(title, lines, success=True, back_to_menu=True):
-    screen.fill(WHITE)
-    screen.blit(FONT_XL.render(title, True, GREEN if success else RED), (60, 60))
-    y = 140
-    for line in lines:
-        y = draw_text_multiline(screen, "• " + line, 60, y, FONT_LG if success else FONT, BLACK) + 4
-    if back_to_menu:
-        screen.blit(FONT.render("Press any key to continue.", True, (60,60,60)), (60, HEIGHT-60))
-    else:
-        screen.blit(FONT.render("Press any key to continue.", True, (60,60,60)), (60, HEIGHT-60))
-    pygame.display.flip()
-    wait_for_key_or_click()
+class CountdownLabel:
+    # The text for a countdown, rendered again only when its whole second changes.
+    def __init__(self, countdown, font, template, color):
+        self.countdown = countdown
+        self.font = font
+        self.template = template
+        self.color = color
+        self.left = None
+        self.surf = None
+
+    def surface(self):
+        left = self.countdown.left()
+        if left != self.left:
+            self.left = left
+            self.surf = render_text(self.font, self.template.format(left), True, RED if left <= 5 else self.color)
+        return self.surf
+
+def draw_option(surf, rect, text, selected=False, dy=7, note=None):
+    # An option row: green when selected, gray otherwise; note is a second, smaller line.
+    draw_box(surf, rect, SELECTED_GREEN if selected else GRAY)
+    blit(surf, render_text(FONT, text, True, BLACK), (rect.x + 10, rect.y + dy))
+    if note is not None:
+        blit(surf, render_text(FONT_SM, note, True, (50,50,50)), (rect.x + 10, rect.y + 26))
+
+def key_or_click(ev):
+    return ev.type == pygame.KEYDOWN or ev.type == pygame.MOUSEBUTTONDOWN
+
+class FeedbackScene(Scene):
+    # Shows (title, lines, success) screens in turn; any key or click moves on, and
+    # the modal pops after the last one.
+    name = "show_feedback"
+
+    def __init__(self, items):
+        self.items = iter(items)
+        self.item = next(self.items)
+
+    def draw(self):
+        draw_feedback(*self.item)
+
+    def handle(self, ev):
+        if key_or_click(ev):
+            self.item = next(self.items, None)
+            if self.item is None:
+                SCENES.pop()
+
+def draw_feedback(title, lines, success=True):
+    def draw_static(surf):
+        blit(surf, render_text(FONT_XL, title, True, GREEN if success else RED), (60, 60))
+        y = 140
+        for line in lines:
+            y = draw_text_multiline(surf, "• " + line, 60, y, FONT_LG if success else FONT, BLACK) + 4
+        blit(surf, render_text(FONT, "Press any key to continue.", True, (60,60,60)), (60, HEIGHT-60))
+
+    begin_layer(("feedback", title, tuple(lines), success), draw_static)
 
 # =========================
 # Navigation & Auto-Progress
 # =========================
-def main_menu():
-    title = FONT_XL.render("Cybersecurity Awareness – Enhanced Edition", True, BLUE)
-    subtitle = FONT.render("Click where to start; the game will auto-progress through all 10 levels.", True, BLACK)
-
-    buttons = []
-    for i in range(10):
-        col = (i % 2)
-        row = (i // 2)
-        index = i + 1
-        btn = Button((120 + col*420, 180 + row*55, 360, 45), f"Play from Level {index}", lambda n=index: run_levels_sequence(n))
-        buttons.append(btn)
-
-    while True:
-        screen.fill(WHITE)
-        screen.blit(title, (WIDTH//2 - title.get_width()//2, 40))
-        screen.blit(subtitle, (WIDTH//2 - subtitle.get_width()//2, 90))
-
-        mouse = pygame.mouse.get_pos()
-        for b in buttons:
-            b.update_hover(mouse)
-            b.draw(screen)
-
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            elif ev.type == pygame.MOUSEBUTTONDOWN:
-                for b in buttons:
-                    if b.is_clicked(ev.pos):
-                        b.callback()
-
-        pygame.display.flip()
-        CLOCK.tick(60)
-
-def final_summary_screen(passed, total, start_level):
+class MenuScene(Scene):
+    name = "main_menu"
+
+    def __init__(self):
+        self.title = render_text(FONT_XL, "Cybersecurity Awareness – Enhanced Edition", True, BLUE)
+        self.subtitle = render_text(FONT, "Click where to start; the game will auto-progress through all 10 levels.", True, BLACK)
+        self.buttons = []
+        for i in range(10):
+            col = (i % 2)
+            row = (i // 2)
+            index = i + 1
+            btn = Button((120 + col*420, 180 + row*55, 360, 45), f"Play from Level {index}", lambda n=index: SCENES.push(SequenceScene(n)))
+            self.buttons.append(btn)
+        self.tree = None
+
+    def draw_static(self, surf):
+        blit(surf, self.title, (WIDTH//2 - self.title.get_width()//2, 40))
+        blit(surf, self.subtitle, (WIDTH//2 - self.subtitle.get_width()//2, 90))
+        tree = WidgetTree(self.buttons)
+        tree.draw_static(surf)
+        return tree
+
+    def draw(self):
+        self.tree = begin_layer(("main_menu",), self.draw_static)
+        # Only the hovered button differs from the layer.
+        self.tree.draw_dynamic(screen)
+
+    def handle(self, ev):
+        # Hover follows motion events rather than mouse.get_pos(): event positions
+        # are in logical coordinates on both backends, the raw pointer is not.
+        if ev.type == pygame.MOUSEMOTION:
+            self.tree.hover(ev.pos)
+        elif ev.type == pygame.MOUSEBUTTONDOWN:
+            b = self.tree.hit(ev.pos)
+            if b is not None:
+                b.callback()
+
+def final_summary(passed, total):
     ratio = passed / total
     if passed == total:
         title = "Flawless Victory!"
@@ -215,884 +1217,3763 @@ def final_summary_screen(passed, total, start_level):
         title = "Try Again"
         color = ORANGE
         tips = ["Review the feedback from each level.", "Small changes can greatly reduce risk."]
-    screen.fill(WHITE)
-    screen.blit(FONT_XL.render(title, True, color), (60, 60))
-    draw_text_multiline(screen, f"You completed levels {start_level}–10.", 60, 130, FONT_LG, BLACK)
-    draw_text_multiline(screen, f"Score: {passed} / {total} levels passed", 60, 170, FONT_LG, BLACK)
-    y = 220
-    for t in tips:
-        y = draw_text_multiline(screen, "• " + t, 60, y, FONT, BLACK) + 4
-    screen.blit(FONT.render("Press any key to return to the menu.", True, (60,60,60)), (60, HEIGHT-60))
-    pygame.display.flip()
-    wait_for_key_or_click()
-
-# Dispatcher to play a sequence of levels automatically and tally results
-def run_levels_sequence(start_level):
-    level_funcs = {
-        1: level_1_phishing,
-        2: level_2_roboscam,
-        3: level_3_passwords,
-        4: level_4_malware,
-        5: level_5_social_engineering,
-        6: level_6_public_wifi,
-        7: level_7_firewall_rules,
-        8: level_8_data_privacy,
-        9: level_9_2fa,
-        10: level_10_ransomware
-    }
-    passed = 0
-    total = 0
-    for lvl in range(start_level, 11):
-        func = level_funcs.get(lvl)
-        if func:
-            total += 1
-            result = func()
-            if result:
-                passed += 1
-    final_summary_screen(passed, total, start_level)
+    return title, color, tips
 
-# =========================
-# Level implementations (enhanced)
-# Each level returns True (pass) or False (fail)
-# =========================
+class SummaryScene(Scene):
+    name = "final_summary"
 
-# Level 1 – Phishing (3 sublevels)
-def level_1_phishing():
-    scenarios = [
-        {
-            "title": "Bank Email Alert",
-            "email": {
-                "from": "security@secure-bank-login.com",
-                "to": "you@example.com",
-                "subject": "URGENT: Suspicious Activity – Verify Now",
-                "body": ("Dear Customer,\n\nWe detected suspicious activity. Verify your account immediately to avoid suspension.\n"
-                         "Click here: https://secure-bank-login.com/update\n\nSincerely,\nSecurity Team"),
-                "redflags": [
-                    "Sender domain doesn’t match real bank domain",
-                    "Urgent tone to pressure immediate action",
-                    "Suspicious link domain",
-                ],
-            },
-            "question": "What’s the safest action?",
-            "options": [
-                "Click the link and sign in to lock the account quickly.",
-                "Open a new browser and visit your bank’s official site manually to check.",
-                "Reply to the email asking if it’s legitimate.",
-                "Forward the email to friends and ask for advice."
-            ],
-            "correct": 1,
-        },
-        {
-            "title": "Delivery SMS",
-            "sms": "Your package could not be delivered. Reschedule now: http://pack-deliver-status.info/track?id=392817",
-            "flags": [
-                "Unfamiliar/suspicious link domain",
-                "Unexpected package / urgent request",
-                "No tracking number tied to your known order",
-                "Sender number looks spoofed/odd length",
-            ],
-            "question": "What are the warning signs? (Select all that apply)",
-            "options": [
-                "The URL domain is odd and not official.",
-                "It’s urgent and unexpected.",
-                "No real tracking info or details.",
-                "The number looks spoofed.",
-            ],
-            "correct_set": {0,1,2,3},
-        },
-        {
-            "title": "Internal IT Password Reset",
-            "email": {
-                "from": "it-support123@gmail.com",
-                "to": "you@company.com",
-                "subject": "[Action Required] Password Expired – Reset Now",
-                "body": ("Dear Employee,\n\nYour password has expired. Reset here: http://company-reset-pass.link\n"
-                         "Failure to comply will disable your account.\n\nThanks,\nIT Helpdesk"),
-                "redflags": [
-                    "Non-company sender address",
-                    "Reset link not on official domain",
-                    "Threatening language",
-                ],
-            },
-            "question": "How should you verify this request?",
-            "options": [
-                "Check sender domain and link domain carefully.",
-                "Contact IT via official channels (intranet/known phone).",
-                "Click the link but be careful.",
-                "Ignore all IT emails forever."
-            ],
-            "correct_set": {0,1},
-        },
-    ]
+    def __init__(self, passed, total, start_level):
+        self.passed, self.total, self.start_level = passed, total, start_level
 
-    step = 0
-    selected_flags = set()
-    state = "flags"  # for scenario 1: select red flags first
+    def draw_static(self, surf):
+        title, color, tips = final_summary(self.passed, self.total)
+        blit(surf, render_text(FONT_XL, title, True, color), (60, 60))
+        draw_text_multiline(surf, f"You completed levels {self.start_level}–10.", 60, 130, FONT_LG, BLACK)
+        draw_text_multiline(surf, f"Score: {self.passed} / {self.total} levels passed", 60, 170, FONT_LG, BLACK)
+        y = 220
+        for t in tips:
+            y = draw_text_multiline(surf, "• " + t, 60, y, FONT, BLACK) + 4
+        blit(surf, render_text(FONT, "Press any key to return to the menu.", True, (60,60,60)), (60, HEIGHT-60))
 
-    def draw_email_box(box, y0=140):
-        x0 = 40
-        pygame.draw.rect(screen, LIGHT_GRAY, (x0, y0, WIDTH-80, 250), border_radius=8)
-        pygame.draw.rect(screen, BLACK, (x0, y0, WIDTH-80, 250), 2, border_radius=8)
-        y = y0 + 10
-        y = draw_text_multiline(screen, f"From: {box['from']}", x0+10, y, FONT, BLACK)
-        y = draw_text_multiline(screen, f"To:   {box['to']}", x0+10, y, FONT, BLACK)
-        y = draw_text_multiline(screen, f"Subject: {box['subject']}", x0+10, y, FONT_LG, BLUE)
-        y += 10
-        y = draw_text_multiline(screen, box["body"], x0+10, y, FONT, BLACK)
+    def draw(self):
+        begin_layer(("final_summary", self.passed, self.total, self.start_level), self.draw_static)
 
-    while True:
-        screen.fill(WHITE)
-        sc = scenarios[step]
-        title = FONT_XL.render(f"Level 1 – Phishing: {sc['title']}", True, BLUE)
-        screen.blit(title, (40, 40))
+    def handle(self, ev):
+        if key_or_click(ev):
+            SCENES.pop()
 
-        buttons = []
+# Plays a sequence of levels automatically and tallies results. It is never drawn:
+# it pushes the next level, and each level's result comes back through resume().
+class SequenceScene(Scene):
+    name = "level_sequence"
 
-        if step == 0:
-            # Email with red flags first
-            if state == "flags":
-                draw_email_box(sc["email"])
-                y = 410
-                screen.blit(FONT.render("Select ALL red flags you notice, then press ENTER:", True, BLACK), (40, y))
-                y += 10
-                for i, f in enumerate(sc["email"]["redflags"]):
-                    rect = pygame.Rect(60, y + i*40, WIDTH-120, 36)
-                    color = (160, 235, 160) if i in selected_flags else GRAY
-                    pygame.draw.rect(screen, color, rect, border_radius=6)
-                    pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-                    screen.blit(FONT.render(f"{i+1}. {f}", True, BLACK),
-                                (rect.x + 10, rect.y + 7))
-                    buttons.append(("flag", i, rect))
-            elif state == "action":
-                draw_email_box(sc["email"])
-                y = 410
-                screen.blit(FONT.render(sc["question"], True, BLACK), (40, y))
-                for i, opt in enumerate(sc["options"]):
-                    rect = pygame.Rect(60, y + 40 + i*45, WIDTH-120, 36)
-                    pygame.draw.rect(screen, GRAY, rect, border_radius=6)
-                    pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-                    screen.blit(FONT.render(opt, True, BLACK),
-                                (rect.x + 10, rect.y + 7))
-                    buttons.append(("choice", i, rect))
-        elif step == 1:
-            sms_box_y = 140
-            pygame.draw.rect(screen, LIGHT_GRAY, (40, sms_box_y, WIDTH-80, 120), border_radius=8)
-            pygame.draw.rect(screen, BLACK, (40, sms_box_y, WIDTH-80, 120), 2, border_radius=8)
-            draw_text_multiline(screen, "SMS:", 60, sms_box_y+10, FONT_LG, BLUE)
-            draw_text_multiline(screen, sc["sms"], 60, sms_box_y+50, FONT, BLACK)
-
-            y = 290
-            screen.blit(FONT.render(sc["question"], True, BLACK), (40, y))
-            for i, opt in enumerate(sc["options"]):
-                rect = pygame.Rect(60, y + 40 + i*45, WIDTH-120, 36)
-                color = (160, 235, 160) if i in selected_flags else GRAY
-                pygame.draw.rect(screen, color, rect, border_radius=6)
-                pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-                screen.blit(FONT.render(opt, True, BLACK),
-                            (rect.x + 10, rect.y + 7))
-                buttons.append(("flag", i, rect))
-            screen.blit(FONT_SM.render("Press ENTER to submit your selections.", True, BLACK), (40, HEIGHT-50))
+    def __init__(self, start_level):
+        self.start_level = start_level
+        self.levels = iter(range(start_level, 11))
+        self.passed = 0
+        self.total = 0
+
+    def enter(self):
+        SESSION.begin(self.start_level)
+        self.next_level()
+
+    def resume(self, result):
+        self.total += 1
+        SESSION.end_level(result)
+        if result:
+            self.passed += 1
+        self.next_level()
+
+    def next_level(self):
+        lvl = next(self.levels, None)
+        if lvl is None:
+            SCENES.replace(SummaryScene(self.passed, self.total, self.start_level))
         else:
-            draw_email_box(sc["email"])
-            y = 410
-            screen.blit(FONT.render(sc["question"], True, BLACK), (40, y))
-            for i, opt in enumerate(sc["options"]):
-                rect = pygame.Rect(60, y + 40 + i*45, WIDTH-120, 36)
-                color = (160, 235, 160) if i in selected_flags else GRAY
-                pygame.draw.rect(screen, color, rect, border_radius=6)
-                pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-                screen.blit(FONT.render(opt, True, BLACK),
-                            (rect.x + 10, rect.y + 7))
-                buttons.append(("flag", i, rect))
-            screen.blit(FONT_SM.render("Press ENTER to submit your selections.", True, BLACK), (40, HEIGHT-50))
-
-        pygame.display.flip()
-
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            elif ev.type == pygame.MOUSEBUTTONDOWN:
-                pos = ev.pos
-                for kind, idx, rect in buttons:
-                    if rect.collidepoint(pos):
-                        if kind == "flag":
-                            if idx in selected_flags:
-                                selected_flags.remove(idx)
-                            else:
-                                selected_flags.add(idx)
-                        elif kind == "choice":
-                            final_choice = idx
-                            if final_choice == sc["correct"]:
-                                show_feedback("Correct!", ["Open a new tab and go to the official site yourself."], True, back_to_menu=False)
-                                step += 1
-                                selected_flags.clear()
-                                state = "flags"
-                                if step >= len(scenarios):
-                                    show_feedback("Level 1 Completed!", ["You identified red flags and chose safe actions."], True)
-                                    return True
-                            else:
-                                show_feedback("Not quite.", ["Never click suspicious links or reply. Verify independently."], False, back_to_menu=False)
-            elif ev.type == pygame.KEYDOWN:
-                if ev.key == pygame.K_RETURN:
-                    if step == 0 and state == "flags":
-                        if selected_flags == {0,1,2}:
-                            state = "action"
-                        else:
-                            show_feedback("Missing flags", ["Select all red flags you spot in the email."], False, back_to_menu=False)
-                    elif step == 1:
-                        if selected_flags == scenarios[1]["correct_set"]:
-                            show_feedback("Good eye!", ["Those are classic smishing signs."], True, back_to_menu=False)
-                            step += 1
-                            selected_flags.clear()
-                        else:
-                            show_feedback("Not all correct.", ["Review URL, urgency, details, and sender number."], False, back_to_menu=False)
-                    elif step == 2:
-                        if selected_flags == scenarios[2]["correct_set"]:
-                            show_feedback("Exactly.", ["Verify using official IT channels; never use unknown links."], True, back_to_menu=False)
-                            show_feedback("Level 1 Completed!", ["Great job dealing with phishing via email, SMS, and internal spoofing."], True)
-                            return True
-                        else:
-                            show_feedback("Close, but not quite.", ["Pick the official verification steps only."], False, back_to_menu=False)
-        CLOCK.tick(60)
+            SCENES.push(LEVEL_SCENES[lvl]())
 
-# Level 2 – Robo-Scamming (detective MCQ)
-def level_2_roboscam():
-    stage = 0
-    score = 0
-    stages = [
-        {
-            "caller": "IRS Agent (alleged)",
-            "line": "This is the IRS. You owe back taxes. If you don’t pay immediately, police will arrest you today.",
-            "options": [
-                ("Ask for written notice mailed to your address on file.", True),
-                ("Ask where to buy gift cards to pay now.", False),
-                ("Provide your SSN to confirm identity.", False),
-                ("Hang up instantly without reporting.", False),
-            ],
-            "hint": "Government agencies don’t demand immediate payment or threaten arrest over the phone."
-        },
-        {
-            "caller": "IRS Agent",
-            "line": "We can settle this if you buy $2,000 in gift cards and read me the codes.",
-            "options": [
-                ("Explain that government never asks for gift cards; request agent badge and callback number.", True),
-                ("Agree to buy the cards to avoid arrest.", False),
-                ("Offer credit card number over the phone instead.", False),
-                ("Ask to pay via crypto; it’s faster.", False),
+def main_menu():
+    SCENES.run(MenuScene())
+
+# =========================
+# Level content
+# =========================
+# Built-in content. The levels read it through scenario packs (next section), not
+# from these lists directly.
+BUILTIN_PHISHING = [
+    {
+        "title": "Bank Email Alert",
+        "email": {
+            "from": "security@secure-bank-login.com",
+            "to": "you@example.com",
+            "subject": "URGENT: Suspicious Activity – Verify Now",
+            "body": ("Dear Customer,\n\nWe detected suspicious activity. Verify your account immediately to avoid suspension.\n"
+                     "Click here: https://secure-bank-login.com/update\n\nSincerely,\nSecurity Team"),
+            "redflags": [
+                "Sender domain doesn’t match real bank domain",
+                "Urgent tone to pressure immediate action",
+                "Suspicious link domain",
             ],
-            "hint": "Gift cards/crypto requests are classic red flags."
         },
-        {
-            "caller": "IRS Agent",
-            "line": "I don’t have time for that. Just give me your bank login details and we’ll fix it.",
-            "options": [
-                ("Refuse, end call, and report to official IRS and your IT/security.", True),
-                ("Give online banking credentials to resolve quickly.", False),
-                ("Send a picture of your debit card front/back.", False),
-                ("Ask for their personal number to text them later.", False),
+        "question": "What’s the safest action?",
+        "options": [
+            "Click the link and sign in to lock the account quickly.",
+            "Open a new browser and visit your bank’s official site manually to check.",
+            "Reply to the email asking if it’s legitimate.",
+            "Forward the email to friends and ask for advice."
+        ],
+        "correct": 1,
+        "redflag_set": {0,1,2},
+        "feedback_flags": ("Missing flags", ["Select all red flags you spot in the email."]),
+        "feedback_ok": ("Correct!", ["Open a new tab and go to the official site yourself."]),
+        "feedback_bad": ("Not quite.", ["Never click suspicious links or reply. Verify independently."]),
+    },
+    {
+        "title": "Delivery SMS",
+        "sms": "Your package could not be delivered. Reschedule now: http://pack-deliver-status.info/track?id=392817",
+        "flags": [
+            "Unfamiliar/suspicious link domain",
+            "Unexpected package / urgent request",
+            "No tracking number tied to your known order",
+            "Sender number looks spoofed/odd length",
+        ],
+        "question": "What are the warning signs? (Select all that apply)",
+        "options": [
+            "The URL domain is odd and not official.",
+            "It’s urgent and unexpected.",
+            "No real tracking info or details.",
+            "The number looks spoofed.",
+        ],
+        "correct_set": {0,1,2,3},
+        "feedback_ok": ("Good eye!", ["Those are classic smishing signs."]),
+        "feedback_bad": ("Not all correct.", ["Review URL, urgency, details, and sender number."]),
+    },
+    {
+        "title": "Internal IT Password Reset",
+        "email": {
+            "from": "it-support123@gmail.com",
+            "to": "you@company.com",
+            "subject": "[Action Required] Password Expired – Reset Now",
+            "body": ("Dear Employee,\n\nYour password has expired. Reset here: http://company-reset-pass.link\n"
+                     "Failure to comply will disable your account.\n\nThanks,\nIT Helpdesk"),
+            "redflags": [
+                "Non-company sender address",
+                "Reset link not on official domain",
+                "Threatening language",
             ],
-            "hint": "Never share credentials. Verify via official published channels."
         },
-    ]
-
-    def draw_stage(s):
-        screen.fill(WHITE)
-        title = FONT_XL.render("Level 2 – Robo-Scamming Detective", True, BLUE)
-        screen.blit(title, (40, 40))
-        y = draw_text_multiline(screen, f"Caller: {stages[s]['caller']}", 40, 120, FONT_LG, BLACK)
-        y = draw_text_multiline(screen, stages[s]["line"], 40, y + 10, FONT, BLACK)
-        draw_text_multiline(screen, "Choose the safest response:", 40, y + 16, FONT, BLACK)
-        buttons = []
-        oy = y + 52
-        for i, (opt, _) in enumerate(stages[s]["options"]):
-            rect = pygame.Rect(60, oy + i*48, WIDTH-120, 40)
-            pygame.draw.rect(screen, GRAY, rect, border_radius=6)
-            pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-            screen.blit(FONT.render(opt, True, BLACK), (rect.x+10, rect.y+8))
-            buttons.append((rect, i))
-        screen.blit(FONT_SM.render("Tip: " + stages[s]["hint"], True, (80,80,80)), (60, HEIGHT-50))
-        pygame.display.flip()
-        return buttons
-
-    while stage < len(stages):
-        buttons = draw_stage(stage)
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            elif ev.type == pygame.MOUSEBUTTONDOWN:
-                for rect, i in buttons:
-                    if rect.collidepoint(ev.pos):
-                        chosen, good = stages[stage]["options"][i]
-                        if good:
-                            score += 1
-                            show_feedback("Good move.", ["That’s the safe, verifiable step."], True, back_to_menu=False)
-                        else:
-                            show_feedback("Risky choice.", ["This is what scammers want—avoid providing info or payments."], False, back_to_menu=False)
-                        stage += 1
-        CLOCK.tick(60)
-
-    lines = [f"Score: {score} / {len(stages)}", "Report suspicious calls to official channels.", "Never pay via gift cards or share credentials."]
-    success = (score == len(stages))
-    show_feedback("Call Ended – Summary", lines, success=success)
-    return success
+        "question": "How should you verify this request?",
+        "options": [
+            "Check sender domain and link domain carefully.",
+            "Contact IT via official channels (intranet/known phone).",
+            "Click the link but be careful.",
+            "Ignore all IT emails forever."
+        ],
+        "correct_set": {0,1},
+        "feedback_ok": ("Exactly.", ["Verify using official IT channels; never use unknown links."]),
+        "feedback_bad": ("Close, but not quite.", ["Pick the official verification steps only."]),
+    },
+]
 
-# Level 3 – Password Security (create a strong password)
-def level_3_passwords():
-    rules = [
-        "≥ 12 characters",
-        "≥ 1 uppercase letter",
-        "≥ 1 lowercase letter",
-        "≥ 1 digit",
-        "≥ 1 special (!@#$%)",
-        "No common words or sequences (password, 123456, qwerty, abc123)",
-    ]
-    input_box = InputBox((80, 360, 840, 48), placeholder="Type a strong password and press ENTER", password=False, maxlen=50, font=FONT_LG)
-
-    def check_password(pw):
-        msgs = []
-        if len(pw) < 12: msgs.append("Must be at least 12 characters.")
-        if not re.search(r'[A-Z]', pw): msgs.append("Add at least one uppercase letter.")
-        if not re.search(r'[a-z]', pw): msgs.append("Add at least one lowercase letter.")
-        if not re.search(r'[0-9]', pw): msgs.append("Add at least one digit.")
-        if not re.search(r'[!@#$%]', pw): msgs.append("Add at least one special (!@#$%).")
-        for c in ["password", "123456", "qwerty", "abc123"]:
-            if c in pw.lower():
-                msgs.append("Avoid common words/sequences.")
-                break
-        return msgs
+BUILTIN_ROBOSCAM = [
+    {
+        "caller": "IRS Agent (alleged)",
+        "line": "This is the IRS. You owe back taxes. If you don’t pay immediately, police will arrest you today.",
+        "options": [
+            ("Ask for written notice mailed to your address on file.", True),
+            ("Ask where to buy gift cards to pay now.", False),
+            ("Provide your SSN to confirm identity.", False),
+            ("Hang up instantly without reporting.", False),
+        ],
+        "hint": "Government agencies don’t demand immediate payment or threaten arrest over the phone."
+    },
+    {
+        "caller": "IRS Agent",
+        "line": "We can settle this if you buy $2,000 in gift cards and read me the codes.",
+        "options": [
+            ("Explain that government never asks for gift cards; request agent badge and callback number.", True),
+            ("Agree to buy the cards to avoid arrest.", False),
+            ("Offer credit card number over the phone instead.", False),
+            ("Ask to pay via crypto; it’s faster.", False),
+        ],
+        "hint": "Gift cards/crypto requests are classic red flags."
+    },
+    {
+        "caller": "IRS Agent",
+        "line": "I don’t have time for that. Just give me your bank login details and we’ll fix it.",
+        "options": [
+            ("Refuse, end call, and report to official IRS and your IT/security.", True),
+            ("Give online banking credentials to resolve quickly.", False),
+            ("Send a picture of your debit card front/back.", False),
+            ("Ask for their personal number to text them later.", False),
+        ],
+        "hint": "Never share credentials. Verify via official published channels."
+    },
+]
 
-    while True:
-        screen.fill(WHITE)
-        screen.blit(FONT_XL.render("Level 3 – Create a Strong Password", True, BLUE), (60, 40))
-        y = draw_text_multiline(screen, "Follow these rules:", 60, 110, FONT_LG, BLACK)
-        for r in rules:
-            y = draw_text_multiline(screen, "• " + r, 80, y+4, FONT, BLACK)
-
-        input_box.draw(screen)
-        draw_text_multiline(screen, "Press ENTER to evaluate strength.", 80, 520, FONT, BLACK)
-
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            result = input_box.handle_event(ev)
-            if result == "enter":
-                pw = input_box.value()
-                msgs = check_password(pw)
-                if msgs:
-                    show_feedback("Password Needs Work", msgs, success=False, back_to_menu=False)
-                else:
-                    show_feedback("Great Password!", ["You met all strength criteria."], success=True)
-                    return True
+BUILTIN_PASSWORD_RULES = [
+    "≥ 12 characters",
+    "≥ 1 uppercase letter",
+    "≥ 1 lowercase letter",
+    "≥ 1 digit",
+    "≥ 1 special (!@#$%)",
+    "No common words or sequences (password, 123456, qwerty, abc123)",
+]
 
-        # live strength meter
-        pw = input_box.value()
-        msgs = check_password(pw)
-        score = 5 - len([m for m in msgs if m])
-        score = max(0, score)
-        x, y_m, w, h = 80, 430, 840, 20
-        pygame.draw.rect(screen, GRAY, (x,y_m,w,h), border_radius=6)
-        fill_w = int((score/5.0) * w)
-        color = RED if score <= 2 else ORANGE if score == 3 else GREEN
-        pygame.draw.rect(screen, color, (x,y_m,fill_w,h), border_radius=6)
-
-        pygame.display.flip()
-        CLOCK.tick(60)
+BUILTIN_MALWARE = [
+    {
+        "title": "Find a Safe PDF Editor",
+        "desc": ("You searched for a PDF editor. Choose the safest download."),
+        "links": [
+            ("pdf-editor-pro-ultimate-2025.exe", "Ad – Unknown site – HTTPS", False),
+            ("Adobe Acrobat (adobe.com)", "Official vendor – HTTPS – Known reputation", True),
+            ("PDFEditPlusSetup.msi", "Third-party mirror – no reputation info", False),
+            ("AcrobatCrackFree.zip", "Pirated – likely malware", False),
+        ],
+        "multi_ok": False,
+        "feedback_ok": ("Correct!", ["Official vendor pages are the safest choice."]),
+        "feedback_bad": ("Risky choice.", ["Ads/unknown mirrors/pirated files often carry malware."]),
+    },
+    {
+        "title": "Forum Game Download",
+        "desc": ("A forum post links a 'free game'. Comments mention pop-ups."),
+        "links": [
+            ("GameInstallerFree.exe", "Direct EXE from unknown file host", False),
+            ("Official store page", "Trusted store, signed installer", True),
+            ("GameInstallerFree.scr", "Screensaver format used as malware", False),
+            ("Read community reviews first", "Research legitimacy before download", True),
+        ],
+        "multi_ok": True,
+        "correct_set": {1,3},
+        "feedback_ok": ("Correct!", ["Those were the safe steps."]),
+        "feedback_bad": ("Not quite.", ["Pick only the trusted sources and research steps."]),
+    },
+    {
+        "title": "Email Attachment",
+        "desc": ("Unknown sender attached 'TaxRefund.docm'. AV flags it."),
+        "links": [
+            ("Open attachment anyway", "Risky", False),
+            ("Delete the file", "Safe first step", True),
+            ("Forward to security team", "Good reporting", True),
+            ("Run in sandbox then open", "Safer than opening, but still risky here", False),
+        ],
+        "multi_ok": True,
+        "correct_set": {1,2},
+        "feedback_ok": ("Correct!", ["Those were the safe steps."]),
+        "feedback_bad": ("Not quite.", ["Pick only the trusted sources and research steps."]),
+    }
+]
 
-# Level 4 – Malware (choose safe downloads)
-def level_4_malware():
-    scenarios = [
-        {
-            "title": "Find a Safe PDF Editor",
-            "desc": ("You searched for a PDF editor. Choose the safest download."),
-            "links": [
-                ("pdf-editor-pro-ultimate-2025.exe", "Ad – Unknown site – HTTPS", False),
-                ("Adobe Acrobat (adobe.com)", "Official vendor – HTTPS – Known reputation", True),
-                ("PDFEditPlusSetup.msi", "Third-party mirror – no reputation info", False),
-                ("AcrobatCrackFree.zip", "Pirated – likely malware", False),
-            ],
-            "multi_ok": False
-        },
-        {
-            "title": "Forum Game Download",
-            "desc": ("A forum post links a 'free game'. Comments mention pop-ups."),
-            "links": [
-                ("GameInstallerFree.exe", "Direct EXE from unknown file host", False),
-                ("Official store page", "Trusted store, signed installer", True),
-                ("GameInstallerFree.scr", "Screensaver format used as malware", False),
-                ("Read community reviews first", "Research legitimacy before download", True),
-            ],
-            "multi_ok": True,
-            "correct_set": {1,3}
-        },
-        {
-            "title": "Email Attachment",
-            "desc": ("Unknown sender attached 'TaxRefund.docm'. AV flags it."),
-            "links": [
-                ("Open attachment anyway", "Risky", False),
-                ("Delete the file", "Safe first step", True),
-                ("Forward to security team", "Good reporting", True),
-                ("Run in sandbox then open", "Safer than opening, but still risky here", False),
-            ],
-            "multi_ok": True,
-            "correct_set": {1,2}
-        }
-    ]
-    idx = 0
-    selected = set()
-    total_ok = 0
-
-    while idx < len(scenarios):
-        sc = scenarios[idx]
-        screen.fill(WHITE)
-        screen.blit(FONT_XL.render("Level 4 – Malware & Safe Downloads", True, BLUE), (40, 40))
-        y = draw_text_multiline(screen, sc["title"], 40, 110, FONT_LG, BLACK)
-        y = draw_text_multiline(screen, sc["desc"], 40, y+8, FONT, BLACK)
-
-        btns = []
-        base_y = y + 30
-        for i, (name, note, _) in enumerate(sc["links"]):
-            rect = pygame.Rect(60, base_y + i*60, WIDTH-120, 48)
-            color = (160,235,160) if i in selected else GRAY
-            pygame.draw.rect(screen, color, rect, border_radius=6)
-            pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-            screen.blit(FONT.render(name, True, BLACK), (rect.x+10, rect.y+6))
-            screen.blit(FONT_SM.render(note, True, (50,50,50)), (rect.x+10, rect.y+26))
-            btns.append((rect, i))
-        hint = "Select ALL safe choices, then press ENTER." if sc.get("multi_ok") else "Select the ONE safest option, then press ENTER."
-        screen.blit(FONT_SM.render(hint, True, BLACK), (60, HEIGHT-50))
-        pygame.display.flip()
-
-        correct_now = False
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            elif ev.type == pygame.MOUSEBUTTONDOWN:
-                for rect, i in btns:
-                    if rect.collidepoint(ev.pos):
-                        if sc.get("multi_ok"):
-                            if i in selected: selected.remove(i)
-                            else: selected.add(i)
-                        else:
-                            selected = {i}
-            elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_RETURN:
-                if sc.get("multi_ok"):
-                    if selected == sc["correct_set"]:
-                        correct_now = True
-                        total_ok += 1
-                        show_feedback("Correct!", ["Those were the safe steps."], True, back_to_menu=False)
-                        selected.clear(); idx += 1
-                    else:
-                        show_feedback("Not quite.", ["Pick only the trusted sources and research steps."], False, back_to_menu=False)
-                else:
-                    correct_index = next(i for i,(n,nn,safe) in enumerate(sc["links"]) if safe)
-                    if selected == {correct_index}:
-                        correct_now = True
-                        total_ok += 1
-                        show_feedback("Correct!", ["Official vendor pages are the safest choice."], True, back_to_menu=False)
-                        selected.clear(); idx += 1
-                    else:
-                        show_feedback("Risky choice.", ["Ads/unknown mirrors/pirated files often carry malware."], False, back_to_menu=False)
-        CLOCK.tick(60)
+BUILTIN_SOCIAL_CHAT = [
+    ("Unknown", "Hey! We have a bunch of mutual friends. Mind if I ask you something?"),
+    ("You",    ["Sure, what's up?", "Sorry, I don't talk to strangers. (Block & Report)"]),
+    ("Unknown", "I'm organizing a meetup for classmates. Which school do you go to and what's your number?"),
+    ("You",    ["I don't share personal info. (Block & Report)", "It's Lincoln High, my number is 555-12XX"]),
+    ("Unknown", "Come on, don't be shy. Also what city do you live in?"),
+    ("You",    ["Report user for harassment and block.", "It's Springfield. Also my address is 12 Maple..."]),
+]
 
-    success = (total_ok == len(scenarios))
-    show_feedback("Level 4 Completed!", ["You chose safe downloads and avoided malware.", f"Score: {total_ok}/{len(scenarios)}"], success)
-    return success
+BUILTIN_WIFI = [
+    ("Log into your bank", False),
+    ("Read a news site", True),
+    ("Send sensitive work email", False),
+    ("Use messaging app (no end-to-end encryption)", False),
+    ("Use company VPN before checking internal docs", True),
+]
 
-# Level 5 – Social Engineering / Cyberbullying
-def level_5_social_engineering():
-    chat = [
-        ("Unknown", "Hey! We have a bunch of mutual friends. Mind if I ask you something?"),
-        ("You",    ["Sure, what's up?", "Sorry, I don't talk to strangers. (Block & Report)"]),
-        ("Unknown", "I'm organizing a meetup for classmates. Which school do you go to and what's your number?"),
-        ("You",    ["I don't share personal info. (Block & Report)", "It's Lincoln High, my number is 555-12XX"]),
-        ("Unknown", "Come on, don't be shy. Also what city do you live in?"),
-        ("You",    ["Report user for harassment and block.", "It's Springfield. Also my address is 12 Maple..."]),
-    ]
-    turn = 0
-    safe_count = 0
-
-    while turn < len(chat):
-        screen.fill(WHITE)
-        screen.blit(FONT_XL.render("Level 5 – Social Engineering / Cyberbullying", True, BLUE), (40, 40))
-        y = 120
-        for i in range(turn + 1):
-            speaker, content = chat[i]
-            if speaker == "Unknown":
-                y = draw_text_multiline(screen, f"{speaker}: {content}", 60, y, FONT, BLACK, max_width=800) + 8
-            else:
-                screen.blit(FONT.render("Your reply:", True, BLACK), (60, y)); y += 8
-                opts = content
-                btns = []
-                for k, opt in enumerate(opts):
-                    rect = pygame.Rect(80, y+10 + k*48, WIDTH-160, 40)
-                    pygame.draw.rect(screen, GRAY, rect, border_radius=6)
-                    pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-                    screen.blit(FONT.render(opt, True, BLACK), (rect.x+10, rect.y+8))
-                    btns.append((rect, k))
-                pygame.display.flip()
-                choice = None
-                choosing = True
-                while choosing:
-                    for ev in pygame.event.get():
-                        if ev.type == pygame.QUIT:
-                            pygame.quit(); sys.exit()
-                        elif ev.type == pygame.MOUSEBUTTONDOWN:
-                            for rect, k in btns:
-                                if rect.collidepoint(ev.pos):
-                                    choice = k; choosing = False
-                    CLOCK.tick(60)
-                if choice == 0:
-                    safe_count += 1
-                    if "Block" in opts[0]:
-                        show_feedback("Blocked & Reported", ["You shut down the social engineering attempt."], True)
-                        return True
-                else:
-                    show_feedback("Risky reply", ["Never share personal info with strangers."], False, back_to_menu=False)
-            pygame.display.flip()
-        turn += 1
-        CLOCK.tick(60)
-
-    success = (safe_count >= 2)
-    if success:
-        show_feedback("Level 5 Completed!", ["Nice! You avoided oversharing and handled harassment."], True)
-    else:
-        show_feedback("Level 5 Completed (but risky).", ["Be quicker to block/report and avoid personal details."], False)
-    return success
+BUILTIN_FIREWALL = [
+    ("Inbound RDP from Internet", "Block"),
+    ("Inbound HTTP to server", "Allow"),
+    ("Outbound DNS from user", "Allow"),
+    ("Inbound SMB from Internet", "Block"),
+    ("Outbound HTTP/HTTPS from user", "Allow"),
+    ("Inbound SSH from Internet", "Block"),
+]
 
-# Level 6 – Public Wi-Fi
-def level_6_public_wifi():
-    vpn_toggle = Toggle(60, 160, 60, 28, "VPN", initial=False)
-    https_toggle = Toggle(60, 210, 60, 28, "Force HTTPS", initial=True)
-    actions = [
-        ("Log into your bank", False),
-        ("Read a news site", True),
-        ("Send sensitive work email", False),
-        ("Use messaging app (no end-to-end encryption)", False),
-        ("Use company VPN before checking internal docs", True),
-    ]
-    selected = set()
-
-    while True:
-        screen.fill(WHITE)
-        screen.blit(FONT_XL.render("Level 6 – Public Wi-Fi Safety", True, BLUE), (40, 40))
-        draw_text_multiline(screen,"You’re on café Wi-Fi. Toggle protections and choose safe actions.",40, 100, FONT, BLACK)
-        vpn_toggle.draw(screen); https_toggle.draw(screen)
-        y = 270
-        btns = []
-        for i, (label, _) in enumerate(actions):
-            rect = pygame.Rect(60, y + i*52, WIDTH-120, 44)
-            color = (160,235,160) if i in selected else GRAY
-            pygame.draw.rect(screen, color, rect, border_radius=6)
-            pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-            screen.blit(FONT.render(label, True, BLACK), (rect.x+10, rect.y+10))
-            btns.append((rect, i))
-        screen.blit(FONT_SM.render("Click actions to select. Press ENTER to submit.", True, BLACK), (60, HEIGHT-50))
-        pygame.display.flip()
-
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            elif ev.type == pygame.MOUSEBUTTONDOWN:
-                if vpn_toggle.toggle(ev.pos): pass
-                elif https_toggle.toggle(ev.pos): pass
-                else:
-                    for rect, i in btns:
-                        if rect.collidepoint(ev.pos):
-                            if i in selected: selected.remove(i)
-                            else: selected.add(i)
-            elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_RETURN:
-                ok = True
-                for i in selected:
-                    label, _ = actions[i]
-                    if "bank" in label.lower() or "work email" in label.lower() or "internal" in label.lower():
-                        if not vpn_toggle.value or not https_toggle.value:
-                            ok = False
-                if any("messaging" in actions[i][0].lower() for i in selected):
-                    ok = False
-                if ok and selected:
-                    show_feedback("Smart choices!", ["You used protections and avoided sensitive tasks without VPN."], True)
-                    return True
-                else:
-                    show_feedback("Some choices were risky.", ["Enable VPN and avoid sensitive tasks on public Wi-Fi."], False)
-                    return False
-        CLOCK.tick(60)
+BUILTIN_PRIVACY = [
+    {
+        "app": "PhotoShare",
+        "desc": "Requests access to your camera, location, and contacts to 'enhance your experience'.",
+        "safe": {"Camera"},
+        "question": "Which permissions are REASONABLE for this app?"
+    },
+    {
+        "app": "WeatherNow",
+        "desc": "Wants access to your exact location, microphone, and storage.",
+        "safe": {"Location"},
+        "question": "Which permissions make sense for a weather app?"
+    },
+    {
+        "app": "FlashlightPro",
+        "desc": "Requests access to your camera, contacts, and location.",
+        "safe": set(),
+        "question": "Should a flashlight app need any permissions?"
+    },
+    {
+        "app": "MapFinder",
+        "desc": "Requests access to your location, storage, and Bluetooth.",
+        "safe": {"Location"},
+        "question": "Which permissions are appropriate for a map/navigation app?"
+    },
+    {
+        "app": "MusicStream",
+        "desc": "Requests access to your microphone, storage, and location.",
+        "safe": {"Microphone", "Storage"},
+        "question": "Which permissions are reasonable for a music streaming app?"
+    },
+    {
+        "app": "NoteSaver",
+        "desc": "Wants access to storage and contacts.",
+        "safe": {"Storage"},
+        "question": "Which permissions are necessary for a note-taking app?"
+    },
+    {
+        "app": "GameWorld",
+        "desc": "Requests camera, microphone, and location for in-game AR features.",
+        "safe": {"Camera", "Location"},
+        "question": "Which permissions are reasonable for an AR-based game?"
+    },
+]
 
-# Level 7 – Firewall Rules
-def level_7_firewall_rules():
-    traffic = [
-        ("Inbound RDP from Internet", "Block"),
-        ("Inbound HTTP to server", "Allow"),
-        ("Outbound DNS from user", "Allow"),
-        ("Inbound SMB from Internet", "Block"),
-        ("Outbound HTTP/HTTPS from user", "Allow"),
-        ("Inbound SSH from Internet", "Block"),
-    ]
-    choices = ["Allow", "Block"]
-    selection = [None]*len(traffic)
-
-    while True:
-        screen.fill(WHITE)
-        screen.blit(FONT_XL.render("Level 7 – Firewall Configuration", True, BLUE), (40, 40))
-        draw_text_multiline(screen, "Set rules to keep users safe while allowing normal web activity.", 40, 100, FONT, BLACK)
-        btns = []
-        y = 150
-        for i, (desc, correct) in enumerate(traffic):
-            screen.blit(FONT.render(f"{i+1}. {desc}", True, BLACK), (60, y+i*58))
-            for j, c in enumerate(choices):
-                rect = pygame.Rect(520 + j*160, y-8 + i*58, 140, 40)
-                color = (160,235,160) if selection[i] == c else GRAY
-                pygame.draw.rect(screen, color, rect, border_radius=6)
-                pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-                screen.blit(FONT.render(c, True, BLACK), (rect.x+10, rect.y+8))
-                btns.append((rect, i, c))
-        screen.blit(FONT_SM.render("Click to choose for each rule. Press ENTER to evaluate.", True, BLACK), (60, HEIGHT-50))
-        pygame.display.flip()
-
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            elif ev.type == pygame.MOUSEBUTTONDOWN:
-                for rect, i, c in btns:
-                    if rect.collidepoint(ev.pos):
-                        selection[i] = c
-            elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_RETURN:
-                if None in selection:
-                    show_feedback("Complete all rules first.", ["Every entry needs Allow or Block."], False, back_to_menu=False)
-                else:
-                    correct_all = True
-                    for i, (_, corr) in enumerate(traffic):
-                        if selection[i] != corr:
-                            correct_all = False
-                            break
-                    if correct_all:
-                        show_feedback("Firewall configured correctly!", ["You blocked risky inbound services and allowed needed traffic."], True)
-                        return True
-                    else:
-                        show_feedback("Some rules are unsafe.", ["Revise inbound services from Internet (RDP/SSH/SMB should be blocked)."], False, back_to_menu=False)
-        CLOCK.tick(60)
+BUILTIN_RANSOMWARE = [
+    ("Disconnect from network immediately", True),
+    ("Pay the ransom to get files back", False),
+    ("Notify IT/security team", True),
+    ("Try random decryptor downloaded from unknown site", False),
+    ("Restore from clean backups", True),
+    ("Ignore it and keep working", False),
+]
 
-# Level 8 – Data Privacy (permissions)
-def level_8_data_privacy():
-    # Master list of unique daily scenarios
-    scenarios = [
-        {
-            "app": "PhotoShare",
-            "desc": "Requests access to your camera, location, and contacts to 'enhance your experience'.",
-            "safe": {"Camera"},
-            "question": "Which permissions are REASONABLE for this app?"
-        },
-        {
-            "app": "WeatherNow",
-            "desc": "Wants access to your exact location, microphone, and storage.",
-            "safe": {"Location"},
-            "question": "Which permissions make sense for a weather app?"
-        },
-        {
-            "app": "FlashlightPro",
-            "desc": "Requests access to your camera, contacts, and location.",
-            "safe": set(),
-            "question": "Should a flashlight app need any permissions?"
-        },
-        {
-            "app": "MapFinder",
-            "desc": "Requests access to your location, storage, and Bluetooth.",
-            "safe": {"Location"},
-            "question": "Which permissions are appropriate for a map/navigation app?"
-        },
-        {
-            "app": "MusicStream",
-            "desc": "Requests access to your microphone, storage, and location.",
-            "safe": {"Microphone", "Storage"},
-            "question": "Which permissions are reasonable for a music streaming app?"
-        },
-        {
-            "app": "NoteSaver",
-            "desc": "Wants access to storage and contacts.",
-            "safe": {"Storage"},
-            "question": "Which permissions are necessary for a note-taking app?"
-        },
-        {
-            "app": "GameWorld",
-            "desc": "Requests camera, microphone, and location for in-game AR features.",
-            "safe": {"Camera", "Location"},
-            "question": "Which permissions are reasonable for an AR-based game?"
-        },
-    ]
+FIREWALL_CHOICES = ["Allow", "Block"]
+
+PRIVACY_OPTIONS = ["Camera", "Location", "Contacts", "Microphone", "Storage", "Bluetooth"]
+PRIVACY_DAYS = 5
+
+TWO_FA_TIME_LIMIT = 30  # seconds
+
+RANSOMWARE_CORRECT = {0,2,4}
+RANSOMWARE_TIME_LIMIT = 45  # seconds
+
+# =========================
+# Scenario packs
+# =========================
+# Level content is read from scenario packs: one file per topic, memory-mapped, so
+# a session only decodes the items it actually shows. Layout (little-endian):
+#
+#   header  magic "CQPK", version, reserved, item count, index offset,
+#           meta offset, meta length                       (PACK_HEADER, 32 bytes)
+#   index   per item: offset, length, topic id, difficulty, flags  (PACK_ENTRY, 16 bytes)
+#   items   one compact UTF-8 JSON document each (sets are tagged {"$set": [...]})
+#   meta    JSON {"name": ..., "topics": [...]}; topic ids index this list
+#
+# The built-in content above is written to a pack in the user cache on first use
+# (keyed by a hash of the content); packs found in PACK_DIR take precedence.
+PACK_MAGIC = b"CQPK"
+PACK_VERSION = 1
+PACK_HEADER = struct.Struct("<4sHHIQQI")
+PACK_ENTRY = struct.Struct("<QIHBB")
+PACK_DIR = os.environ.get("CYBERQUIZ_PACK_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "packs"))
+PACK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cyberquiz", "packs")
+
+BUILTIN_PACKS = {
+    "phishing": BUILTIN_PHISHING,
+    "roboscam": BUILTIN_ROBOSCAM,
+    "password_rules": BUILTIN_PASSWORD_RULES,
+    "malware": BUILTIN_MALWARE,
+    "social_chat": BUILTIN_SOCIAL_CHAT,
+    "wifi": BUILTIN_WIFI,
+    "firewall": BUILTIN_FIREWALL,
+    "privacy": BUILTIN_PRIVACY,
+    "ransomware": BUILTIN_RANSOMWARE,
+}
+
+def _encode_value(obj):
+    if isinstance(obj, (set, frozenset)):
+        return {"$set": sorted(obj)}
+    raise TypeError(f"cannot store {type(obj).__name__} in a scenario pack")
+
+def _decode_value(obj):
+    if len(obj) == 1 and "$set" in obj:
+        return set(obj["$set"])
+    return obj
+
+def encode_item(item):
+    return json.dumps(item, default=_encode_value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def decode_item(data):
+    return json.loads(data, object_hook=_decode_value)
+
+def item_tags(item, default_topic):
+    # Items may carry their own "topic" and "difficulty" (1-255); the index stores both.
+    if isinstance(item, dict):
+        return item.get("topic", default_topic), int(item.get("difficulty", 1))
+    return default_topic, 1
+
+def pack_bytes(name, items):
+    topics = []
+    blobs = []
+    entries = []
+    for item in items:
+        topic, difficulty = item_tags(item, name)
+        if topic not in topics:
+            topics.append(topic)
+        blobs.append(encode_item(item))
+        entries.append((topics.index(topic), difficulty))
+    meta = json.dumps({"name": name, "topics": topics}).encode("utf-8")
+    offset = PACK_HEADER.size + PACK_ENTRY.size * len(blobs)
+    index = bytearray()
+    for blob, (topic_id, difficulty) in zip(blobs, entries):
+        index += PACK_ENTRY.pack(offset, len(blob), topic_id, difficulty, 0)
+        offset += len(blob)
+    header = PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(blobs), PACK_HEADER.size, offset, len(meta))
+    return b"".join([header, bytes(index), *blobs, meta])
+
+def write_pack(path, name, items, data=None):
+    if data is None:
+        data = pack_bytes(name, items)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+class ScenarioPack:
+    def __init__(self, path, cache_size=256):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < PACK_HEADER.size:
+            raise ValueError(f"not a scenario pack: {path}")
+        magic, version, _, count, index_offset, meta_offset, meta_len = PACK_HEADER.unpack_from(self.map, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"not a scenario pack (or unsupported version): {path}")
+        self.count = count
+        self.index_offset = index_offset
+        meta = json.loads(self.map[meta_offset:meta_offset + meta_len])
+        self.name = meta["name"]
+        self.topics = meta["topics"]
+        self.cache_size = cache_size
+        self.decoded = OrderedDict()
+        self.decodes = 0
+
+    def __len__(self):
+        return self.count
+
+    def entry(self, i):
+        return PACK_ENTRY.unpack_from(self.map, self.index_offset + i * PACK_ENTRY.size)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        item = self.decoded.get(i)
+        if item is not None:
+            self.decoded.move_to_end(i)
+            return item
+        offset, length, _, _, _ = self.entry(i)
+        item = decode_item(self.map[offset:offset + length])
+        self.decodes += 1
+        self.decoded[i] = item
+        if len(self.decoded) > self.cache_size:
+            self.decoded.popitem(last=False)
+        return item
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def topic(self, i):
+        return self.topics[self.entry(i)[2]]
+
+    def difficulty(self, i):
+        return self.entry(i)[3]
+
+    def close(self):
+        self.map.close()
+
+_private_temp_dir = None
+
+def private_temp_dir():
+    # Fallback when the home cache is unwritable. The shared temp dir is writable by
+    # every user, so packs go in a per-user 0700 subdirectory we verify we own.
+    # Without POSIX uids (Windows) a fresh mkdtemp directory is used per process.
+    global _private_temp_dir
+    getuid = getattr(os, "getuid", None)
+    if getuid is None:
+        if _private_temp_dir is None:
+            _private_temp_dir = tempfile.mkdtemp(prefix="cyberquiz-")
+        return _private_temp_dir
+    path = os.path.join(tempfile.gettempdir(), f"cyberquiz-{getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != getuid() or st.st_mode & 0o077:
+        raise OSError(f"refusing to use {path}: not a private directory owned by this user")
+    return path
+
+def builtin_pack_path(name):
+    # A cached pack is only reused if its bytes match what the built-in content
+    # packs to; anything else (stale, truncated, planted) is rewritten.
+    data = pack_bytes(name, BUILTIN_PACKS[name])
+    digest = hashlib.sha1(data).hexdigest()[:12]
+    for directory in (lambda: PACK_CACHE_DIR, private_temp_dir):
+        try:
+            directory = directory()
+            path = os.path.join(directory, f"{name}-{digest}.cqpack")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    if f.read() == data:
+                        return path
+            os.makedirs(directory, exist_ok=True)
+            return write_pack(path, name, None, data)
+        except OSError:
+            continue
+    raise OSError(f"cannot write scenario pack for {name}")
+
+_open_packs = {}
+
+def open_pack(name):
+    pack = _open_packs.get(name)
+    if pack is None:
+        shipped = os.path.join(PACK_DIR, f"{name}.cqpack")
+        pack = ScenarioPack(shipped if os.path.exists(shipped) else builtin_pack_path(name))
+        _open_packs[name] = pack
+    return pack
+
+class LazyPack:
+    # Module-level handle for a pack; the file is opened and mapped on first access.
+    def __init__(self, name):
+        self.name = name
+
+    def pack(self):
+        return open_pack(self.name)
+
+    def __len__(self):
+        return len(self.pack())
+
+    def __getitem__(self, i):
+        return self.pack()[i]
+
+    def __iter__(self):
+        return iter(self.pack())
+
+    def __getattr__(self, attr):
+        return getattr(self.pack(), attr)
+
+PHISHING_SCENARIOS = LazyPack("phishing")
+ROBOSCAM_STAGES = LazyPack("roboscam")
+PASSWORD_RULES = LazyPack("password_rules")
+MALWARE_SCENARIOS = LazyPack("malware")
+SOCIAL_CHAT = LazyPack("social_chat")
+WIFI_ACTIONS = LazyPack("wifi")
+FIREWALL_TRAFFIC = LazyPack("firewall")
+PRIVACY_SCENARIOS = LazyPack("privacy")
+RANSOMWARE_ACTIONS = LazyPack("ransomware")
+
+def build_packs(directory):
+    os.makedirs(directory, exist_ok=True)
+    for name, items in BUILTIN_PACKS.items():
+        print(write_pack(os.path.join(directory, f"{name}.cqpack"), name, items))
+
+# =========================
+# Sampling (no-repeat draws)
+# =========================
+# Draws k items from a pack filtered by topic and difficulty. SamplingIndex keeps
+# per-(topic, difficulty) buckets of item numbers built from the pack index alone
+# (no item is decoded), and draws by rejection, so a draw costs O(k) whatever the
+# bank size. A trainee's SeenBitmap (one bit per item, persisted per pack) keeps
+# items from repeating across sessions; once every matching item has been seen the
+# bits for those buckets are cleared and a new cycle starts.
+SEEN_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cyberquiz", "seen")
+
+def trainee_name():
+    name = os.environ.get("CYBERQUIZ_TRAINEE") or getpass.getuser()
+    return re.sub(r"[^\w.-]", "_", name)
+
+class SeenBitmap:
+    def __init__(self, path, size):
+        self.path = path
+        self.bits = bytearray((size + 7) // 8)
+        try:
+            with open(path, "rb") as f:
+                data = f.read(len(self.bits))
+            self.bits[:len(data)] = data
+        except OSError:
+            pass
+
+    def __contains__(self, i):
+        return bool(self.bits[i >> 3] & (1 << (i & 7)))
+
+    def add(self, i):
+        self.bits[i >> 3] |= 1 << (i & 7)
+
+    def discard(self, i):
+        self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(self.bits)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+def trainee_seen(pack, trainee=None):
+    path = os.path.join(SEEN_DIR, trainee or trainee_name(), f"{pack.name}.bits")
+    return SeenBitmap(path, len(pack))
+
+# Default for seen= arguments: the current trainee's persisted bitmap. Harnesses
+# pass seen=None so they neither depend on nor advance a real trainee's history.
+TRAINEE_HISTORY = object()
+
+class SamplingIndex:
+    def __init__(self, pack):
+        self.pack = pack
+        self.buckets = {}
+        for i in range(len(pack)):
+            _, _, topic_id, difficulty, _ = pack.entry(i)
+            self.buckets.setdefault((pack.topics[topic_id], difficulty), array("I")).append(i)
+
+    def matching(self, topic=None, difficulty=None):
+        # difficulty is an int or an inclusive (low, high) pair.
+        if isinstance(difficulty, int):
+            difficulty = (difficulty, difficulty)
+        return [b for (t, d), b in self.buckets.items()
+                if (topic is None or t == topic) and (difficulty is None or difficulty[0] <= d <= difficulty[1])]
+
+    def draw(self, k, rng, topic=None, difficulty=None, seen=None):
+        buckets = self.matching(topic, difficulty)
+        total = sum(len(b) for b in buckets)
+        if k > total:
+            raise ValueError(f"cannot draw {k} items from {total} matching items in pack {self.pack.name!r}")
+        picked = []
+        chosen = set()
+        misses = 0
+        while len(picked) < k:
+            if misses > 4 * k + 16:
+                # Mostly seen: fall back to the unseen remainder, or start a new cycle.
+                need = k - len(picked)
+                unseen = [i for b in buckets for i in b if i not in chosen and (seen is None or i not in seen)]
+                if len(unseen) < need:
+                    picked += unseen
+                    chosen.update(unseen)
+                    need -= len(unseen)
+                    for b in buckets:
+                        for i in b:
+                            seen.discard(i)
+                    unseen = [i for b in buckets for i in b if i not in chosen]
+                picked += rng.sample(unseen, need)
+                break
+            r = rng.randrange(total)
+            for b in buckets:
+                if r < len(b):
+                    i = b[r]
+                    break
+                r -= len(b)
+            if i in chosen or (seen is not None and i in seen):
+                misses += 1
+                continue
+            chosen.add(i)
+            picked.append(i)
+        if seen is not None:
+            for i in picked:
+                seen.add(i)
+            seen.save()
+        return picked
+
+_sampling_indexes = {}
+
+def sampling_index(pack):
+    index = _sampling_indexes.get(pack.name)
+    if index is None:
+        index = _sampling_indexes[pack.name] = SamplingIndex(pack.pack() if isinstance(pack, LazyPack) else pack)
+    return index
+
+# =========================
+# Breached passwords
+# =========================
+# An offline breach list (one password per line, millions of lines) is compiled
+# into a Bloom filter file and memory-mapped, so a lookup reads k bytes from the
+# map and nothing is loaded into Python objects. False positives run at the rate
+# chosen at build time; there are no false negatives.
+BLOOM_HEADER = struct.Struct("<4sHHQQ")  # magic, version, hashes, bits, entries
+BLOOM_MAGIC = b"CQBF"
+BLOOM_VERSION = 1
+BREACH_FILTER_PATH = os.environ.get("CYBERQUIZ_BREACHED", os.path.join(PACK_DIR, "breached.cqbloom"))
+
+def bloom_hashes(data, k, m):
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % m for i in range(k)]
+
+def build_breach_filter(src, dst, fp_rate=0.001):
+    with open(src, "rb") as f:
+        n = sum(1 for line in f if line.strip(b"\r\n"))
+    m = max(64, math.ceil(-max(n, 1) * math.log(fp_rate) / math.log(2) ** 2))
+    k = max(1, round(m / max(n, 1) * math.log(2)))
+    bits = bytearray((m + 7) // 8)
+    with open(src, "rb") as f:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            if line:
+                for bit in bloom_hashes(line, k, m):
+                    bits[bit >> 3] |= 1 << (bit & 7)
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, BLOOM_VERSION, k, m, n))
+        f.write(bits)
+    os.replace(tmp, dst)
+    print(f"{dst}: {n} passwords, {m // 8} bytes, {k} hashes")
+    return dst
+
+class BreachFilter:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.k, self.m, self.count = BLOOM_HEADER.unpack_from(self.map, 0)
+        if magic != BLOOM_MAGIC or version != BLOOM_VERSION:
+            raise ValueError(f"{path}: not a breach filter (version {BLOOM_VERSION})")
+
+    def __contains__(self, password):
+        base = BLOOM_HEADER.size
+        for bit in bloom_hashes(password.encode("utf-8"), self.k, self.m):
+            if not self.map[base + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+_breach_filter = []
+
+def breach_filter():
+    # None when no breach list has been built; the analyzer then skips the check.
+    if not _breach_filter:
+        try:
+            _breach_filter.append(BreachFilter(BREACH_FILTER_PATH))
+        except (OSError, ValueError):
+            _breach_filter.append(None)
+    return _breach_filter[0]
+
+# =========================
+# Headless level engine
+# =========================
+# The rules of every level as a pure state machine: step(state, action) returns the
+# new state and an Outcome, without touching the display. The pygame levels below
+# are drawn from these states, and BotRunner plays them with scripted or random
+# policies for simulation and regression runs.
+#
+# Actions are tuples: ("toggle", i), ("choose", i), ("set", i, value),
+# ("switch", name), ("text", field, value), ("submit",) and ("timeout",).
+Outcome = namedtuple("Outcome", "feedback done passed")
+CONTINUE = Outcome((), False, False)
+SUBMIT = ("submit",)
+TIMEOUT = ("timeout",)
+
+def feedback(title, lines, success):
+    return (title, tuple(lines), success)
+
+def outcome(*feedbacks, done=False, passed=False):
+    return Outcome(tuple(feedbacks), done, passed)
+
+def toggle_actions(n):
+    return [("toggle", i) for i in range(n)]
+
+def toggles_to(selected, target):
+    return [("toggle", i) for i in sorted(set(selected) ^ set(target))]
+
+def bitmask(indices):
+    mask = 0
+    for i in indices:
+        mask |= 1 << i
+    return mask
+
+COMMON_SEQUENCES = ("password", "123456", "qwerty", "abc123")
+COMMON_WINDOW = max(len(c) for c in COMMON_SEQUENCES)
+PASSWORD_SPECIALS = frozenset("!@#$%")
+
+class PasswordAnalyzer:
+    # Classifies each character once. update() keeps the scan of the longest shared
+    # prefix with the previous text, so a keystroke or backspace costs O(1) work
+    # (plus one breach lookup) instead of re-scanning the whole password.
+    def __init__(self, breached=None):
+        self.breached = breached
+        self.text = ""
+        self.scan = [(0, 0, 0, 0, False)]  # upper, lower, digit, special, common, per prefix length
+        self.is_breached = False
+
+    def update(self, text):
+        if text == self.text:
+            return self
+        keep = 0
+        for a, b in zip(self.text, text):
+            if a != b:
+                break
+            keep += 1
+        del self.scan[keep + 1:]
+        for i in range(keep, len(text)):
+            upper, lower, digit, special, common = self.scan[-1]
+            c = text[i]
+            if "A" <= c <= "Z": upper += 1
+            elif "a" <= c <= "z": lower += 1
+            elif "0" <= c <= "9": digit += 1
+            elif c in PASSWORD_SPECIALS: special += 1
+            if not common:
+                tail = text[max(0, i + 1 - COMMON_WINDOW):i + 1].lower()
+                common = any(tail.endswith(seq) for seq in COMMON_SEQUENCES)
+            self.scan.append((upper, lower, digit, special, common))
+        self.text = text
+        self.is_breached = bool(text) and self.breached is not None and text in self.breached
+        return self
+
+    def messages(self):
+        upper, lower, digit, special, common = self.scan[-1]
+        msgs = []
+        if len(self.text) < 12: msgs.append("Must be at least 12 characters.")
+        if not upper: msgs.append("Add at least one uppercase letter.")
+        if not lower: msgs.append("Add at least one lowercase letter.")
+        if not digit: msgs.append("Add at least one digit.")
+        if not special: msgs.append("Add at least one special (!@#$%).")
+        if common: msgs.append("Avoid common words/sequences.")
+        if self.is_breached: msgs.append("This password appears in a known breach list.")
+        return msgs
+
+def check_password(pw):
+    return PasswordAnalyzer(breach_filter()).update(pw).messages()
+
+# Strength estimate for the live meter, in the spirit of zxcvbn: the password is
+# covered by the cheapest sequence of patterns (dictionary words with case and l33t
+# variants, keyboard walks, dates, repeats, alphabetic/numeric sequences, or
+# brute-forced characters) and the guesses multiply along it. Every pattern is found
+# from the characters ending at one position, so the per-prefix tables are kept and a
+# keystroke only scans the new suffix (a window of at most STRENGTH_WINDOW characters).
+STRENGTH_WORDS = (
+    "password", "123456", "qwerty", "abc123", "letmein", "welcome", "monkey", "dragon",
+    "football", "iloveyou", "admin", "login", "princess", "sunshine", "master", "shadow",
+    "baseball", "superman", "trustno1", "hello", "freedom", "whatever", "secret", "love",
+    "summer", "winter", "spring", "autumn", "charlie", "michael", "jessica", "ashley",
+    "daniel", "thomas", "jordan", "hunter", "killer", "soccer", "hockey", "batman",
+    "starwars", "pokemon", "ranger", "harley", "buster", "pepper", "ginger", "cookie",
+    "flower", "angel", "baby", "family", "friend", "happy", "lucky", "money", "music",
+    "purple", "orange", "banana", "apple", "google", "computer", "internet", "security",
+    "cyber", "pass", "blue", "red", "green", "black", "silver", "golden", "falcon", "eagle",
+    "tiger", "lion", "wolf", "bear", "river", "ocean", "storm", "thunder", "rainbow",
+    "yellow", "cheese", "coffee", "chicken", "pizza", "matrix", "ninja", "mustang",
+    "corvette", "ferrari", "london", "paris", "america", "canada", "india",
+    "school", "office", "company", "house", "horse", "zxcvbn", "asdf", "welcome1",
+    "admin123", "changeme", "default", "guest", "root", "test", "user", "qazwsx",
+)
+STRENGTH_RANKS = {}
+for rank, word in enumerate(STRENGTH_WORDS, 1):
+    STRENGTH_RANKS.setdefault(word, rank)
+STRENGTH_WINDOW = max(10, max(len(w) for w in STRENGTH_WORDS))  # 10 fits "dd/mm/yyyy"
+L33T_TABLES = (str.maketrans("4@38!1|0$572+", "aaebiiiosstzt"), str.maketrans("4@38!1|0$572+", "aaebillosstzt"))
+KEYBOARD_ROWS = (("`1234567890-=", "~!@#$%^&*()_+"), ("qwertyuiop[]\\", "QWERTYUIOP{}|"),
+                 ("asdfghjkl;'", 'ASDFGHJKL:"'), ("zxcvbnm,./", "ZXCVBNM<>?"))
+KEYBOARD_STAGGER = (0, 0.5, 0.75, 1.25)
+KEYBOARD_POS = {}
+for row, keys in enumerate(KEYBOARD_ROWS):
+    for keyset in keys:
+        for col, ch in enumerate(keyset):
+            KEYBOARD_POS[ch] = (row, col + KEYBOARD_STAGGER[row])
+KEYBOARD_STARTS = len(KEYBOARD_POS) // 2
+KEYBOARD_DEGREE = 4
+BRUTEFORCE_CARDINALITY = 10
+MIN_MULTICHAR_GUESSES = 50
+DATE_PATTERNS = (re.compile(r"(\d{1,2})([-/._ ]?)(\d{1,2})\2(\d{2}|\d{4})"), re.compile(r"(\d{4})([-/._ ]?)(\d{1,2})\2(\d{1,2})"))
+YEAR_PATTERN = re.compile(r"(19|20)\d\d")
+REFERENCE_YEAR = time.localtime().tm_year
+CRACK_RATE = 1e4  # guesses per second against a slow (bcrypt-like) offline hash
+STRENGTH_THRESHOLDS = (3, 6, 8, 10)  # log10 guesses for scores 1..4
+
+def char_cardinality(c):
+    if c.isdigit(): return 10
+    if c.isalpha(): return 26
+    return 33
+
+def case_variations(token):
+    upper = sum(1 for c in token if c.isupper())
+    lower = sum(1 for c in token if c.islower())
+    if not upper:
+        return 1
+    if not lower or (upper == 1 and (token[0].isupper() or token[-1].isupper())):
+        return 2
+    return sum(math.comb(upper + lower, i) for i in range(1, min(upper, lower) + 1))
+
+def date_guesses(token):
+    if YEAR_PATTERN.fullmatch(token):
+        return max(abs(int(token) - REFERENCE_YEAR), 20)
+    for pattern in DATE_PATTERNS:
+        m = pattern.fullmatch(token)
+        if not m:
+            continue
+        a, sep, b, c = m.groups()
+        if len(a) == 4:
+            year, parts = int(a), (int(b), int(c))
+        else:
+            year, parts = int(c), (int(a), int(b))
+            if len(c) == 2:
+                year += 1900 if year > 50 else 2000
+        if any(1 <= m_ <= 12 and 1 <= d <= 31 for m_, d in (parts, parts[::-1])):
+            return 365 * max(abs(year - REFERENCE_YEAR), 20) * (4 if sep else 1)
+    return None
+
+StrengthMatch = namedtuple("StrengthMatch", "start pattern token log_guesses")
+
+class StrengthEstimator:
+    def __init__(self):
+        self.text = ""
+        self.best = [0.0]    # log10 guesses for each prefix
+        self.back = [None]   # last StrengthMatch of the cheapest cover of each prefix
+        self.runs = []       # (repeat, sequence, delta, walk, turns, direction) ending at each char
+
+    def update(self, text):
+        if text == self.text:
+            return self
+        keep = 0
+        for a, b in zip(self.text, text):
+            if a != b:
+                break
+            keep += 1
+        del self.best[keep + 1:], self.back[keep + 1:], self.runs[keep:]
+        for j in range(keep, len(text)):
+            self.extend(text, j)
+        self.text = text
+        return self
+
+    def extend(self, text, j):
+        c = text[j]
+        prev = text[j - 1] if j else None
+        repeat, sequence, delta, walk, turns, direction = self.runs[-1] if j else (0, 0, 0, 0, 0, None)
+        repeat = repeat + 1 if c == prev else 1
+        step = ord(c) - ord(prev) if prev else 0
+        if abs(step) == 1 and c.isalnum() and prev.isalnum() and c.isdigit() == prev.isdigit() and (sequence < 2 or step == delta):
+            sequence, delta = sequence + 1, step
+        else:
+            sequence, delta = 1, 0
+        here, there = KEYBOARD_POS.get(c), KEYBOARD_POS.get(prev)
+        if here and there and here != there and abs(here[0] - there[0]) <= 1 and abs(here[1] - there[1]) <= 1:
+            way = (here[0] - there[0], round((here[1] - there[1]) * 4))
+            turns = turns + (walk > 1 and way != direction)
+            walk, direction = walk + 1, way
+        else:
+            walk, turns, direction = 1, 0, None
+        self.runs.append((repeat, sequence, delta, walk, turns, direction))
+
+        candidates = [StrengthMatch(j, "bruteforce", c, math.log10(BRUTEFORCE_CARDINALITY))]
+        for start in range(max(0, j + 1 - STRENGTH_WINDOW), j - 1):
+            token = text[start:j + 1]
+            lowered = token.lower()
+            rank = STRENGTH_RANKS.get(lowered)
+            if rank:
+                candidates.append(StrengthMatch(start, "dictionary", token, math.log10(rank * case_variations(token))))
+            else:
+                for table in L33T_TABLES:
+                    plain = lowered.translate(table)
+                    if plain != lowered and plain in STRENGTH_RANKS:
+                        subs = sum(1 for a, b in zip(lowered, plain) if a != b)
+                        candidates.append(StrengthMatch(start, "l33t", token, math.log10(STRENGTH_RANKS[plain] * case_variations(token) * 2 ** subs)))
+                        break
+            if len(token) >= 4:
+                guesses = date_guesses(token)
+                if guesses:
+                    candidates.append(StrengthMatch(start, "date", token, math.log10(guesses)))
+            # a block typed twice costs the first block plus one doubling
+            half = len(token) // 2
+            if len(token) % 2 == 0 and token[:half] == token[half:]:
+                candidates.append(StrengthMatch(start, "repeat", token, self.best[start + half] - self.best[start] + math.log10(2)))
+        if repeat >= 3:
+            candidates.append(StrengthMatch(j + 1 - repeat, "repeat", text[j + 1 - repeat:j + 1], math.log10(char_cardinality(c) * repeat)))
+        if sequence >= 3:
+            first = text[j + 1 - sequence]
+            base = 4 if first in "aAzZ019" else char_cardinality(first)
+            candidates.append(StrengthMatch(j + 1 - sequence, "sequence", text[j + 1 - sequence:j + 1], math.log10(base * sequence * (2 if delta < 0 else 1))))
+        if walk >= 3:
+            candidates.append(StrengthMatch(j + 1 - walk, "keyboard", text[j + 1 - walk:j + 1], math.log10(KEYBOARD_STARTS * walk * KEYBOARD_DEGREE ** turns)))
+
+        best = None
+        for match in candidates:
+            log_guesses = match.log_guesses
+            if match.pattern != "bruteforce":
+                log_guesses = max(log_guesses, math.log10(MIN_MULTICHAR_GUESSES))
+            total = self.best[match.start] + log_guesses
+            if best is None or total < best[0]:
+                best = (total, match)
+        self.best.append(best[0])
+        self.back.append(best[1])
+
+    def log_guesses(self):
+        return self.best[-1]
+
+    def score(self):
+        return sum(1 for t in STRENGTH_THRESHOLDS if self.best[-1] >= t)
+
+    def matches(self):
+        found = []
+        end = len(self.text)
+        while end:
+            match = self.back[end]
+            found.append(match)
+            end = match.start
+        return found[::-1]
+
+    def crack_time(self):
+        seconds = 10 ** self.best[-1] / CRACK_RATE
+        if seconds >= 100 * 3.15e7:
+            return "centuries"
+        for unit, size in (("years", 3.15e7), ("days", 86400), ("hours", 3600), ("minutes", 60), ("seconds", 1)):
+            if seconds >= size:
+                return f"{seconds / size:.0f} {unit}"
+        return "instantly"
+
+    def warning(self):
+        patterns = [m for m in self.matches() if m.pattern != "bruteforce"]
+        if not patterns:
+            return ""
+        m = max(patterns, key=lambda m: len(m.token))
+        return {
+            "dictionary": f"\"{m.token}\" is a common word.",
+            "l33t": f"\"{m.token}\" is a common word with predictable substitutions.",
+            "date": f"\"{m.token}\" looks like a date or year.",
+            "repeat": f"\"{m.token}\" is repeated.",
+            "sequence": f"\"{m.token}\" is a simple sequence.",
+            "keyboard": f"\"{m.token}\" is a keyboard pattern.",
+        }[m.pattern]
+
+class LevelRules:
+    number = 0
+    name = ""
+
+    def initial(self, rng):
+        raise NotImplementedError
+
+    def step(self, state, action):
+        raise NotImplementedError
+
+    def actions(self, state):
+        raise NotImplementedError
+
+    def solution(self, state):
+        # Actions a perfect player takes from this state to clear the current step.
+        raise NotImplementedError
+
+    # Attempt logging: the question on screen (named like answer_key() where the
+    # level has a key), the options an answering action picked as a bitmask, and
+    # whether it was right. Actions other than choose/submit/timeout are not answers.
+    def question(self, state):
+        return f"L{self.number}"
+
+    def answer(self, state, action):
+        if action[0] == "choose":
+            return 1 << action[1]
+        if action[0] == "submit" and hasattr(state, "selected"):
+            return bitmask(state.selected)
+        return None
+
+    def correct(self, state, action, out):
+        # Judged from the first feedback shown for the action; None if there was none.
+        return out.feedback[0][2] if out.feedback else None
+
+    # Session logs: typed fields that may hold a trainee's real secret. Unless raw
+    # recording is on, the log keeps redact()'s stand-in for them (None drops the
+    # keystroke) and, on submit, grade_secret()'s verdict for replay to use instead.
+    secret_fields = ()
+
+    def redact(self, field, value):
+        return None
+
+    def grade_secret(self, state):
+        return None
+
+PhishingState = namedtuple("PhishingState", "step phase selected")
+
+class PhishingRules(LevelRules):
+    number = 1
+    name = "Phishing"
+
+    def initial(self, rng):
+        return PhishingState(0, self.first_phase(0), frozenset())
+
+    def first_phase(self, step):
+        return "flags" if "redflag_set" in PHISHING_SCENARIOS[step] else "select"
+
+    def actions(self, state):
+        sc = PHISHING_SCENARIOS[state.step]
+        if state.phase == "flags":
+            return toggle_actions(len(sc["email"]["redflags"])) + [SUBMIT]
+        if state.phase == "action":
+            return [("choose", i) for i in range(len(sc["options"]))]
+        return toggle_actions(len(sc["options"])) + [SUBMIT]
+
+    def solution(self, state):
+        sc = PHISHING_SCENARIOS[state.step]
+        if state.phase == "flags":
+            return toggles_to(state.selected, sc["redflag_set"]) + [SUBMIT]
+        if state.phase == "action":
+            return [("choose", sc["correct"])]
+        return toggles_to(state.selected, sc["correct_set"]) + [SUBMIT]
+
+    def question(self, state):
+        if state.phase == "select":
+            return f"L1.{state.step + 1}"
+        return f"L1.{state.step + 1}.{state.phase}"
+
+    def correct(self, state, action, out):
+        if state.phase == "flags":
+            return state.selected == PHISHING_SCENARIOS[state.step]["redflag_set"]
+        return super().correct(state, action, out)
+
+    def advance(self, state, sc):
+        ok = feedback(*sc["feedback_ok"], True)
+        step = state.step + 1
+        if step >= len(PHISHING_SCENARIOS):
+            done = feedback("Level 1 Completed!", ["Great job dealing with phishing via email, SMS, and internal spoofing."], True)
+            return state, outcome(ok, done, done=True, passed=True)
+        return PhishingState(step, self.first_phase(step), frozenset()), outcome(ok)
+
+    def step(self, state, action):
+        sc = PHISHING_SCENARIOS[state.step]
+        kind = action[0]
+        if kind == "toggle" and state.phase != "action":
+            return state._replace(selected=state.selected ^ {action[1]}), CONTINUE
+        if kind == "choose" and state.phase == "action":
+            if action[1] == sc["correct"]:
+                return self.advance(state, sc)
+            return state, outcome(feedback(*sc["feedback_bad"], False))
+        if kind == "submit" and state.phase == "flags":
+            if state.selected == sc["redflag_set"]:
+                return state._replace(phase="action"), CONTINUE
+            return state, outcome(feedback(*sc["feedback_flags"], False))
+        if kind == "submit" and state.phase == "select":
+            if state.selected == sc["correct_set"]:
+                return self.advance(state, sc)
+            return state, outcome(feedback(*sc["feedback_bad"], False))
+        return state, CONTINUE
+
+RoboscamState = namedtuple("RoboscamState", "stage score")
+
+class RoboscamRules(LevelRules):
+    number = 2
+    name = "Robo-Scamming"
+
+    def initial(self, rng):
+        return RoboscamState(0, 0)
+
+    def actions(self, state):
+        return [("choose", i) for i in range(len(ROBOSCAM_STAGES[state.stage]["options"]))]
+
+    def solution(self, state):
+        options = ROBOSCAM_STAGES[state.stage]["options"]
+        return [("choose", next(i for i, (_, good) in enumerate(options) if good))]
+
+    def question(self, state):
+        return f"L2.{state.stage + 1}"
+
+    def step(self, state, action):
+        if action[0] != "choose":
+            return state, CONTINUE
+        _, good = ROBOSCAM_STAGES[state.stage]["options"][action[1]]
+        if good:
+            fb = feedback("Good move.", ["That’s the safe, verifiable step."], True)
+        else:
+            fb = feedback("Risky choice.", ["This is what scammers want—avoid providing info or payments."], False)
+        state = RoboscamState(state.stage + 1, state.score + (1 if good else 0))
+        if state.stage < len(ROBOSCAM_STAGES):
+            return state, outcome(fb)
+        success = (state.score == len(ROBOSCAM_STAGES))
+        lines = [f"Score: {state.score} / {len(ROBOSCAM_STAGES)}", "Report suspicious calls to official channels.", "Never pay via gift cards or share credentials."]
+        return state, outcome(fb, feedback("Call Ended – Summary", lines, success), done=True, passed=success)
+
+PasswordState = namedtuple("PasswordState", "text")
+PASSWORD_MAXLEN = 50
+# Candidate inputs offered to random bots; the last one meets every rule.
+PASSWORD_SAMPLES = ["password123", "qwerty", "Summer2024!!", "letmein", "Blue!Falcon42#River"]
+
+class PasswordRules(LevelRules):
+    number = 3
+    name = "Passwords"
+    secret_fields = ("password",)
+
+    def initial(self, rng):
+        return PasswordState("")
+
+    def actions(self, state):
+        return [("text", "password", pw) for pw in PASSWORD_SAMPLES] + [SUBMIT]
+
+    def solution(self, state):
+        if check_password(state.text):
+            return [("text", "password", PASSWORD_SAMPLES[-1]), SUBMIT]
+        return [SUBMIT]
+
+    def grade(self, text):
+        return check_password(text)
+
+    def grade_secret(self, state):
+        return self.grade(state.text)
+
+    def step(self, state, action):
+        if action[0] == "text":
+            return PasswordState(action[2][:PASSWORD_MAXLEN]), CONTINUE
+        if action[0] == "submit":
+            msgs = self.grade(state.text)
+            if msgs:
+                return state, outcome(feedback("Password Needs Work", msgs, False))
+            return state, outcome(feedback("Great Password!", ["You met all strength criteria."], True), done=True, passed=True)
+        return state, CONTINUE
+
+MalwareState = namedtuple("MalwareState", "idx selected total_ok")
+
+class MalwareRules(LevelRules):
+    number = 4
+    name = "Malware"
+
+    def initial(self, rng):
+        return MalwareState(0, frozenset(), 0)
+
+    def target(self, sc):
+        if sc.get("multi_ok"):
+            return sc["correct_set"]
+        return {next(i for i, (n, nn, safe) in enumerate(sc["links"]) if safe)}
+
+    def actions(self, state):
+        return toggle_actions(len(MALWARE_SCENARIOS[state.idx]["links"])) + [SUBMIT]
+
+    def question(self, state):
+        return f"L4.{state.idx + 1}"
+
+    def solution(self, state):
+        sc = MALWARE_SCENARIOS[state.idx]
+        if sc.get("multi_ok"):
+            return toggles_to(state.selected, self.target(sc)) + [SUBMIT]
+        if state.selected == self.target(sc):
+            return [SUBMIT]
+        return [("toggle", i) for i in self.target(sc)] + [SUBMIT]
+
+    def step(self, state, action):
+        sc = MALWARE_SCENARIOS[state.idx]
+        if action[0] == "toggle":
+            if sc.get("multi_ok"):
+                return state._replace(selected=state.selected ^ {action[1]}), CONTINUE
+            return state._replace(selected=frozenset({action[1]})), CONTINUE
+        if action[0] != "submit":
+            return state, CONTINUE
+        if state.selected != self.target(sc):
+            return state, outcome(feedback(*sc["feedback_bad"], False))
+        ok = feedback(*sc["feedback_ok"], True)
+        state = MalwareState(state.idx + 1, frozenset(), state.total_ok + 1)
+        if state.idx < len(MALWARE_SCENARIOS):
+            return state, outcome(ok)
+        success = (state.total_ok == len(MALWARE_SCENARIOS))
+        done = feedback("Level 4 Completed!", ["You chose safe downloads and avoided malware.", f"Score: {state.total_ok}/{len(MALWARE_SCENARIOS)}"], success)
+        return state, outcome(ok, done, done=True, passed=success)
+
+# turn indexes the SOCIAL_CHAT entry awaiting a reply; replies holds the chosen texts.
+SocialState = namedtuple("SocialState", "turn safe_count replies")
+
+class SocialRules(LevelRules):
+    number = 5
+    name = "Social Engineering"
+
+    def initial(self, rng):
+        return SocialState(self.next_turn(-1), 0, ())
+
+    def next_turn(self, turn):
+        for i in range(turn + 1, len(SOCIAL_CHAT)):
+            if SOCIAL_CHAT[i][0] == "You":
+                return i
+        return len(SOCIAL_CHAT)
+
+    def actions(self, state):
+        return [("choose", k) for k in range(len(SOCIAL_CHAT[state.turn][1]))]
+
+    def solution(self, state):
+        return [("choose", 0)]
+
+    def question(self, state):
+        return f"L5.{len(state.replies) + 1}"
+
+    def correct(self, state, action, out):
+        return action[1] == 0 if action[0] == "choose" else None
+
+    def step(self, state, action):
+        if action[0] != "choose":
+            return state, CONTINUE
+        opts = SOCIAL_CHAT[state.turn][1]
+        choice = action[1]
+        state = SocialState(self.next_turn(state.turn), state.safe_count, state.replies + (opts[choice],))
+        fbs = []
+        if choice == 0:
+            state = state._replace(safe_count=state.safe_count + 1)
+            if "Block" in opts[0]:
+                fb = feedback("Blocked & Reported", ["You shut down the social engineering attempt."], True)
+                return state, outcome(fb, done=True, passed=True)
+        else:
+            fbs.append(feedback("Risky reply", ["Never share personal info with strangers."], False))
+        if state.turn < len(SOCIAL_CHAT):
+            return state, outcome(*fbs)
+        success = (state.safe_count >= 2)
+        if success:
+            fbs.append(feedback("Level 5 Completed!", ["Nice! You avoided oversharing and handled harassment."], True))
+        else:
+            fbs.append(feedback("Level 5 Completed (but risky).", ["Be quicker to block/report and avoid personal details."], False))
+        return state, outcome(*fbs, done=True, passed=success)
+
+WifiState = namedtuple("WifiState", "vpn https selected")
+
+class WifiRules(LevelRules):
+    number = 6
+    name = "Public Wi-Fi"
+
+    def initial(self, rng):
+        return WifiState(False, True, frozenset())
+
+    def actions(self, state):
+        return [("switch", "vpn"), ("switch", "https")] + toggle_actions(len(WIFI_ACTIONS)) + [SUBMIT]
+
+    def solution(self, state):
+        plan = [("switch", name) for name in ("vpn", "https") if not getattr(state, name)]
+        safe = {i for i, (_, ok) in enumerate(WIFI_ACTIONS) if ok}
+        return plan + toggles_to(state.selected, safe) + [SUBMIT]
+
+    def step(self, state, action):
+        kind = action[0]
+        if kind == "switch":
+            return state._replace(**{action[1]: not getattr(state, action[1])}), CONTINUE
+        if kind == "toggle":
+            return state._replace(selected=state.selected ^ {action[1]}), CONTINUE
+        if kind != "submit":
+            return state, CONTINUE
+        ok = True
+        for i in state.selected:
+            label, _ = WIFI_ACTIONS[i]
+            if "bank" in label.lower() or "work email" in label.lower() or "internal" in label.lower():
+                if not state.vpn or not state.https:
+                    ok = False
+        if any("messaging" in WIFI_ACTIONS[i][0].lower() for i in state.selected):
+            ok = False
+        if ok and state.selected:
+            fb = feedback("Smart choices!", ["You used protections and avoided sensitive tasks without VPN."], True)
+            return state, outcome(fb, done=True, passed=True)
+        fb = feedback("Some choices were risky.", ["Enable VPN and avoid sensitive tasks on public Wi-Fi."], False)
+        return state, outcome(fb, done=True, passed=False)
+
+FirewallState = namedtuple("FirewallState", "selection")
+
+class FirewallRules(LevelRules):
+    number = 7
+    name = "Firewall"
+
+    def initial(self, rng):
+        return FirewallState((None,) * len(FIREWALL_TRAFFIC))
+
+    def actions(self, state):
+        return [("set", i, c) for i in range(len(FIREWALL_TRAFFIC)) for c in FIREWALL_CHOICES] + [SUBMIT]
+
+    def solution(self, state):
+        plan = [("set", i, corr) for i, (_, corr) in enumerate(FIREWALL_TRAFFIC) if state.selection[i] != corr]
+        return plan + [SUBMIT]
+
+    def answer(self, state, action):
+        # One bit per rule set to Block.
+        if action[0] == "submit":
+            return bitmask(i for i, c in enumerate(state.selection) if c == "Block")
+        return None
+
+    def step(self, state, action):
+        if action[0] == "set":
+            selection = list(state.selection)
+            selection[action[1]] = action[2]
+            return FirewallState(tuple(selection)), CONTINUE
+        if action[0] != "submit":
+            return state, CONTINUE
+        if None in state.selection:
+            return state, outcome(feedback("Complete all rules first.", ["Every entry needs Allow or Block."], False))
+        if all(state.selection[i] == corr for i, (_, corr) in enumerate(FIREWALL_TRAFFIC)):
+            fb = feedback("Firewall configured correctly!", ["You blocked risky inbound services and allowed needed traffic."], True)
+            return state, outcome(fb, done=True, passed=True)
+        return state, outcome(feedback("Some rules are unsafe.", ["Revise inbound services from Internet (RDP/SSH/SMB should be blocked)."], False))
+
+# days holds the PRIVACY_SCENARIOS indices drawn for this run.
+PrivacyState = namedtuple("PrivacyState", "days day selected")
+
+class PrivacyRules(LevelRules):
+    number = 8
+    name = "Data Privacy"
+
+    def initial(self, rng, seen=None):
+        # Choose 5 unique scenarios for the "5 days", skipping ones the trainee has seen
+        days = sampling_index(PRIVACY_SCENARIOS).draw(PRIVACY_DAYS, rng, seen=seen)
+        return PrivacyState(tuple(days), 0, frozenset())
+
+    def scenario(self, state):
+        return PRIVACY_SCENARIOS[state.days[state.day]]
+
+    def actions(self, state):
+        return toggle_actions(len(PRIVACY_OPTIONS)) + [SUBMIT]
+
+    def question(self, state):
+        return f"L8.{state.days[state.day] + 1}"
+
+    def answer(self, state, action):
+        if action[0] == "submit":
+            return bitmask(PRIVACY_OPTIONS.index(opt) for opt in state.selected)
+        return None
+
+    def solution(self, state):
+        safe = {PRIVACY_OPTIONS.index(opt) for opt in self.scenario(state)["safe"]}
+        selected = {PRIVACY_OPTIONS.index(opt) for opt in state.selected}
+        return toggles_to(selected, safe) + [SUBMIT]
+
+    def step(self, state, action):
+        if action[0] == "toggle":
+            return state._replace(selected=state.selected ^ {PRIVACY_OPTIONS[action[1]]}), CONTINUE
+        if action[0] != "submit":
+            return state, CONTINUE
+        if state.selected == self.scenario(state)["safe"]:
+            fb = feedback("Good choice!", ["You granted only necessary permissions."], True)
+        else:
+            fb = feedback("Not quite.", ["Grant only permissions essential for the app to work."], False)
+        state = state._replace(day=state.day + 1, selected=frozenset())
+        if state.day < len(state.days):
+            return state, outcome(fb)
+        done = feedback("Level 8 Completed!", ["You practiced safe data privacy management for 5 days."], True)
+        return state, outcome(fb, done, done=True, passed=True)
+
+TwoFAState = namedtuple("TwoFAState", "stage username password code entry message")
+TWO_FA_MAXLEN = {"username": 50, "password": 50, "entry": 6}
+
+class TwoFARules(LevelRules):
+    number = 9
+    name = "Two-Factor Authentication"
+    secret_fields = ("password",)
+
+    def initial(self, rng):
+        code = str(rng.randint(100000, 999999)).zfill(6)
+        return TwoFAState(1, "", "", code, "", "")
+
+    def actions(self, state):
+        if state.stage == 1:
+            return [("text", "username", "trainee"), ("text", "password", "hunter2!"), SUBMIT]
+        return [("text", "entry", state.code), ("text", "entry", "000000"), SUBMIT, TIMEOUT]
+
+    def question(self, state):
+        return "L9.login" if state.stage == 1 else "L9.code"
+
+    def redact(self, field, value):
+        # Only "non-empty" is graded, so that is all the session log keeps.
+        return "*" if value else ""
+
+    def correct(self, state, action, out):
+        if action[0] == "submit":
+            return bool(state.username and state.password) if state.stage == 1 else state.entry == state.code
+        return super().correct(state, action, out)
+
+    def solution(self, state):
+        if state.stage == 1:
+            plan = [("text", "username", "trainee")] if not state.username else []
+            if not state.password:
+                plan.append(("text", "password", "hunter2!"))
+            return plan + [SUBMIT]
+        if state.entry != state.code:
+            return [("text", "entry", state.code), SUBMIT]
+        return [SUBMIT]
+
+    def step(self, state, action):
+        kind = action[0]
+        if kind == "text":
+            field = action[1]
+            return state._replace(**{field: action[2][:TWO_FA_MAXLEN[field]]}), CONTINUE
+        if kind == "submit" and state.stage == 1:
+            if state.username and state.password:
+                return state._replace(stage=2, message=""), CONTINUE
+            return state._replace(message="Please enter both fields."), CONTINUE
+        if kind == "submit":
+            if state.entry == state.code:
+                return state, outcome(feedback("2FA Success", ["Logged in with strong protection."], True), done=True, passed=True)
+            return state._replace(entry="", message="Incorrect code. Try again."), CONTINUE
+        if kind == "timeout" and state.stage == 2:
+            fb = feedback("Time expired!", ["2FA failed. Try again and enter the code promptly."], False)
+            return state, outcome(fb, done=True, passed=False)
+        return state, CONTINUE
+
+RansomwareState = namedtuple("RansomwareState", "selected")
+
+class RansomwareRules(LevelRules):
+    number = 10
+    name = "Ransomware"
+
+    def initial(self, rng):
+        return RansomwareState(frozenset())
+
+    def actions(self, state):
+        return toggle_actions(len(RANSOMWARE_ACTIONS)) + [SUBMIT, TIMEOUT]
+
+    def solution(self, state):
+        return toggles_to(state.selected, RANSOMWARE_CORRECT) + [SUBMIT]
+
+    def step(self, state, action):
+        if action[0] == "toggle":
+            return RansomwareState(state.selected ^ {action[1]}), CONTINUE
+        if action[0] == "timeout":
+            fb = feedback("Clock ran out.", ["Don’t panic—contain first, report, and restore from clean backups."], False)
+            return state, outcome(fb, done=True, passed=False)
+        if action[0] != "submit":
+            return state, CONTINUE
+        if state.selected == RANSOMWARE_CORRECT:
+            fb = feedback("Exactly right.", ["Don’t pay—contain, report, and restore from backups."], True)
+            return state, outcome(fb, done=True, passed=True)
+        fb = feedback("Some choices were unsafe.", ["Avoid paying, avoid random tools. Contain, report, restore."], False)
+        return state, outcome(fb, done=True, passed=False)
+
+LEVEL_RULES = {r.number: r for r in (
+    PhishingRules(), RoboscamRules(), PasswordRules(), MalwareRules(), SocialRules(),
+    WifiRules(), FirewallRules(), PrivacyRules(), TwoFARules(), RansomwareRules(),
+)}
+
+# Policies map (rules, state, rng) to the next action.
+def random_policy(rules, state, rng):
+    return rng.choice(rules.actions(state))
+
+def perfect_policy(rules, state, rng):
+    return rules.solution(state)[0]
+
+def noisy_policy(error_rate):
+    def policy(rules, state, rng):
+        if rng.random() < error_rate:
+            return random_policy(rules, state, rng)
+        return perfect_policy(rules, state, rng)
+    return policy
+
+class ScriptedPolicy:
+    # Plays a fixed action list per level, then falls back to another policy.
+    def __init__(self, scripts, fallback=random_policy):
+        self.scripts = scripts
+        self.fallback = fallback
+        self.cursor = {}
+
+    def __call__(self, rules, state, rng):
+        pos = self.cursor.get(rules.number, 0)
+        script = self.scripts.get(rules.number, ())
+        if pos < len(script):
+            self.cursor[rules.number] = pos + 1
+            return script[pos]
+        return self.fallback(rules, state, rng)
+
+    def reset(self):
+        self.cursor = {}
+
+POLICIES = {"perfect": perfect_policy, "random": random_policy, "noisy": noisy_policy(0.2)}
+
+LevelResult = namedtuple("LevelResult", "level passed steps feedback")
+
+class BotRunner:
+    def __init__(self, policy, seed=None, max_steps=500):
+        self.policy = policy
+        self.rng = random.Random(seed)
+        self.max_steps = max_steps
+
+    def play_level(self, number):
+        rules = LEVEL_RULES[number]
+        state = rules.initial(self.rng)
+        fbs = []
+        for steps in range(1, self.max_steps + 1):
+            state, out = rules.step(state, self.policy(rules, state, self.rng))
+            fbs.extend(out.feedback)
+            if out.done:
+                return LevelResult(number, out.passed, steps, fbs)
+        # Policies that never finish (e.g. random play on level 1) count as a fail.
+        return LevelResult(number, False, self.max_steps, fbs)
+
+    def play_sequence(self, start_level=1):
+        if hasattr(self.policy, "reset"):
+            self.policy.reset()
+        return [self.play_level(lvl) for lvl in range(start_level, 11)]
+
+    def run(self, sequences, start_level=1):
+        passes = {lvl: 0 for lvl in range(start_level, 11)}
+        steps = 0
+        wins = 0
+        t0 = time.perf_counter()
+        for _ in range(sequences):
+            results = self.play_sequence(start_level)
+            passed = sum(1 for r in results if r.passed)
+            if passed / len(results) >= 0.8:
+                wins += 1
+            for r in results:
+                passes[r.level] += r.passed
+                steps += r.steps
+        elapsed = time.perf_counter() - t0
+        return {
+            "sequences": sequences,
+            "wins": wins,
+            "pass_rate": {lvl: n / sequences for lvl, n in passes.items()},
+            "steps": steps,
+            "seconds": elapsed,
+            "sequences_per_second": sequences / elapsed if elapsed else float("inf"),
+        }
+
+# =========================
+# Session recording and replay
+# =========================
+# Every level sequence played is logged as a compact binary file: per level the
+# RNG seed handed to rules.initial() and the engine actions the level applied, each
+# with the milliseconds since the previous record. Replaying feeds the actions back
+# through LEVEL_RULES without a display or any waiting, so a session replays in
+# milliseconds and the replayed results can be checked against the recorded ones.
+#
+# Format: b"CQRS", version byte, varint start time (unix seconds), varint start level,
+# then records of an opcode byte, a varint delta in ms and opcode-specific fields.
+# Integers are varints, strings are varint length + UTF-8. Text actions store the
+# length of the prefix shared with the field's previous value and the new suffix.
+# Fields a level marks secret_fields (passwords) are not logged as typed unless
+# CYBERQUIZ_RECORD_SECRETS=1: a redacted stand-in is, or for level 3 nothing, with
+# the analyzer's verdict (a list of strings) recorded before each submit instead.
+SESSION_MAGIC = b"CQRS"
+SESSION_VERSION = 2  # 2 adds OP_VERDICT; version 1 logs still replay
+SESSION_DIR = os.environ.get("CYBERQUIZ_SESSION_DIR", os.path.join(os.path.expanduser("~"), ".cache", "cyberquiz", "sessions"))
+OP_SUBMIT, OP_TIMEOUT, OP_TOGGLE, OP_CHOOSE, OP_SET, OP_SWITCH, OP_TEXT, OP_LEVEL, OP_END, OP_STATE, OP_VERDICT = range(11)
+SIMPLE_OPS = {"submit": OP_SUBMIT, "timeout": OP_TIMEOUT}
+INDEX_OPS = {"toggle": OP_TOGGLE, "choose": OP_CHOOSE}
+
+def put_varint(buf, n):
+    while n >= 0x80:
+        buf.append(n & 0x7F | 0x80)
+        n >>= 7
+    buf.append(n)
+
+def put_str(buf, s):
+    data = s.encode("utf-8")
+    put_varint(buf, len(data))
+    buf += data
+
+class SessionReader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def byte(self):
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def varint(self):
+        n = shift = 0
+        while True:
+            b = self.byte()
+            n |= (b & 0x7F) << shift
+            shift += 7
+            if b < 0x80:
+                return n
+
+    def str(self):
+        n = self.varint()
+        self.pos += n
+        return self.data[self.pos - n:self.pos].decode("utf-8")
+
+def encode_state(state):
+    return json.dumps(list(state), default=_encode_value, separators=(",", ":"))
+
+def decode_state(cls, text):
+    values = json.loads(text, object_hook=_decode_value)
+    return cls._make(frozenset(v) if isinstance(v, set) else tuple(v) if isinstance(v, list) else v for v in values)
+
+class RecordingRules:
+    # Wraps a LevelRules for one played level; everything else is delegated.
+    def __init__(self, rules, recorder):
+        self.rules = rules
+        self.recorder = recorder
+
+    def __getattr__(self, attr):
+        return getattr(self.rules, attr)
+
+    def initial(self, rng, **kwargs):
+        seed = rng.getrandbits(32)
+        state = self.rules.initial(random.Random(seed), **kwargs)
+        # Extra inputs (level 8's seen bitmap) are not in the log; keep the state they produced.
+        self.recorder.level(self.rules.number, seed, state if kwargs else None)
+        return state
+
+    def step(self, state, action):
+        self.recorder.action(action, self.rules, state)
+        new_state, out = self.rules.step(state, action)
+        for obs in self.recorder.observers:
+            obs.step(self.rules, state, action, out)
+        return new_state, out
+
+class SessionRecorder:
+    def __init__(self, directory=SESSION_DIR, enabled=True, record_secrets=False):
+        self.directory = directory
+        self.enabled = enabled
+        self.record_secrets = record_secrets
+        self.path = None
+        self.buf = bytearray()
+        self.last = 0.0
+        self.texts = {}
+        # Objects with begin()/level()/step()/question_shown()/end_level() methods,
+        # e.g. the results store.
+        self.observers = []
+        atexit.register(self.flush)
+
+    def rules(self, number):
+        return RecordingRules(LEVEL_RULES[number], self) if self.path or self.observers else LEVEL_RULES[number]
+
+    def begin(self, start_level):
+        self.flush()
+        self.path = None
+        for obs in self.observers:
+            obs.begin(start_level)
+        if not self.enabled:
+            return
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(self.directory, trainee_name(), f"{stamp}-{os.getpid()}.cqrec")
+        self.buf = bytearray(SESSION_MAGIC)
+        self.buf.append(SESSION_VERSION)
+        put_varint(self.buf, int(time.time()))
+        put_varint(self.buf, start_level)
+        self.last = time.perf_counter()
 
-    # Choose 5 random, unique scenarios for the "5 days"
-    daily_tasks = random.sample(scenarios, 5)
+    def record(self, op):
+        now = time.perf_counter()
+        self.buf.append(op)
+        put_varint(self.buf, int((now - self.last) * 1000))
+        self.last = now
 
-    for day, sc in enumerate(daily_tasks, start=1):
-        selected = set()
+    def level(self, number, seed, state=None):
+        for obs in self.observers:
+            obs.level(number)
+        if not self.path:
+            return
+        self.texts = {}
+        self.record(OP_LEVEL)
+        self.buf.append(number)
+        self.buf += struct.pack("<I", seed)
+        if state is not None:
+            self.record(OP_STATE)
+            put_str(self.buf, encode_state(state))
+
+    def action(self, action, rules, state):
+        kind = action[0]
+        if not self.path:
+            return
+        redact = rules.secret_fields and not self.record_secrets
+        if kind == "submit" and redact:
+            verdict = rules.grade_secret(state)
+            if verdict is not None:
+                self.record(OP_VERDICT)
+                put_varint(self.buf, len(verdict))
+                for msg in verdict:
+                    put_str(self.buf, msg)
+        if kind in SIMPLE_OPS:
+            self.record(SIMPLE_OPS[kind])
+        elif kind in INDEX_OPS:
+            self.record(INDEX_OPS[kind])
+            put_varint(self.buf, action[1])
+        elif kind == "set":
+            self.record(OP_SET)
+            put_varint(self.buf, action[1])
+            put_str(self.buf, action[2])
+        elif kind == "switch":
+            self.record(OP_SWITCH)
+            put_str(self.buf, action[1])
+        elif kind == "text":
+            _, field, value = action
+            if redact and field in rules.secret_fields:
+                value = rules.redact(field, value)
+                if value is None:
+                    return
+            prev = self.texts.get(field, "")
+            keep = 0
+            for a, b in zip(prev, value):
+                if a != b:
+                    break
+                keep += 1
+            self.texts[field] = value
+            self.record(OP_TEXT)
+            put_str(self.buf, field)
+            put_varint(self.buf, keep)
+            put_str(self.buf, value[keep:])
+
+    def question_shown(self):
+        # Frontends call this when feedback is dismissed and the level is back on screen.
+        for obs in self.observers:
+            obs.question_shown()
+
+    def end_level(self, passed):
+        for obs in self.observers:
+            obs.end_level(passed)
+        if self.path:
+            self.record(OP_END)
+            self.buf.append(bool(passed))
+            self.flush()
+
+    def flush(self):
+        if not self.path or not self.buf:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(self.buf)
+        except OSError:
+            pass
+        self.buf = bytearray()
+
+SESSION = SessionRecorder(enabled=os.environ.get("CYBERQUIZ_RECORD", "1") == "1",
+                          record_secrets=os.environ.get("CYBERQUIZ_RECORD_SECRETS", "0") == "1")
+
+SessionLevel = namedtuple("SessionLevel", "level seed state actions passed verdicts")
+
+def read_session(path):
+    with open(path, "rb") as f:
+        r = SessionReader(f.read())
+    if r.data[:4] != SESSION_MAGIC or r.data[4] not in (1, SESSION_VERSION):
+        raise ValueError(f"{path}: not a session recording (version {SESSION_VERSION})")
+    r.pos = 5
+    started = r.varint()
+    start_level = r.varint()
+    levels = []
+    current = None
+    texts = {}
+    while r.pos < len(r.data):
+        op = r.byte()
+        t = r.varint()
+        if op == OP_LEVEL:
+            number = r.byte()
+            seed = struct.unpack("<I", r.data[r.pos:r.pos + 4])[0]
+            r.pos += 4
+            current = SessionLevel(number, seed, None, [], None, [])
+            levels.append(current)
+            texts = {}
+        elif op == OP_STATE:
+            current = levels[-1] = current._replace(state=r.str())
+        elif op == OP_END:
+            current = levels[-1] = current._replace(passed=bool(r.byte()))
+        elif op == OP_VERDICT:
+            current.verdicts.append([r.str() for _ in range(r.varint())])
+        else:
+            if op == OP_SUBMIT: action = SUBMIT
+            elif op == OP_TIMEOUT: action = TIMEOUT
+            elif op == OP_TOGGLE: action = ("toggle", r.varint())
+            elif op == OP_CHOOSE: action = ("choose", r.varint())
+            elif op == OP_SET: action = ("set", r.varint(), r.str())
+            elif op == OP_SWITCH: action = ("switch", r.str())
+            elif op == OP_TEXT:
+                field = r.str()
+                keep = r.varint()
+                texts[field] = texts.get(field, "")[:keep] + r.str()
+                action = ("text", field, texts[field])
+            else:
+                raise ValueError(f"{path}: unknown record {op} at byte {r.pos - 1}")
+            current.actions.append((t, action))
+    return {"started": started, "start_level": start_level, "levels": levels}
+
+def replay_session(path):
+    t0 = time.perf_counter()
+    session = read_session(path)
+    results = []
+    for lvl in session["levels"]:
+        rules = LEVEL_RULES[lvl.level]
+        if lvl.verdicts:
+            # The typed secret was not logged; grade with the verdicts recorded for it.
+            verdicts = iter(lvl.verdicts)
+            rules = type(rules)()
+            rules.grade = lambda text: next(verdicts)
+        state = rules.initial(random.Random(lvl.seed))
+        if lvl.state is not None:
+            state = decode_state(type(state), lvl.state)
+        passed = None
+        titles = []
+        for _, action in lvl.actions:
+            state, out = rules.step(state, action)
+            titles += [fb[0] for fb in out.feedback]
+            if out.done:
+                passed = out.passed
+        results.append({
+            "level": lvl.level,
+            "recorded": lvl.passed,
+            "replayed": passed,
+            "match": lvl.passed == passed,
+            "actions": len(lvl.actions),
+            "played_seconds": sum(t for t, _ in lvl.actions) / 1000,
+            "feedback": titles,
+        })
+    return {
+        "path": path,
+        "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(session["started"])),
+        "start_level": session["start_level"],
+        "bytes": os.path.getsize(path),
+        "levels": results,
+        "replay_seconds": time.perf_counter() - t0,
+    }
+
+# =========================
+# Results store
+# =========================
+# Every answer a trainee gives (each submit, choice or timeout, so retries too) and
+# every level result goes to a local SQLite database in WAL mode. The game thread
+# only puts tuples on a queue; a writer thread drains it and commits in batches,
+# so a slow disk never holds up a frame. Trainee names and question names are
+# interned into small lookup tables, leaving integer columns in the attempts table:
+#
+#   attempts  session, trainee, level, question, attempt (1 = first try),
+#             ts (unix s), ms (since the question came up), answer (option
+#             bitmask, NULL for typed answers), correct (NULL when not judged)
+#   levels    session, trainee, level, passed, ts, ms (whole level)
+#   sessions  id, trainee, started, start_level
+#
+# CYBERQUIZ_RESULTS names the database; CYBERQUIZ_STORE_RESULTS=0 turns it off.
+RESULTS_PATH = os.environ.get("CYBERQUIZ_RESULTS", os.path.join(os.path.expanduser("~"), ".cache", "cyberquiz", "results.sqlite3"))
+RESULTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trainees (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS questions (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY, trainee INTEGER NOT NULL, started INTEGER NOT NULL, start_level INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS attempts (session INTEGER NOT NULL, trainee INTEGER NOT NULL, level INTEGER NOT NULL,
+    question INTEGER NOT NULL, attempt INTEGER NOT NULL, ts INTEGER NOT NULL, ms INTEGER NOT NULL, answer INTEGER, correct INTEGER);
+CREATE TABLE IF NOT EXISTS levels (session INTEGER NOT NULL, trainee INTEGER NOT NULL, level INTEGER NOT NULL,
+    passed INTEGER NOT NULL, ts INTEGER NOT NULL, ms INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS attempts_trainee ON attempts (trainee, level, ts);
+CREATE INDEX IF NOT EXISTS attempts_level ON attempts (level, ts);
+CREATE INDEX IF NOT EXISTS attempts_ts ON attempts (ts);
+CREATE INDEX IF NOT EXISTS levels_trainee ON levels (trainee, level, ts);
+"""
+
+class ResultsStore:
+    def __init__(self, path=RESULTS_PATH, enabled=True, batch_seconds=0.5, batch_rows=500):
+        self.path = path
+        self.enabled = enabled
+        self.batch_seconds = batch_seconds
+        self.batch_rows = batch_rows
+        self.queue = None
+        self.thread = None
+        self.session = None
+        self.level_no = 0
+        self.level_start = self.shown = 0.0
+        self.tries = {}
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        import queue
+        import threading
+        if self.thread is None and self.enabled:
+            self.queue = queue.SimpleQueue()
+            self.thread = threading.Thread(target=self.writer, name="results-writer", daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
+
+    def put(self, row):
+        if self.thread is not None and self.enabled:
+            self.queue.put(row)
+
+    # SessionRecorder observer hooks
+    def begin(self, start_level):
+        self.start()
+        self.session = int.from_bytes(os.urandom(7), "little")
+        self.put(("session", self.session, trainee_name(), int(time.time()), start_level))
+
+    def level(self, number):
+        self.level_no = number
+        self.level_start = self.shown = time.perf_counter()
+        self.tries = {}
+
+    def step(self, rules, state, action, out):
+        if self.session is None or action[0] not in ("choose", "submit", "timeout"):
+            return
+        now = time.perf_counter()
+        question = rules.question(state)
+        self.tries[question] = attempt = self.tries.get(question, 0) + 1
+        correct = rules.correct(state, action, out)
+        self.put(("attempt", self.session, self.level_no, question, attempt, int(time.time()),
+                  int((now - self.shown) * 1000), rules.answer(state, action), None if correct is None else int(correct)))
+        # Without feedback the next question is up at once; with it, question_shown()
+        # restarts the clock when the feedback is dismissed.
+        self.shown = now
+
+    def question_shown(self):
+        self.shown = time.perf_counter()
+
+    def end_level(self, passed):
+        if self.session is not None:
+            self.put(("level", self.session, self.level_no, int(bool(passed)), int(time.time()),
+                      int((time.perf_counter() - self.level_start) * 1000)))
+
+    # Writer thread
+    def writer(self):
+        import queue
+        import sqlite3
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(RESULTS_SCHEMA)
+        except (OSError, sqlite3.Error):
+            self.enabled = False
+            self.thread = None
+            return
+        ids = {"trainees": {}, "questions": {}}
+        sessions = {}
+
+        def intern(table, name):
+            cache = ids[table]
+            if name not in cache:
+                db.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+                cache[name] = db.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+            return cache[name]
+
+        # Every DB call sits under the per-batch handler: a failed batch is rolled back
+        # and counted as dropped. If the thread still dies, the store turns itself off
+        # so put() stops queueing rows nobody will drain.
         done = False
-        while not done:
-            screen.fill(WHITE)
-            title = FONT_XL.render(f"Level 8 – Data Privacy: Day {day}/5", True, BLUE)
-            screen.blit(title, (40, 40))
-
-            y = draw_text_multiline(screen, f"App: {sc['app']}", 40, 120, FONT_LG)
-            y = draw_text_multiline(screen, sc["desc"], 40, y + 10, FONT)
-            y = draw_text_multiline(screen, sc["question"], 40, y + 20, FONT)
-
-            options = ["Camera", "Location", "Contacts", "Microphone", "Storage", "Bluetooth"]
-            buttons = []
-            base_y = y + 40
-
-            for i, opt in enumerate(options):
-                rect = pygame.Rect(60, base_y + i * 50, WIDTH - 120, 40)
-                color = (160, 235, 160) if opt in selected else GRAY
-                pygame.draw.rect(screen, color, rect, border_radius=6)
-                pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-                screen.blit(FONT.render(opt, True, BLACK), (rect.x + 10, rect.y + 8))
-                buttons.append((rect, opt))
-
-            screen.blit(FONT_SM.render("Select reasonable permissions, then press ENTER.", True, BLACK), (60, HEIGHT - 50))
-            pygame.display.flip()
-
-            for ev in pygame.event.get():
-                if ev.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif ev.type == pygame.MOUSEBUTTONDOWN:
-                    for rect, opt in buttons:
-                        if rect.collidepoint(ev.pos):
-                            if opt in selected:
-                                selected.remove(opt)
-                            else:
-                                selected.add(opt)
-                elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_RETURN:
-                    if selected == sc["safe"]:
-                        show_feedback("Good choice!", ["You granted only necessary permissions."], True, back_to_menu=False)
-                    else:
-                        show_feedback("Not quite.", ["Grant only permissions essential for the app to work."], False, back_to_menu=False)
-                    done = True
+        try:
+            while not done:
+                rows = [self.queue.get()]
+                deadline = time.monotonic() + self.batch_seconds
+                while len(rows) < self.batch_rows:
+                    try:
+                        rows.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                new_sessions = {}
+                queued = sum(row[0] in ("attempt", "level") for row in rows)
+                skipped = 0
+                try:
+                    attempts, levels = [], []
+                    for row in rows:
+                        kind = row[0]
+                        if kind is None:
+                            done = True
+                        elif kind == "session":
+                            _, sid, trainee, started, start_level = row
+                            new_sessions[sid] = intern("trainees", trainee)
+                            db.execute("INSERT INTO sessions VALUES (?, ?, ?, ?)", (sid, new_sessions[sid], started, start_level))
+                        elif row[1] not in sessions and row[1] not in new_sessions:
+                            # Its session row was lost with an earlier failed batch.
+                            skipped += 1
+                        elif kind == "attempt":
+                            _, sid, level, question, *rest = row
+                            attempts.append((sid, sessions.get(sid, new_sessions.get(sid)), level, intern("questions", question), *rest))
+                        elif kind == "level":
+                            _, sid, *rest = row
+                            levels.append((sid, sessions.get(sid, new_sessions.get(sid)), *rest))
+                    db.executemany("INSERT INTO attempts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", attempts)
+                    db.executemany("INSERT INTO levels VALUES (?, ?, ?, ?, ?, ?)", levels)
+                    db.commit()
+                    sessions.update(new_sessions)
+                    self.written += len(attempts) + len(levels)
+                    self.dropped += skipped
+                except sqlite3.Error:
+                    try:
+                        db.rollback()
+                    except sqlite3.Error:
+                        pass
+                    # Ids interned in the rolled-back batch are gone too.
+                    for cache in ids.values():
+                        cache.clear()
+                    self.dropped += queued
+        finally:
+            self.enabled = False
+            db.close()
 
-            CLOCK.tick(60)
+    def close(self):
+        # Flushes what is queued; called at exit.
+        if self.thread is not None:
+            self.queue.put((None,))
+            self.thread.join(timeout=5)
+            self.thread = None
 
-    # After 5 days
-    show_feedback("Level 8 Completed!", ["You practiced safe data privacy management for 5 days."], True)
-    return True
+RESULTS = ResultsStore(enabled=os.environ.get("CYBERQUIZ_STORE_RESULTS", "1") == "1")
+if RESULTS.enabled:
+    SESSION.observers.append(RESULTS)
 
-# Level 9 – Two-Factor Authentication (apply it for real)
-def level_9_2fa():
-    user_box = InputBox((280, 220, 440, 42), placeholder="Username")
-    pass_box = InputBox((280, 280, 440, 42), placeholder="Password", password=True)
-    message = ""
-    stage = 1
-    code = None
-    code_box = InputBox((360, 350, 280, 42), placeholder="Enter 2FA code", password=False, maxlen=6, font=FONT_LG)
-    start_time = None
-    time_limit = 30
-
-    while True:
-        screen.fill(WHITE)
-        screen.blit(FONT_XL.render("Level 9 – Two-Factor Authentication", True, BLUE), (40, 40))
-
-        if stage == 1:
-            draw_text_multiline(screen, "Enter username and password, then press ENTER.", 40, 120, FONT, BLACK)
-            user_box.draw(screen)
-            pass_box.draw(screen)
+# =========================
+# Batch grading
+# =========================
+# Grades exported answer sheets (paper scans, LMS exports) offline against the keys
+# the levels use. A sheet is one row; each gradeable question is a column named in
+# answer_key(), e.g. "L1.1.flags", "L2.3", "L7.4", "L8.6", "L10". A cell lists the
+# selected options as 0-based indices or option labels separated by ";" ("0;2;4",
+# "Camera;Storage", "Block"); a blank cell is unanswered and "-" selects nothing.
+# A cell that names no valid option is listed on stderr with its row, counted as
+# invalid for that question and otherwise graded as unanswered.
+#
+# Every answer becomes a bitmask of selected options, so a column is one uint64
+# NumPy array: grading is a single comparison against the key's mask, and option
+# selection counts come from the same arrays by shifting out each bit. Distinct
+# cell strings are parsed once per chunk (np.unique), not once per row. NumPy is
+# only needed here; Parquet input needs pyarrow as well.
+Question = namedtuple("Question", "name level mask options")
+GRADE_CHUNK = 100000
+GRADE_MAX_REPORTED = 100  # unparseable cells listed on stderr before only counting
+
+def answer_key():
+    qs = []
+    for i, sc in enumerate(PHISHING_SCENARIOS, 1):
+        if "redflag_set" in sc:
+            qs.append(Question(f"L1.{i}.flags", 1, bitmask(sc["redflag_set"]), tuple(sc["email"]["redflags"])))
+        if "correct" in sc:
+            qs.append(Question(f"L1.{i}.action", 1, bitmask([sc["correct"]]), tuple(sc["options"])))
+        if "correct_set" in sc:
+            qs.append(Question(f"L1.{i}", 1, bitmask(sc["correct_set"]), tuple(sc["options"])))
+    for i, stage in enumerate(ROBOSCAM_STAGES, 1):
+        options = stage["options"]
+        qs.append(Question(f"L2.{i}", 2, bitmask(j for j, (_, good) in enumerate(options) if good), tuple(o for o, _ in options)))
+    malware = LEVEL_RULES[4]
+    for i, sc in enumerate(MALWARE_SCENARIOS, 1):
+        qs.append(Question(f"L4.{i}", 4, bitmask(malware.target(sc)), tuple(name for name, _, _ in sc["links"])))
+    for i, (_, corr) in enumerate(FIREWALL_TRAFFIC, 1):
+        qs.append(Question(f"L7.{i}", 7, bitmask([FIREWALL_CHOICES.index(corr)]), tuple(FIREWALL_CHOICES)))
+    for i, sc in enumerate(PRIVACY_SCENARIOS, 1):
+        qs.append(Question(f"L8.{i}", 8, bitmask(PRIVACY_OPTIONS.index(o) for o in sc["safe"]), tuple(PRIVACY_OPTIONS)))
+    qs.append(Question("L10", 10, bitmask(RANSOMWARE_CORRECT), tuple(label for label, _ in RANSOMWARE_ACTIONS)))
+    return qs
+
+def parse_answer(cell, options):
+    # Returns the answer's bitmask, or -1 when the cell is blank.
+    cell = cell.strip()
+    if not cell:
+        return -1
+    if cell == "-":
+        return 0
+    lookup = {o.lower(): i for i, o in enumerate(options)}
+    mask = 0
+    for tok in cell.split(";"):
+        tok = tok.strip()
+        i = int(tok) if tok.isdigit() else lookup.get(tok.lower())
+        if i is None or i >= len(options):
+            raise ValueError(f"{tok!r} is not an option ({len(options)} options)")
+        mask |= 1 << i
+    return mask
+
+def read_sheets(path, chunk=GRADE_CHUNK):
+    # Yields {column: list of str} for up to `chunk` rows at a time.
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Parquet input needs pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk):
+            yield {name: ["" if v is None else str(v) for v in col.to_pylist()] for name, col in zip(batch.schema.names, batch.columns)}
+        return
+    import csv
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("no header row")
+        while True:
+            rows = [row for _, row in zip(range(chunk), reader)]
+            if not rows:
+                return
+            yield dict(zip(header, zip_longest(*rows, fillvalue="")))
+
+class BatchGrader:
+    def __init__(self, questions=None, id_column="id"):
+        import numpy as np
+        self.np = np
+        self.questions = questions if questions is not None else answer_key()
+        self.id_column = id_column
+        self.sheets = 0
+        self.answered = np.zeros(len(self.questions), np.int64)
+        self.correct = np.zeros(len(self.questions), np.int64)
+        self.picks = [np.zeros(len(q.options), np.int64) for q in self.questions]
+        self.invalid = np.zeros(len(self.questions), np.int64)
+        self.reported = 0
+        self.level_passes = {}
+
+    def encode(self, cells, q, first_row=1):
+        # Unparseable cells grade as unanswered (-1); each is reported with its row.
+        np = self.np
+        uniq, inverse = np.unique(np.array(cells, dtype=str), return_inverse=True)
+        masks = np.empty(len(uniq), np.int64)
+        bad = {}
+        for j, u in enumerate(uniq):
+            try:
+                masks[j] = parse_answer(u, q.options)
+            except ValueError as e:
+                masks[j] = -1
+                bad[j] = e
+        rows = np.flatnonzero(np.isin(inverse, list(bad))) if bad else ()
+        for r in rows[:max(0, GRADE_MAX_REPORTED - self.reported)]:
+            print(f"row {first_row + r}, column {q.name}: {bad[int(inverse[r])]}; counted as invalid", file=sys.stderr)
+        if self.reported < GRADE_MAX_REPORTED <= self.reported + len(rows):
+            print(f"(listing stops after {GRADE_MAX_REPORTED} invalid cells; the rest are only counted)", file=sys.stderr)
+        self.reported += len(rows)
+        return masks[inverse], len(rows)
+
+    def grade_chunk(self, columns):
+        # Returns (ids, {question: 0/1/-1 array}, {level: bool array}) for the chunk.
+        np = self.np
+        rows = len(next(iter(columns.values()), []))
+        ids = columns.get(self.id_column) or [str(self.sheets + i + 1) for i in range(rows)]
+        self.sheets += rows
+        results = {}
+        levels = {}
+        for k, q in enumerate(self.questions):
+            cells = columns.get(q.name)
+            if cells is None:
+                continue
+            answers, invalid = self.encode(cells, q, self.sheets - rows + 1)
+            self.invalid[k] += invalid
+            answered = answers >= 0
+            ok = answered & (answers == q.mask)
+            results[q.name] = np.where(answered, ok.astype(np.int8), np.int8(-1))
+            self.answered[k] += answered.sum()
+            self.correct[k] += ok.sum()
+            bits = answers[answered].astype(np.uint64)
+            for b in range(len(q.options)):
+                self.picks[k][b] += int(((bits >> np.uint64(b)) & np.uint64(1)).sum())
+            # A level is passed when every question of it the sheet answered is right.
+            seen, good = levels.get(q.level, (np.zeros(rows, bool), np.ones(rows, bool)))
+            levels[q.level] = (seen | answered, good & (ok | ~answered))
+        passed = {}
+        for level, (seen, good) in sorted(levels.items()):
+            passed[level] = seen & good
+            self.level_passes[level] = self.level_passes.get(level, 0) + int(passed[level].sum())
+        return ids, results, passed
+
+    def stats(self):
+        per_q = {}
+        for k, q in enumerate(self.questions):
+            n = int(self.answered[k])
+            if not n and not self.invalid[k]:
+                continue
+            per_q[q.name] = {
+                "answered": n,
+                "invalid": int(self.invalid[k]),
+                "correct": int(self.correct[k]),
+                "p_correct": round(self.correct[k] / max(1, n), 4),
+                "option_rates": {opt: round(self.picks[k][b] / max(1, n), 4) for b, opt in enumerate(q.options)},
+            }
+        return {"sheets": self.sheets, "level_pass_rate": {lvl: round(n / max(1, self.sheets), 4) for lvl, n in self.level_passes.items()},
+                "questions": per_q}
+
+def grade_main(path, out=None, id_column="id"):
+    import csv
+    t0 = time.perf_counter()
+    grader = BatchGrader(id_column=id_column)
+    f = writer = None
+    # Rows go to a temporary file that replaces `out` only once the whole batch is graded.
+    tmp = f"{out}.{os.getpid()}.tmp" if out else None
+    try:
+        for columns in read_sheets(path):
+            ids, results, passed = grader.grade_chunk(columns)
+            if out:
+                if writer is None:
+                    f = open(tmp, "w", newline="", encoding="utf-8")
+                    writer = csv.writer(f)
+                    header = [id_column] + list(results) + [f"L{lvl}.passed" for lvl in passed] + ["correct"]
+                    writer.writerow(header)
+                cols = list(results.values())
+                total = grader.np.zeros(len(ids), grader.np.int64)
+                for c in cols:
+                    total += c == 1
+                writer.writerows(zip(ids, *[c.tolist() for c in cols], *[p.astype(int).tolist() for p in passed.values()], total.tolist()))
+        if f:
+            f.close()
+            f = None
+            os.replace(tmp, out)
+    except ValueError as e:
+        sys.exit(f"{path}: {e}")
+    finally:
+        if f:
+            f.close()
+            os.remove(tmp)
+    stats = grader.stats()
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+
+# =========================
+# Attempt analytics
+# =========================
+# --report loads the results store's attempts into NumPy columns (question, trainee,
+# attempt, ms, answer, correct; one np.fromiter pass, no per-row objects kept) and
+# computes per question, over first attempts: difficulty (share answered right),
+# discrimination (point-biserial correlation of the item with the trainee's score
+# on the other items), time to answer, retries, and how often each option was
+# picked. Rows are sorted by question once, so each statistic reads one contiguous
+# slice per question. Written as questions.csv, options.csv and report.html.
+# --full-report skips the column snapshot and reads every row from the database.
+ATTEMPT_DTYPE = [("question", "i4"), ("trainee", "i4"), ("attempt", "i2"), ("ms", "i4"), ("answer", "i8"), ("correct", "i1")]
+
+def question_labels():
+    # name -> (option labels, key bitmask or None) for every question the levels log.
+    labels = {q.name: (q.options, q.mask) for q in answer_key()}
+    for turn, (speaker, options) in enumerate((c for c in SOCIAL_CHAT if c[0] == "You"), 1):
+        labels[f"L5.{turn}"] = (tuple(options), 1)
+    labels["L6"] = (tuple(label for label, _ in WIFI_ACTIONS), bitmask(i for i, (_, ok) in enumerate(WIFI_ACTIONS) if ok))
+    labels["L7"] = (tuple(f"Block {desc}" for desc, _ in FIREWALL_TRAFFIC),
+                    bitmask(i for i, (_, corr) in enumerate(FIREWALL_TRAFFIC) if corr == "Block"))
+    return labels
+
+def load_attempts(path, snapshot=True):
+    # Reading rows out of SQLite costs about a microsecond each, so the columns are
+    # kept in a snapshot next to the database (<db>.cols.npz) and later reports
+    # only fetch attempts added since (by rowid; the store never deletes rows).
+    # The snapshot also records the (random) session ids of its first and last
+    # attempt rows; if the database no longer has them there, it is a different or
+    # recreated database and the columns are rebuilt from scratch.
+    import sqlite3
+    import numpy as np
+    snap_path = path + ".cols.npz"
+    rows, last, ident = np.zeros(0, dtype=ATTEMPT_DTYPE), 0, None
+    if snapshot:
+        try:
+            with np.load(snap_path) as snap:
+                rows, last, ident = snap["rows"], int(snap["last"][0]), snap["ident"].tolist()
+        except (OSError, ValueError, KeyError):
+            pass
+    db = sqlite3.connect(path)
+    try:
+        names = dict(db.execute("SELECT id, name FROM questions"))
+        top = db.execute("SELECT MAX(rowid) FROM attempts").fetchone()[0] or 0
+
+        def session_at(rowid):
+            row = db.execute("SELECT session FROM attempts WHERE rowid = ?", (rowid,)).fetchone()
+            return row[0] if row else -1
+
+        first = db.execute("SELECT MIN(rowid) FROM attempts").fetchone()[0] or 0
+        if top < last or ident != [session_at(first), session_at(last)]:
+            rows, last = rows[:0], 0
+        cur = db.execute("SELECT question, trainee, attempt, ms, COALESCE(answer, -1), COALESCE(correct, -1) "
+                         "FROM attempts WHERE rowid > ? AND rowid <= ?", (last, top))
+        new = np.fromiter(cur, dtype=ATTEMPT_DTYPE)
+        ident = [session_at(first), session_at(top)]
+    finally:
+        db.close()
+    if len(new):
+        rows = np.concatenate([rows, new])
+        if snapshot:
+            try:
+                tmp = f"{snap_path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    np.savez(f, rows=rows, last=np.array([top], dtype=np.int64),
+                             ident=np.array(ident, dtype=np.int64))
+                os.replace(tmp, snap_path)
+            except OSError:
+                pass
+    return rows, names
+
+def analyze_attempts(rows, names):
+    import numpy as np
+    labels = question_labels()
+    first = rows[rows["attempt"] == 1]
+    judged = first[first["correct"] >= 0]
+    # Trainee score over judged first attempts, for the item-rest correlation.
+    trainees = judged["trainee"]
+    t_n = np.bincount(trainees)
+    t_sum = np.bincount(trainees, weights=judged["correct"])
+    retries = np.bincount(rows["question"], weights=rows["attempt"] > 1, minlength=max(names, default=0) + 1)
+    order = np.argsort(first["question"], kind="stable")
+    first = first[order]
+    qids, starts, counts = np.unique(first["question"], return_index=True, return_counts=True)
+    report = []
+    for qid, start, n in zip(qids, starts, counts):
+        block = first[start:start + n]
+        name = names[int(qid)]
+        options, key = labels.get(name, ((), None))
+        ok = block["correct"]
+        judged_mask = ok >= 0
+        x = ok[judged_mask].astype(np.float64)
+        tr = block["trainee"][judged_mask]
+        rest_n = t_n[tr] - 1
+        valid = rest_n > 0
+        rest = (t_sum[tr][valid] - x[valid]) / rest_n[valid]
+        disc = float(np.corrcoef(x[valid], rest)[0, 1]) if valid.sum() > 2 and x[valid].std() and rest.std() else None
+        ans = block["answer"]
+        picked = ans[ans >= 0].astype(np.uint64)
+        rates = [float(((picked >> np.uint64(b)) & np.uint64(1)).mean()) if len(picked) else 0.0 for b in range(len(options))]
+        ms = block["ms"]
+        report.append({
+            "question": name,
+            "level": int(name[1:].split(".")[0]) if name[1:].split(".")[0].isdigit() else 0,
+            "first_attempts": int(n),
+            "difficulty": round(float(x.mean()), 4) if len(x) else None,
+            "discrimination": None if disc is None else round(disc, 4),
+            "median_ms": int(np.median(ms)),
+            "p90_ms": int(np.percentile(ms, 90)),
+            "retries": int(retries[qid]),
+            "options": [{"option": b, "label": label, "key": bool(key is not None and key >> b & 1), "rate": round(rate, 4)}
+                        for b, (label, rate) in enumerate(zip(options, rates))],
+        })
+    report.sort(key=lambda q: (q["level"], q["question"]))
+    return report
+
+def write_reports(report, out_dir, source, attempts, seconds):
+    import csv
+    import html
+    os.makedirs(out_dir, exist_ok=True)
+    cols = ["question", "level", "first_attempts", "difficulty", "discrimination", "median_ms", "p90_ms", "retries"]
+    with open(os.path.join(out_dir, "questions.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(cols)
+        w.writerows([q[c] for c in cols] for q in report)
+    with open(os.path.join(out_dir, "options.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["question", "option", "label", "key", "rate"])
+        w.writerows([q["question"], o["option"], o["label"], int(o["key"]), o["rate"]] for q in report for o in q["options"])
+    # Distractors: wrong options picked on at least a fifth of first attempts.
+    out = [f"<!doctype html><meta charset='utf-8'><title>Cybersecurity quiz – attempt report</title>",
+           "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:1.5em}"
+           "td,th{border:1px solid #ccc;padding:4px 8px;text-align:left}.key{color:#070}.lure{background:#fdd}</style>",
+           f"<h1>Attempt report</h1><p>{attempts} attempts from {html.escape(source)}, analyzed in {seconds:.2f} s.</p>",
+           "<table><tr>" + "".join(f"<th>{c}</th>" for c in cols) + "</tr>"]
+    for q in report:
+        out.append("<tr>" + "".join(f"<td>{'' if q[c] is None else q[c]}</td>" for c in cols) + "</tr>")
+    out.append("</table>")
+    for q in report:
+        if not q["options"]:
+            continue
+        out.append(f"<h3>{html.escape(q['question'])}</h3><table><tr><th>option</th><th>picked</th></tr>")
+        for o in q["options"]:
+            cls = "key" if o["key"] else "lure" if o["rate"] >= 0.2 else ""
+            out.append(f"<tr class='{cls}'><td>{html.escape(o['label'])}</td><td>{o['rate']:.1%}</td></tr>")
+        out.append("</table>")
+    with open(os.path.join(out_dir, "report.html"), "w", encoding="utf-8") as f:
+        f.write("\n".join(out))
+
+def report_main(out_dir, path=RESULTS_PATH, snapshot=True):
+    import sqlite3
+    try:
+        import numpy
+    except ImportError:
+        sys.exit("--report needs NumPy (pip install numpy)")
+    if not os.path.exists(path):
+        sys.exit(f"{path}: no results database (play a session first, or pass --results)")
+    t0 = time.perf_counter()
+    try:
+        rows, names = load_attempts(path, snapshot)
+    except sqlite3.Error as e:
+        sys.exit(f"{path}: cannot read attempts ({e})")
+    loaded = time.perf_counter()
+    report = analyze_attempts(rows, names)
+    seconds = time.perf_counter() - t0
+    write_reports(report, out_dir, path, len(rows), seconds)
+    print(f"{len(rows)} attempts: loaded in {loaded - t0:.2f} s, analyzed in {seconds - (loaded - t0):.2f} s; reports in {out_dir}")
+
+# =========================
+# Level implementations (enhanced)
+# Each level pops with True (pass) or False (fail)
+# =========================
+# A level scene draws the engine state and translates clicks/keys into engine
+# actions. Feedback for an action opens a modal on top; once the level is done and
+# its feedback dismissed, the scene pops with the result.
+class LevelScene(Scene):
+    number = 0
+    submits = True  # ENTER submits the current selection
+
+    def __init__(self):
+        self.rules = SESSION.rules(self.number)
+        self.state = self.initial()
+        self.outcome = None
+        self.tree = None
+
+    def initial(self):
+        return self.rules.initial(random)
+
+    def layer_key(self):
+        return (self.name,)
+
+    def draw_static(self, surf):
+        return WidgetTree()
+
+    def sync(self, tree):
+        # Copies engine state (selection, typed text, switches) onto the widgets.
+        pass
+
+    def draw(self):
+        self.tree = begin_layer(self.layer_key(), self.draw_static)
+        self.sync(self.tree)
+        self.tree.draw_dynamic(screen)
+
+    def action(self, ev):
+        if ev.type == pygame.MOUSEBUTTONDOWN:
+            return self.tree.action_at(ev.pos)
+        if self.submits and ev.type == pygame.KEYDOWN and ev.key == pygame.K_RETURN:
+            return SUBMIT
+        return None
+
+    def handle(self, ev):
+        action = self.action(ev)
+        if action is not None:
+            self.apply(action)
+
+    def apply(self, action):
+        self.state, self.outcome = self.rules.step(self.state, action)
+        if self.outcome.feedback:
+            SCENES.push(FeedbackScene(self.outcome.feedback))
+        elif self.outcome.done:
+            self.finish()
+
+    def resume(self, result):
+        if self.outcome is not None and self.outcome.done:
+            self.finish()
         else:
-            draw_text_multiline(screen, "A 6-digit code is generated in your authenticator app.", 40, 120, FONT, BLACK)
-            screen.blit(FONT.render(f"(Simulated code shown here for demo): {code}", True, (100,100,100)), (40, 160))
-            elapsed = time.time() - start_time
-            left = max(0, int(time_limit - elapsed))
-            screen.blit(FONT_LG.render(f"Time left: {left}s", True, RED if left <= 5 else BLACK), (800-160, 120))
-            code_box.draw(screen)
-            if left == 0:
-                show_feedback("Time expired!", ["2FA failed. Try again and enter the code promptly."], False)
-                return False
+            SESSION.question_shown()
 
-        if message:
-            screen.blit(FONT.render(message, True, RED), (280, 430))
-
-        pygame.display.flip()
-
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if stage == 1:
-                user_box.handle_event(ev)
-                pass_box.handle_event(ev)
-                if ev.type == pygame.KEYDOWN and ev.key == pygame.K_RETURN:
-                    if user_box.value() and pass_box.value():
-                        stage = 2
-                        message = ""
-                        code = str(random.randint(100000, 999999)).zfill(6)
-                        start_time = time.time()
-                    else:
-                        message = "Please enter both fields."
+    def finish(self):
+        SCENES.pop(self.outcome.passed)
+
+# Level 1 – Phishing (3 sublevels)
+class PhishingScene(LevelScene):
+    number = 1
+    name = "level_1_phishing"
+
+    def layer_key(self):
+        return ("level_1", self.state.step, self.state.phase)
+
+    def draw_email_box(self, surf, box, y0=140):
+        x0 = 40
+        draw_box(surf, (x0, y0, WIDTH-80, 250), LIGHT_GRAY, radius=8)
+        y = y0 + 10
+        y = draw_text_multiline(surf, f"From: {box['from']}", x0+10, y, FONT, BLACK)
+        y = draw_text_multiline(surf, f"To:   {box['to']}", x0+10, y, FONT, BLACK)
+        y = draw_text_multiline(surf, f"Subject: {box['subject']}", x0+10, y, FONT_LG, BLUE)
+        y += 10
+        y = draw_text_multiline(surf, box["body"], x0+10, y, FONT, BLACK)
+
+    def draw_static(self, surf):
+        sc = PHISHING_SCENARIOS[self.state.step]
+        blit(surf, render_text(FONT_XL, f"Level 1 – Phishing: {sc['title']}", True, BLUE), (40, 40))
+        tree = WidgetTree()
+        if self.state.phase == "flags":
+            # Email with red flags first
+            self.draw_email_box(surf, sc["email"])
+            y = 410
+            blit(surf, render_text(FONT, "Select ALL red flags you notice, then press ENTER:", True, BLACK), (40, y))
+            y += 10
+            for i, f in enumerate(sc["email"]["redflags"]):
+                tree.add(OptionRow((60, y + i*40, WIDTH-120, 36), f"{i+1}. {f}", ("toggle", i)))
+        elif self.state.phase == "action":
+            self.draw_email_box(surf, sc["email"])
+            y = 410
+            blit(surf, render_text(FONT, sc["question"], True, BLACK), (40, y))
+            for i, opt in enumerate(sc["options"]):
+                tree.add(OptionRow((60, y + 40 + i*45, WIDTH-120, 36), opt, ("choose", i)))
+        else:
+            if "sms" in sc:
+                sms_box_y = 140
+                draw_box(surf, (40, sms_box_y, WIDTH-80, 120), LIGHT_GRAY, radius=8)
+                draw_text_multiline(surf, "SMS:", 60, sms_box_y+10, FONT_LG, BLUE)
+                draw_text_multiline(surf, sc["sms"], 60, sms_box_y+50, FONT, BLACK)
+                y = 290
             else:
-                res = code_box.handle_event(ev)
-                if res == "enter":
-                    if code_box.value() == code:
-                        show_feedback("2FA Success", ["Logged in with strong protection."], True)
-                        return True
-                    else:
-                        message = "Incorrect code. Try again."
-                        code_box.clear()
-        CLOCK.tick(60)
+                self.draw_email_box(surf, sc["email"])
+                y = 410
+            blit(surf, render_text(FONT, sc["question"], True, BLACK), (40, y))
+            for i, opt in enumerate(sc["options"]):
+                tree.add(OptionRow((60, y + 40 + i*45, WIDTH-120, 36), opt, ("toggle", i)))
+            blit(surf, render_text(FONT_SM, "Press ENTER to submit your selections.", True, BLACK), (40, HEIGHT-50))
+        tree.draw_static(surf)
+        return tree
+
+    def sync(self, tree):
+        tree.select({("toggle", i) for i in self.state.selected})
+
+# Level 2 – Robo-Scamming (detective MCQ)
+class RoboscamScene(LevelScene):
+    number = 2
+    name = "level_2_roboscam"
+    submits = False
+
+    def layer_key(self):
+        return ("level_2", self.state.stage)
+
+    def draw_static(self, surf):
+        # The whole screen is static for a stage.
+        s = self.state.stage
+        title = render_text(FONT_XL, "Level 2 – Robo-Scamming Detective", True, BLUE)
+        blit(surf, title, (40, 40))
+        y = draw_text_multiline(surf, f"Caller: {ROBOSCAM_STAGES[s]['caller']}", 40, 120, FONT_LG, BLACK)
+        y = draw_text_multiline(surf, ROBOSCAM_STAGES[s]["line"], 40, y + 10, FONT, BLACK)
+        draw_text_multiline(surf, "Choose the safest response:", 40, y + 16, FONT, BLACK)
+        oy = y + 52
+        tree = WidgetTree(OptionRow((60, oy + i*48, WIDTH-120, 40), opt, ("choose", i), dy=8)
+                          for i, (opt, _) in enumerate(ROBOSCAM_STAGES[s]["options"]))
+        tree.draw_static(surf)
+        blit(surf, render_text(FONT_SM, "Tip: " + ROBOSCAM_STAGES[s]["hint"], True, (80,80,80)), (60, HEIGHT-50))
+        return tree
+
+# Level 3 – Password Security (create a strong password)
+class PasswordScene(LevelScene):
+    number = 3
+    name = "level_3_passwords"
+    meter = (80, 430, 840, 20)
+
+    def __init__(self):
+        super().__init__()
+        self.analyzer = PasswordAnalyzer(breach_filter())
+        self.estimate = StrengthEstimator()
+
+    def draw_static(self, surf):
+        blit(surf, render_text(FONT_XL, "Level 3 – Create a Strong Password", True, BLUE), (60, 40))
+        y = draw_text_multiline(surf, "Follow these rules:", 60, 110, FONT_LG, BLACK)
+        for r in PASSWORD_RULES:
+            y = draw_text_multiline(surf, "• " + r, 80, y+4, FONT, BLACK)
+        draw_text_multiline(surf, "Press ENTER to evaluate strength.", 80, 520, FONT, BLACK)
+        draw_rect(surf, GRAY, self.meter, border_radius=6)
+        return WidgetTree([InputBox((80, 360, 840, 48), placeholder="Type a strong password and press ENTER",
+                                    maxlen=PASSWORD_MAXLEN, font=FONT_LG, key="password")])
+
+    def sync(self, tree):
+        tree.find("password").text = self.state.text
+
+    def draw(self):
+        super().draw()
+        # live strength meter
+        text = self.state.text
+        x, y_m, w, h = self.meter
+        msgs = self.analyzer.update(text).messages()
+        self.estimate.update(text)
+        score = 0 if self.analyzer.is_breached else self.estimate.score()
+        fill_w = int(((score + 1) / 5.0) * w) if text else 0
+        color = RED if score <= 1 else ORANGE if score == 2 else GREEN
+        draw_rect(screen, color, (x,y_m,fill_w,h), border_radius=6)
+        if text:
+            est = self.estimate
+            summary = f"About 10^{est.log_guesses():.0f} guesses – cracked offline in {est.crack_time()}. {est.warning()}"
+            blit(screen, render_text(FONT_SM, summary, True, BLACK), (x, y_m + h + 8))
+            if msgs:
+                blit(screen, render_text(FONT_SM, "Next: " + msgs[0], True, (80,80,80)), (x, y_m + h + 30))
+
+    def handle(self, ev):
+        input_box = self.tree.find("password")
+        result = input_box.handle_event(ev)
+        if input_box.value() != self.state.text:
+            self.state, _ = self.rules.step(self.state, ("text", "password", input_box.value()))
+        if result == "enter":
+            self.apply(SUBMIT)
+
+# Level 4 – Malware (choose safe downloads)
+class MalwareScene(LevelScene):
+    number = 4
+    name = "level_4_malware"
+
+    def layer_key(self):
+        return ("level_4", self.state.idx)
+
+    def draw_static(self, surf):
+        sc = MALWARE_SCENARIOS[self.state.idx]
+        blit(surf, render_text(FONT_XL, "Level 4 – Malware & Safe Downloads", True, BLUE), (40, 40))
+        y = draw_text_multiline(surf, sc["title"], 40, 110, FONT_LG, BLACK)
+        y = draw_text_multiline(surf, sc["desc"], 40, y+8, FONT, BLACK)
+        base_y = y + 30
+        tree = WidgetTree(OptionRow((60, base_y + i*60, WIDTH-120, 48), name, ("toggle", i), dy=6, note=note)
+                          for i, (name, note, _) in enumerate(sc["links"]))
+        tree.draw_static(surf)
+        hint = "Select ALL safe choices, then press ENTER." if sc.get("multi_ok") else "Select the ONE safest option, then press ENTER."
+        blit(surf, render_text(FONT_SM, hint, True, BLACK), (60, HEIGHT-50))
+        return tree
+
+    def sync(self, tree):
+        tree.select({("toggle", i) for i in self.state.selected})
+
+# Level 5 – Social Engineering / Cyberbullying
+class SocialScene(LevelScene):
+    number = 5
+    name = "level_5_social_engineering"
+    submits = False
+
+    def layer_key(self):
+        return ("level_5", self.state.turn, self.state.replies)
+
+    def draw_static(self, surf):
+        # The chat only grows between replies, so the whole screen is one layer per turn.
+        blit(surf, render_text(FONT_XL, "Level 5 – Social Engineering / Cyberbullying", True, BLUE), (40, 40))
+        y = 120
+        replies = iter(self.state.replies)
+        for speaker, content in SOCIAL_CHAT[:self.state.turn]:
+            if speaker == "Unknown":
+                y = draw_text_multiline(surf, f"{speaker}: {content}", 60, y, FONT, BLACK, max_width=800) + 8
+            else:
+                y = draw_text_multiline(surf, f"You: {next(replies)}", 80, y, FONT, BLUE, max_width=800) + 8
+        blit(surf, render_text(FONT, "Your reply:", True, BLACK), (60, y)); y += 8
+        tree = WidgetTree(OptionRow((80, y+10 + k*48, WIDTH-160, 40), opt, ("choose", k), dy=8)
+                          for k, opt in enumerate(SOCIAL_CHAT[self.state.turn][1]))
+        tree.draw_static(surf)
+        return tree
+
+# Level 6 – Public Wi-Fi
+class WifiScene(LevelScene):
+    number = 6
+    name = "level_6_public_wifi"
+
+    def draw_static(self, surf):
+        blit(surf, render_text(FONT_XL, "Level 6 – Public Wi-Fi Safety", True, BLUE), (40, 40))
+        draw_text_multiline(surf,"You’re on café Wi-Fi. Toggle protections and choose safe actions.",40, 100, FONT, BLACK)
+        y = 270
+        tree = WidgetTree([Toggle(60, 160, 60, 28, "VPN", action=("switch", "vpn")),
+                           Toggle(60, 210, 60, 28, "Force HTTPS", action=("switch", "https"))])
+        for i, (label, _) in enumerate(WIFI_ACTIONS):
+            tree.add(OptionRow((60, y + i*52, WIDTH-120, 44), label, ("toggle", i), dy=10))
+        tree.draw_static(surf)
+        blit(surf, render_text(FONT_SM, "Click actions to select. Press ENTER to submit.", True, BLACK), (60, HEIGHT-50))
+        return tree
+
+    def sync(self, tree):
+        tree.find(("switch", "vpn")).value = self.state.vpn
+        tree.find(("switch", "https")).value = self.state.https
+        tree.select({("toggle", i) for i in self.state.selected})
+
+# Level 7 – Firewall Rules
+class FirewallScene(LevelScene):
+    number = 7
+    name = "level_7_firewall_rules"
+
+    def draw_static(self, surf):
+        blit(surf, render_text(FONT_XL, "Level 7 – Firewall Configuration", True, BLUE), (40, 40))
+        draw_text_multiline(surf, "Set rules to keep users safe while allowing normal web activity.", 40, 100, FONT, BLACK)
+        tree = WidgetTree()
+        y = 150
+        for i, (desc, correct) in enumerate(FIREWALL_TRAFFIC):
+            blit(surf, render_text(FONT, f"{i+1}. {desc}", True, BLACK), (60, y+i*58))
+            for j, c in enumerate(FIREWALL_CHOICES):
+                tree.add(OptionRow((520 + j*160, y-8 + i*58, 140, 40), c, ("set", i, c), dy=8))
+        tree.draw_static(surf)
+        blit(surf, render_text(FONT_SM, "Click to choose for each rule. Press ENTER to evaluate.", True, BLACK), (60, HEIGHT-50))
+        return tree
+
+    def sync(self, tree):
+        tree.select({("set", i, c) for i, c in enumerate(self.state.selection)})
+
+# Level 8 – Data Privacy (permissions)
+class PrivacyScene(LevelScene):
+    number = 8
+    name = "level_8_data_privacy"
+
+    def __init__(self, seen=TRAINEE_HISTORY):
+        self.seen = trainee_seen(PRIVACY_SCENARIOS) if seen is TRAINEE_HISTORY else seen
+        super().__init__()
+
+    def initial(self):
+        return self.rules.initial(random, seen=self.seen)
+
+    def layer_key(self):
+        state = self.state
+        return ("level_8", state.days[state.day], state.day, len(state.days))
+
+    def draw_static(self, surf):
+        sc = self.rules.scenario(self.state)
+        title = render_text(FONT_XL, f"Level 8 – Data Privacy: Day {self.state.day + 1}/{len(self.state.days)}", True, BLUE)
+        blit(surf, title, (40, 40))
+
+        y = draw_text_multiline(surf, f"App: {sc['app']}", 40, 120, FONT_LG)
+        y = draw_text_multiline(surf, sc["desc"], 40, y + 10, FONT)
+        y = draw_text_multiline(surf, sc["question"], 40, y + 20, FONT)
+
+        base_y = y + 40
+        tree = WidgetTree(OptionRow((60, base_y + i * 50, WIDTH - 120, 40), opt, ("toggle", i), dy=8)
+                          for i, opt in enumerate(PRIVACY_OPTIONS))
+        tree.draw_static(surf)
+
+        blit(surf, render_text(FONT_SM, "Select reasonable permissions, then press ENTER.", True, BLACK), (60, HEIGHT - 50))
+        return tree
+
+    def sync(self, tree):
+        tree.select({("toggle", PRIVACY_OPTIONS.index(o)) for o in self.state.selected})
+
+# Level 9 – Two-Factor Authentication (apply it for real)
+class TwoFAScene(LevelScene):
+    number = 9
+    name = "level_9_2fa"
+
+    def __init__(self):
+        super().__init__()
+        self.countdown = None
+
+    def fields(self):
+        return ("username", "password") if self.state.stage == 1 else ("entry",)
+
+    def layer_key(self):
+        return ("level_9", self.state.stage, self.state.code)
+
+    def draw_static(self, surf):
+        blit(surf, render_text(FONT_XL, "Level 9 – Two-Factor Authentication", True, BLUE), (40, 40))
+        if self.state.stage == 1:
+            draw_text_multiline(surf, "Enter username and password, then press ENTER.", 40, 120, FONT, BLACK)
+            return WidgetTree([InputBox((280, 220, 440, 42), placeholder="Username", key="username"),
+                               InputBox((280, 280, 440, 42), placeholder="Password", password=True, key="password")])
+        draw_text_multiline(surf, "A 6-digit code is generated in your authenticator app.", 40, 120, FONT, BLACK)
+        blit(surf, render_text(FONT, f"(Simulated code shown here for demo): {self.state.code}", True, (100,100,100)), (40, 160))
+        return WidgetTree([InputBox((360, 350, 280, 42), placeholder="Enter 2FA code",
+                                    maxlen=TWO_FA_MAXLEN["entry"], font=FONT_LG, key="entry")])
+
+    def sync(self, tree):
+        for field in self.fields():
+            tree.find(field).text = getattr(self.state, field)
+
+    def update(self):
+        if self.countdown is not None and self.countdown.expired():
+            self.apply(TIMEOUT)
+
+    def draw(self):
+        super().draw()
+        if self.state.stage == 2:
+            blit(screen, self.timer.surface(), (800-160, 120))
+        if self.state.message:
+            blit(screen, render_text(FONT, self.state.message, True, RED), (280, 430))
+
+    def handle(self, ev):
+        entered = False
+        for field in self.fields():
+            box = self.tree.find(field)
+            entered = box.handle_event(ev) == "enter" or entered
+            if box.value() != getattr(self.state, field):
+                self.state, _ = self.rules.step(self.state, ("text", field, box.value()))
+        if (self.state.stage == 1 and ev.type == pygame.KEYDOWN and ev.key == pygame.K_RETURN) or (self.state.stage == 2 and entered):
+            self.apply(SUBMIT)
+            if self.state.stage == 2 and self.countdown is None:
+                self.countdown = LEVEL_CLOCK.countdown(TWO_FA_TIME_LIMIT)
+                self.timer = CountdownLabel(self.countdown, FONT_LG, "Time left: {}s", BLACK)
+                SCHEDULER.start_countdown(self.countdown)
+
+    def finish(self):
+        SCHEDULER.stop_countdown()
+        super().finish()
 
 # Level 10 – Ransomware (navigate choices)
-def level_10_ransomware():
-    start = time.time()
-    limit = 45  # seconds
-    selected = set()
-    actions = [
-        ("Disconnect from network immediately", True),
-        ("Pay the ransom to get files back", False),
-        ("Notify IT/security team", True),
-        ("Try random decryptor downloaded from unknown site", False),
-        ("Restore from clean backups", True),
-        ("Ignore it and keep working", False),
-    ]
-    while True:
-        screen.fill(WHITE)
-        screen.blit(FONT_XL.render("Level 10 – Ransomware Incident", True, BLUE), (40, 40))
-
-        elapsed = time.time() - start
-        left = max(0, int(limit - elapsed))
-        pygame.draw.rect(screen, (30,30,30), (60, 110, WIDTH-120, 120), border_radius=8)
-        screen.blit(FONT_LG.render("Your files are encrypted. Send 0.5 BTC to address XYZ in 45 minutes.", True, ORANGE), (80, 140))
-        screen.blit(FONT_LG.render("Timer:", True, ORANGE), (80, 180))
-        screen.blit(FONT_XL.render(f"{left}s", True, RED if left <= 5 else YELLOW), (160, 174))
+class RansomwareScene(LevelScene):
+    number = 10
+    name = "level_10_ransomware"
 
+    def enter(self):
+        self.countdown = LEVEL_CLOCK.countdown(RANSOMWARE_TIME_LIMIT)
+        self.timer = CountdownLabel(self.countdown, FONT_XL, "{}s", YELLOW)
+        SCHEDULER.start_countdown(self.countdown)
+
+    def draw_static(self, surf):
+        blit(surf, render_text(FONT_XL, "Level 10 – Ransomware Incident", True, BLUE), (40, 40))
+        draw_rect(surf, (30,30,30), (60, 110, WIDTH-120, 120), border_radius=8)
+        blit(surf, render_text(FONT_LG, "Your files are encrypted. Send 0.5 BTC to address XYZ in 45 minutes.", True, ORANGE), (80, 140))
+        blit(surf, render_text(FONT_LG, "Timer:", True, ORANGE), (80, 180))
         y = 260
-        btns = []
-        for i, (label, _) in enumerate(actions):
-            rect = pygame.Rect(60, y + i*54, WIDTH-120, 44)
-            color = (160,235,160) if i in selected else GRAY
-            pygame.draw.rect(screen, color, rect, border_radius=6)
-            pygame.draw.rect(screen, BLACK, rect, 2, border_radius=6)
-            screen.blit(FONT.render(label, True, BLACK), (rect.x+10, rect.y+10))
-            btns.append((rect, i))
-        screen.blit(FONT_SM.render("Select ALL correct steps, then press ENTER.", True, BLACK), (60, HEIGHT-50))
-        pygame.display.flip()
-
-        if left == 0:
-            show_feedback("Clock ran out.", ["Don’t panic—contain first, report, and restore from clean backups."], False)
-            return False
+        tree = WidgetTree(OptionRow((60, y + i*54, WIDTH-120, 44), label, ("toggle", i), dy=10)
+                          for i, (label, _) in enumerate(RANSOMWARE_ACTIONS))
+        tree.draw_static(surf)
+        blit(surf, render_text(FONT_SM, "Select ALL correct steps, then press ENTER.", True, BLACK), (60, HEIGHT-50))
+        return tree
+
+    def sync(self, tree):
+        tree.select({("toggle", i) for i in self.state.selected})
+
+    def update(self):
+        if self.countdown.expired():
+            self.apply(TIMEOUT)
+
+    def draw(self):
+        super().draw()
+        blit(screen, self.timer.surface(), (160, 174))
+
+    def finish(self):
+        SCHEDULER.stop_countdown()
+        super().finish()
+
+LEVEL_SCENES = {s.number: s for s in (
+    PhishingScene, RoboscamScene, PasswordScene, MalwareScene, SocialScene,
+    WifiScene, FirewallScene, PrivacyScene, TwoFAScene, RansomwareScene,
+)}
+
+# =========================
+# Terminal frontend
+# =========================
+# --tty plays the same levels in a terminal with curses, for trainees on shared SSH
+# hosts. It reads the same packs and grades through the same LEVEL_RULES, never
+# opens an SDL display, and sleeps in getch() between keys (the timed levels wake
+# when their clock's displayed second changes). Each level is described by a view: the text
+# to show and a list of items, each bound to the engine action Enter/Space applies
+# or to a text field that typed characters edit.
+TtyView = namedtuple("TtyView", "title body items hint")
+TtyItem = namedtuple("TtyItem", "label action field secret", defaults=(False,))
+
+def tty_submit(label="Submit"):
+    return TtyItem(f"[ {label} ]", SUBMIT, None)
+
+def tty_check(marked, label, action):
+    return TtyItem(f"[{'x' if marked else ' '}] {label}", action, None)
+
+def tty_email(box):
+    return [f"From: {box['from']}", f"To:   {box['to']}", f"Subject: {box['subject']}", "", box["body"], ""]
+
+def tty_phishing(rules, state, ctx):
+    sc = PHISHING_SCENARIOS[state.step]
+    title = f"Level 1 – Phishing: {sc['title']}"
+    if state.phase == "flags":
+        items = [tty_check(i in state.selected, f, ("toggle", i)) for i, f in enumerate(sc["email"]["redflags"])]
+        return TtyView(title, tty_email(sc["email"]) + ["Select ALL red flags you notice, then submit:"], items + [tty_submit()], "")
+    body = tty_email(sc["email"]) if state.phase == "action" or "sms" not in sc else ["SMS:", sc["sms"], ""]
+    if state.phase == "action":
+        items = [TtyItem(f"{i+1}) {opt}", ("choose", i), None) for i, opt in enumerate(sc["options"])]
+        return TtyView(title, body + [sc["question"]], items, "")
+    items = [tty_check(i in state.selected, opt, ("toggle", i)) for i, opt in enumerate(sc["options"])]
+    return TtyView(title, body + [sc["question"]], items + [tty_submit()], "Select your answers, then submit.")
+
+def tty_roboscam(rules, state, ctx):
+    stage = ROBOSCAM_STAGES[state.stage]
+    items = [TtyItem(f"{i+1}) {opt}", ("choose", i), None) for i, (opt, _) in enumerate(stage["options"])]
+    body = [f"Caller: {stage['caller']}", stage["line"], "", "Choose the safest response:"]
+    return TtyView("Level 2 – Robo-Scamming Detective", body, items, "Tip: " + stage["hint"])
+
+def tty_passwords(rules, state, ctx):
+    analyzer = ctx.setdefault("analyzer", PasswordAnalyzer(breach_filter()))
+    estimate = ctx.setdefault("estimate", StrengthEstimator())
+    msgs = analyzer.update(state.text).messages()
+    estimate.update(state.text)
+    body = ["Follow these rules:"] + ["• " + r for r in PASSWORD_RULES] + [""]
+    hint = "Type a strong password and press Enter."
+    if state.text:
+        score = 0 if analyzer.is_breached else estimate.score()
+        hint = f"Strength [{'#' * (score + 1):<5}] about 10^{estimate.log_guesses():.0f} guesses, cracked offline in {estimate.crack_time()}. {estimate.warning()}"
+        if msgs:
+            hint += " Next: " + msgs[0]
+    return TtyView("Level 3 – Create a Strong Password", body, [TtyItem("Password: ", None, "password")], hint)
+
+def tty_malware(rules, state, ctx):
+    sc = MALWARE_SCENARIOS[state.idx]
+    items = [tty_check(i in state.selected, f"{name} – {note}", ("toggle", i)) for i, (name, note, _) in enumerate(sc["links"])]
+    hint = "Select ALL safe choices, then submit." if sc.get("multi_ok") else "Select the ONE safest option, then submit."
+    return TtyView("Level 4 – Malware & Safe Downloads", [sc["title"], sc["desc"]], items + [tty_submit()], hint)
+
+def tty_social(rules, state, ctx):
+    body = []
+    replies = iter(state.replies)
+    for speaker, content in SOCIAL_CHAT[:state.turn]:
+        body.append(f"{speaker}: {content}" if speaker == "Unknown" else f"  You: {next(replies)}")
+    items = [TtyItem(f"{k+1}) {opt}", ("choose", k), None) for k, opt in enumerate(SOCIAL_CHAT[state.turn][1])]
+    return TtyView("Level 5 – Social Engineering / Cyberbullying", body + ["", "Your reply:"], items, "")
+
+def tty_wifi(rules, state, ctx):
+    items = [TtyItem(f"VPN: {'ON' if state.vpn else 'OFF'}", ("switch", "vpn"), None),
+             TtyItem(f"Force HTTPS: {'ON' if state.https else 'OFF'}", ("switch", "https"), None)]
+    items += [tty_check(i in state.selected, label, ("toggle", i)) for i, (label, _) in enumerate(WIFI_ACTIONS)]
+    body = ["You’re on café Wi-Fi. Toggle protections and choose safe actions."]
+    return TtyView("Level 6 – Public Wi-Fi Safety", body, items + [tty_submit()], "Select actions, then submit.")
+
+def tty_firewall(rules, state, ctx):
+    items = []
+    for i, (desc, _) in enumerate(FIREWALL_TRAFFIC):
+        current = state.selection[i]
+        following = FIREWALL_CHOICES[(FIREWALL_CHOICES.index(current) + 1) % len(FIREWALL_CHOICES)] if current else FIREWALL_CHOICES[0]
+        items.append(TtyItem(f"{i+1}. {desc}: {current or '—'}", ("set", i, following), None))
+    body = ["Set rules to keep users safe while allowing normal web activity."]
+    return TtyView("Level 7 – Firewall Configuration", body, items + [tty_submit("Evaluate")], "Enter switches Allow/Block for a rule.")
+
+def tty_privacy(rules, state, ctx):
+    sc = rules.scenario(state)
+    items = [tty_check(opt in state.selected, opt, ("toggle", i)) for i, opt in enumerate(PRIVACY_OPTIONS)]
+    body = [f"App: {sc['app']}", sc["desc"], "", sc["question"]]
+    return TtyView(f"Level 8 – Data Privacy: Day {state.day + 1}/{len(state.days)}", body, items + [tty_submit()], "Select reasonable permissions, then submit.")
+
+def tty_2fa(rules, state, ctx):
+    title = "Level 9 – Two-Factor Authentication"
+    if state.stage == 1:
+        items = [TtyItem("Username: ", None, "username"), TtyItem("Password: ", None, "password", True), tty_submit("Log in")]
+        return TtyView(title, ["Enter username and password, then press Enter."], items, state.message)
+    if "countdown" not in ctx:
+        ctx["countdown"] = LEVEL_CLOCK.countdown(TWO_FA_TIME_LIMIT)
+    left = ctx["countdown"].left()
+    body = ["A 6-digit code is generated in your authenticator app.",
+            f"(Simulated code shown here for demo): {state.code}", f"Time left: {left}s"]
+    return TtyView(title, body, [TtyItem("Code: ", None, "entry")], state.message)
+
+def tty_ransomware(rules, state, ctx):
+    if "countdown" not in ctx:
+        ctx["countdown"] = LEVEL_CLOCK.countdown(RANSOMWARE_TIME_LIMIT)
+    left = ctx["countdown"].left()
+    body = ["Your files are encrypted. Send 0.5 BTC to address XYZ in 45 minutes.", f"Timer: {left}s"]
+    items = [tty_check(i in state.selected, label, ("toggle", i)) for i, (label, _) in enumerate(RANSOMWARE_ACTIONS)]
+    return TtyView("Level 10 – Ransomware Incident", body, items + [tty_submit()], "Select ALL correct steps, then submit.")
+
+TTY_VIEWS = {
+    1: tty_phishing, 2: tty_roboscam, 3: tty_passwords, 4: tty_malware, 5: tty_social,
+    6: tty_wifi, 7: tty_firewall, 8: tty_privacy, 9: tty_2fa, 10: tty_ransomware,
+}
+
+def tty_wrap(text, width):
+    lines = []
+    for para in text.split("\n"):
+        words = para.split(" ")
+        line = ""
+        for word in words:
+            if line and len(line) + 1 + len(word) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+    return lines
+
+class TtyQuit(Exception):
+    pass
+
+class TtyFrontend:
+    def __init__(self, stdscr, curses):
+        self.scr = stdscr
+        self.curses = curses
+        curses.curs_set(0)
+        stdscr.keypad(True)
+
+    def draw(self, title, body, items=(), cursor=0, hint="", values=None):
+        curses = self.curses
+        self.scr.erase()
+        height, width = self.scr.getmaxyx()
+        lines = [(title, curses.A_BOLD), ("", 0)]
+        for para in body:
+            lines += [(ln, 0) for ln in (tty_wrap(para, width - 2) or [""])]
+        lines.append(("", 0))
+        items_at = len(lines)
+        for i, item in enumerate(items):
+            label = item.label
+            if item.field:
+                value = values[item.field]
+                label += "*" * len(value) if item.secret else value
+                label += "_" if i == cursor else ""
+            lines.append(("> " + label if i == cursor else "  " + label, curses.A_REVERSE if i == cursor else 0))
+        if hint:
+            lines.append(("", 0))
+            lines += [(ln, curses.A_DIM) for ln in tty_wrap(hint, width - 2)]
+        # Keep the cursor on screen when the view is taller than the terminal.
+        first = 0
+        if len(lines) > height:
+            first = max(0, min(len(lines) - height, items_at + cursor - height // 2))
+        for row, (text, attr) in enumerate(lines[first:first + height]):
+            try:
+                self.scr.addnstr(row, 0, text, width - 1, attr)
+            except curses.error:
+                pass
+        self.scr.refresh()
+
+    def key(self, timeout_ms=-1):
+        self.scr.timeout(timeout_ms)
+        try:
+            ch = self.scr.get_wch()
+        except self.curses.error:
+            return None
+        if ch == "\x1b":
+            raise TtyQuit()
+        return ch
+
+    def message(self, title, lines, footer="Press any key to continue."):
+        self.draw(title, ["• " + ln for ln in lines] + ["", footer])
+        self.key()
+
+    def show_outcome(self, out):
+        for title, lines, success in out.feedback:
+            self.message(("✔ " if success else "✘ ") + title, list(lines))
+        if out.feedback:
+            SESSION.question_shown()
+
+    def play_level(self, number):
+        curses = self.curses
+        rules = SESSION.rules(number)
+        state = rules.initial(random, seen=trainee_seen(PRIVACY_SCENARIOS)) if number == 8 else rules.initial(random)
+        ctx = {}
+        cursor = 0
+        while True:
+            view = TTY_VIEWS[number](rules, state, ctx)
+            cursor = min(cursor, len(view.items) - 1)
+            values = {item.field: getattr(state, "text" if number == 3 else item.field) for item in view.items if item.field}
+            self.draw(view.title, view.body, view.items, cursor, view.hint, values)
+            if "countdown" in ctx and ctx["countdown"].expired():
+                state, out = rules.step(state, TIMEOUT)
+                if out.done:
+                    self.show_outcome(out)
+                    return out.passed
+            ch = self.key(int(ctx["countdown"].until_change() * 1000) + 1 if "countdown" in ctx else -1)
+            if ch is None:
+                continue
+            item = view.items[cursor]
+            action = None
+            if ch in (curses.KEY_UP, curses.KEY_BTAB):
+                cursor = (cursor - 1) % len(view.items)
+            elif ch in (curses.KEY_DOWN, "\t"):
+                cursor = (cursor + 1) % len(view.items)
+            elif item.field and ch in (curses.KEY_BACKSPACE, "\x7f", "\b"):
+                action = ("text", item.field, values[item.field][:-1])
+            elif ch in ("\n", "\r", curses.KEY_ENTER):
+                action = SUBMIT if item.field else item.action
+            elif item.field and isinstance(ch, str) and ch.isprintable():
+                action = ("text", item.field, values[item.field] + ch)
+            elif ch == " ":
+                action = item.action
+            elif isinstance(ch, str) and ch.isdigit() and 0 < int(ch) <= len(view.items) and not view.items[int(ch) - 1].field:
+                cursor = int(ch) - 1
+                action = view.items[cursor].action
+            elif ch == "q":
+                raise TtyQuit()
+            if action:
+                state, out = rules.step(state, action)
+                self.show_outcome(out)
+                if out.done:
+                    return out.passed
+
+    def choose_start(self):
+        items = [TtyItem(f"Play from Level {n}: {LEVEL_RULES[n].name}", n, None) for n in range(1, 11)]
+        cursor = 0
+        while True:
+            self.draw("Cybersecurity Awareness – Enhanced Edition",
+                      ["Choose where to start; the game will auto-progress through all 10 levels."],
+                      items, cursor, "Arrows/Tab move, Enter selects, Esc quits.")
+            ch = self.key()
+            if ch in (self.curses.KEY_UP, self.curses.KEY_BTAB):
+                cursor = (cursor - 1) % len(items)
+            elif ch in (self.curses.KEY_DOWN, "\t"):
+                cursor = (cursor + 1) % len(items)
+            elif ch in ("\n", "\r", self.curses.KEY_ENTER):
+                return items[cursor].action
+            elif ch == "q":
+                raise TtyQuit()
+
+    def run(self, start_level=None):
+        while True:
+            start = start_level or self.choose_start()
+            passed = total = 0
+            SESSION.begin(start)
+            for lvl in range(start, 11):
+                total += 1
+                result = self.play_level(lvl)
+                SESSION.end_level(result)
+                passed += bool(result)
+            title, _, tips = final_summary(passed, total)
+            self.message(title, [f"You completed levels {start}–10.", f"Score: {passed} / {total} levels passed"] + tips,
+                         "Press any key to return to the menu.")
+            start_level = None
+
+def tty_main(start_level=None):
+    try:
+        import curses
+    except ImportError:
+        sys.exit("--tty needs the curses module (on Windows: pip install windows-curses)")
+    try:
+        curses.wrapper(lambda stdscr: TtyFrontend(stdscr, curses).run(start_level))
+    except (TtyQuit, KeyboardInterrupt):
+        pass
+
+# =========================
+# Quiz server
+# =========================
+# --serve runs the levels for many trainees from one asyncio process. Each session
+# is a QuizSession (slots only: the level, its engine state and the tally) and is
+# driven over plain HTTP/1.1 with keep-alive or over a WebSocket; there is no
+# thread or timer per session. Screens are the terminal frontend's views sent as
+# JSON, so a client shows items and posts back the action of the one picked.
+# Timed levels expire lazily: the deadline is checked when the session is next used.
+#
+#   POST /session                {"start_level": n, "trainee": name}  -> reply
+#   GET  /session/<id>                                                -> reply
+#   POST /session/<id>/action    {"action": [...]}                    -> reply
+#   GET  /ws                     WebSocket; messages are {"op": "start", ...}
+#                                and {"op": "action", "action": [...]}
+#
+# A reply is {"session", "level", "feedback", "view"} while levels remain, and
+# {"session", "finished": true, "summary"} after level 10. --load-test plays
+# random sessions against a running server and prints throughput and latency.
+SERVER_ADDR = "127.0.0.1:8765"
+SERVER_IDLE_TIMEOUT = 1800  # seconds before an untouched session is dropped
+SERVER_MAX_BODY = 64 * 1024
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+ACTION_KINDS = {"toggle", "choose", "set", "switch", "text", "submit"}
+
+class BadRequest(Exception):
+    pass
+
+class QuizSession:
+    __slots__ = ("id", "trainee", "start_level", "level", "rules", "state", "ctx", "passed", "total", "touched")
+
+    def __init__(self, sid, start_level, trainee=None, rng=random):
+        self.id = sid
+        self.trainee = trainee
+        self.start_level = start_level
+        self.passed = self.total = 0
+        self.begin_level(start_level, rng)
+
+    def begin_level(self, number, rng=random):
+        self.level = number
+        self.ctx = {}
+        if number > 10:
+            self.rules = self.state = None
+            return
+        self.rules = LEVEL_RULES[number]
+        if number == 8:
+            seen = trainee_seen(PRIVACY_SCENARIOS, self.trainee) if self.trainee else None
+            self.state = self.rules.initial(rng, seen=seen)
+        else:
+            self.state = self.rules.initial(rng)
+
+    def expired(self):
+        countdown = self.ctx.get("countdown")
+        return countdown is not None and countdown.expired()
+
+    def legal(self, action):
+        # The canonical form of a client action if the level offers it now (the same
+        # set the bots play from), else None. Text actions match on the field and
+        # carry whatever string was typed.
+        offered = self.rules.actions(self.state)
+        if len(action) == 3 and action[0] == "text" and isinstance(action[2], str):
+            return action if any(a[0] == "text" and a[1] == action[1] for a in offered) else None
+        return next((a for a in offered if a == action), None)
+
+    def apply(self, action):
+        fbs = []
+        if self.rules is None:
+            raise BadRequest("session finished")
+        if self.expired():
+            action = TIMEOUT
+        elif action != TIMEOUT:
+            legal = self.legal(action)
+            if legal is None:
+                raise BadRequest(f"action not available on level {self.level}: {list(action)}")
+            action = legal
+        try:
+            self.state, out = self.rules.step(self.state, action)
+        except (IndexError, KeyError, TypeError, ValueError, AttributeError):
+            raise BadRequest(f"bad action for level {self.level}: {list(action)}")
+        fbs += out.feedback
+        if out.done:
+            self.total += 1
+            self.passed += bool(out.passed)
+            self.begin_level(self.level + 1)
+        return fbs
+
+    def reply(self, fbs=()):
+        msg = {"session": self.id, "feedback": [{"title": t, "lines": list(ln), "success": ok} for t, ln, ok in fbs]}
+        if self.rules is None:
+            title, _, tips = final_summary(self.passed, self.total)
+            msg.update(finished=True, summary={"title": title, "passed": self.passed, "total": self.total, "tips": tips})
+            return msg
+        if self.expired():
+            # The clock ran out while the trainee was away; grade it now.
+            return self.reply(list(fbs) + self.apply(TIMEOUT))
+        view = TTY_VIEWS[self.level](self.rules, self.state, self.ctx)
+        values = {it.field: getattr(self.state, "text" if self.level == 3 else it.field) for it in view.items if it.field}
+        items = [{"label": it.label, "action": it.action, "field": it.field, "value": ("*" * len(values[it.field]) if it.secret else values[it.field]) if it.field else None}
+                 for it in view.items]
+        msg.update(level=self.level, view={"title": view.title, "body": view.body, "items": items, "hint": view.hint})
+        return msg
+
+class QuizServer:
+    def __init__(self, idle_timeout=SERVER_IDLE_TIMEOUT):
+        self.sessions = {}
+        self.idle_timeout = idle_timeout
+        self.requests = 0
+        self.connections = 0
+
+    def create(self, body):
+        start = body.get("start_level", 1)
+        # JSON true/false arrive as bool, which is an int subclass.
+        if not isinstance(start, int) or isinstance(start, bool) or not 1 <= start <= 10:
+            raise BadRequest("start_level must be 1-10")
+        trainee = body.get("trainee")
+        sid = base64.urlsafe_b64encode(os.urandom(12)).decode("ascii")
+        session = self.sessions[sid] = QuizSession(sid, start, re.sub(r"[^\w.-]", "_", trainee) if trainee else None)
+        session.touched = time.monotonic()
+        return session
+
+    def get(self, sid):
+        session = self.sessions.get(sid)
+        if session is None:
+            raise KeyError(sid)
+        session.touched = time.monotonic()
+        return session
+
+    def act(self, session, body):
+        action = body.get("action")
+        if not isinstance(action, list) or not action or action[0] not in ACTION_KINDS:
+            raise BadRequest("action must be a list starting with one of " + ", ".join(sorted(ACTION_KINDS)))
+        fbs = session.apply(tuple(action))
+        reply = session.reply(fbs)
+        if reply.get("finished"):
+            del self.sessions[session.id]
+        return reply
 
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            elif ev.type == pygame.MOUSEBUTTONDOWN:
-                for rect, i in btns:
-                    if rect.collidepoint(ev.pos):
-                        if i in selected: selected.remove(i)
-                        else: selected.add(i)
-            elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_RETURN:
-                correct_set = {0,2,4}
-                if selected == correct_set:
-                    show_feedback("Exactly right.", ["Don’t pay—contain, report, and restore from backups."], True)
-                    return True
+    def handle(self, method, path, body):
+        # Returns (status, reply) for one API call.
+        self.requests += 1
+        parts = path.strip("/").split("/")
+        try:
+            if method == "POST" and parts == ["session"]:
+                return 200, self.create(body).reply()
+            if parts[0] == "session" and len(parts) in (2, 3):
+                session = self.get(parts[1])
+                if method == "GET" and len(parts) == 2:
+                    return 200, session.reply()
+                if method == "POST" and parts[2:] == ["action"]:
+                    return 200, self.act(session, body)
+            return 404, {"error": "not found"}
+        except KeyError:
+            return 404, {"error": "unknown session"}
+        except BadRequest as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            # A bug in one level must not take the connection (or the session) down.
+            print(f"Internal error on {method} {path}: {e!r}", file=sys.stderr)
+            return 500, {"error": "internal error"}
+
+    async def sweep(self):
+        import asyncio
+        while True:
+            await asyncio.sleep(60)
+            cutoff = time.monotonic() - self.idle_timeout
+            for sid in [sid for sid, s in self.sessions.items() if s.touched < cutoff]:
+                del self.sessions[sid]
+
+    async def serve_client(self, reader, writer):
+        import asyncio
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, path, _ = lines[0].split(" ", 2)
+                except ValueError:
+                    return
+                headers = {k.strip().lower(): v.strip() for k, _, v in (ln.partition(":") for ln in lines[1:] if ln)}
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self.serve_websocket(reader, writer, headers)
+                    return
+                raw_length = headers.get("content-length") or "0"
+                length = int(raw_length) if raw_length.isascii() and raw_length.isdigit() else -1
+                keep = headers.get("connection", "").lower() != "close"
+                if length < 0:
+                    # The body cannot be skipped without a length, so the connection ends here.
+                    status, reply, keep = 400, {"error": "bad Content-Length"}, False
+                elif length > SERVER_MAX_BODY:
+                    status, reply, keep = 413, {"error": "body too large"}, False
                 else:
-                    show_feedback("Some choices were unsafe.", ["Avoid paying, avoid random tools. Contain, report, restore."], False)
-                    return False
-        CLOCK.tick(60)
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        body = json.loads(body) if body else {}
+                        status, reply = self.handle(method, path, body if isinstance(body, dict) else {})
+                    except ValueError:
+                        status, reply = 400, {"error": "body is not JSON"}
+                data = json.dumps(reply, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n"
+                             % (status, HTTP_REASONS[status], len(data), b"keep-alive" if keep else b"close") + data)
+                await writer.drain()
+                if not keep:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve_websocket(self, reader, writer, headers):
+        accept = base64.b64encode(hashlib.sha1(headers.get("sec-websocket-key", "").encode("latin-1") + WS_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        session = None
+        try:
+            while True:
+                opcode, payload = await ws_read(reader)
+                if opcode == 0x8:
+                    ws_write(writer, b"", 0x8)
+                    break
+                if opcode == 0x9:
+                    ws_write(writer, payload, 0xA)
+                    continue
+                if opcode != 0x1:
+                    continue
+                self.requests += 1
+                try:
+                    msg = json.loads(payload)
+                    if msg.get("op") == "start":
+                        if session is not None:
+                            self.sessions.pop(session.id, None)
+                        session = self.create(msg)
+                        reply = session.reply()
+                    elif msg.get("op") == "action" and session is not None:
+                        session.touched = time.monotonic()
+                        reply = self.act(session, msg)
+                        if reply.get("finished"):
+                            session = None
+                    else:
+                        reply = {"error": "expected a start op, then action ops"}
+                except (ValueError, AttributeError):
+                    reply = {"error": "message is not a JSON object"}
+                except BadRequest as e:
+                    reply = {"error": str(e)}
+                except Exception as e:
+                    print(f"Internal error on WebSocket message: {e!r}", file=sys.stderr)
+                    reply = {"error": "internal error"}
+                ws_write(writer, json.dumps(reply, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                await writer.drain()
+        finally:
+            if session is not None:
+                self.sessions.pop(session.id, None)
+
+HTTP_REASONS = {200: b"OK", 400: b"Bad Request", 404: b"Not Found", 413: b"Payload Too Large", 500: b"Internal Server Error"}
+
+async def ws_read(reader):
+    # One (unfragmented) frame; client frames are masked, server frames are not.
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if n > SERVER_MAX_BODY:
+        raise ConnectionError("frame too large")
+    mask = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(n)
+    if mask:
+        payload = bytes(b ^ mask[i & 3] for i, b in enumerate(payload))
+    return b0 & 0x0F, payload
+
+def ws_write(writer, payload, opcode=0x1, mask=False):
+    head = bytearray([0x80 | opcode])
+    bit = 0x80 if mask else 0
+    n = len(payload)
+    if n < 126:
+        head.append(bit | n)
+    elif n < 1 << 16:
+        head.append(bit | 126)
+        head += struct.pack("!H", n)
+    else:
+        head.append(bit | 127)
+        head += struct.pack("!Q", n)
+    if mask:
+        key = os.urandom(4)
+        head += key
+        payload = bytes(b ^ key[i & 3] for i, b in enumerate(payload))
+    writer.write(bytes(head) + payload)
+
+def parse_addr(addr):
+    host, _, port = addr.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+async def run_server(addr=SERVER_ADDR):
+    import asyncio
+    quiz = QuizServer()
+    host, port = parse_addr(addr)
+    server = await asyncio.start_server(quiz.serve_client, host, port, backlog=1024)
+    sweeper = asyncio.ensure_future(quiz.sweep())
+    print(f"Serving quiz sessions on http://{host}:{port}/ (Ctrl+C to stop)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        sweeper.cancel()
+
+def serve_main(addr=SERVER_ADDR):
+    import asyncio
+    try:
+        asyncio.run(run_server(addr))
+    except KeyboardInterrupt:
+        pass
+
+# Load generator: each virtual trainee opens its own connection, starts a session
+# and sends random item actions (typing a letter into fields) until the session
+# finishes or it has sent its share of requests.
+class LoadClient:
+    def __init__(self, addr, websocket=False):
+        self.host, self.port = parse_addr(addr)
+        self.websocket = websocket
+
+    async def connect(self):
+        import asyncio
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        if self.websocket:
+            key = base64.b64encode(os.urandom(16))
+            self.writer.write(b"GET /ws HTTP/1.1\r\nHost: %s\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                              b"Sec-WebSocket-Key: %s\r\nSec-WebSocket-Version: 13\r\n\r\n" % (self.host.encode(), key))
+            await self.reader.readuntil(b"\r\n\r\n")
+
+    async def call(self, method, path, body):
+        if self.websocket:
+            ws_write(self.writer, json.dumps(body).encode("utf-8"), mask=True)
+            _, payload = await ws_read(self.reader)
+            return json.loads(payload)
+        data = json.dumps(body).encode("utf-8")
+        self.writer.write(b"%s %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                          % (method.encode(), path.encode(), self.host.encode(), len(data)) + data)
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        length = int(re.search(rb"(?i)content-length:\s*(\d+)", head).group(1))
+        return json.loads(await self.reader.readexactly(length))
+
+    async def trainee(self, rng, requests, latencies):
+        await self.connect()
+        try:
+            t0 = time.perf_counter()
+            reply = await self.call("POST", "/session", {"op": "start", "start_level": rng.randint(1, 10)})
+            latencies.append(time.perf_counter() - t0)
+            for _ in range(requests - 1):
+                if "error" in reply or reply.get("finished"):
+                    break
+                item = rng.choice(reply["view"]["items"])
+                action = item["action"] or ["text", item["field"], (item["value"] or "") + rng.choice("aZ3!")]
+                t0 = time.perf_counter()
+                reply = await self.call("POST", f"/session/{reply['session']}/action", {"op": "action", "action": action})
+                latencies.append(time.perf_counter() - t0)
+        finally:
+            self.writer.close()
+
+async def run_load(addr, sessions, requests, concurrency, websocket, seed):
+    import asyncio
+    rng = random.Random(seed)
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with gate:
+            try:
+                await LoadClient(addr, websocket).trainee(random.Random(rng.getrandbits(32)), requests, latencies)
+            except (OSError, asyncio.IncompleteReadError, ValueError, AttributeError):
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(sessions)))
+    elapsed = time.perf_counter() - t0
+    ms = [t * 1000 for t in latencies]
+    return {
+        "transport": "websocket" if websocket else "http",
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "requests": len(ms),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(ms) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {f"p{p}": round(percentile(ms, p), 3) for p in (50, 95, 99)},
+    }
+
+def load_test_main(addr, sessions, requests=20, concurrency=1000, websocket=False, seed=None):
+    import asyncio
+    print(json.dumps(asyncio.run(run_load(addr, sessions, requests, concurrency, websocket, seed)), indent=2))
+
+# =========================
+# Frame-time benchmarks
+# =========================
+# Drives every screen with synthetic input (run under the SDL dummy driver via
+# --benchmark) and records per-frame cost. Results are compared against a JSON
+# baseline; a screen whose p50 frame time or Font.render calls per frame regress
+# past the threshold fails the run. Each screen is measured BENCH_REPEATS times and
+# the median of the runs is kept. Tail percentiles of sub-millisecond frames are
+# mostly scheduler noise, so p95/p99 are reported but not gated, and a slowdown
+# must also exceed BENCH_MIN_DELTA_MS.
+BENCH_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frame_baseline.json")
+BENCH_BASELINE_TEXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frame_baseline.texture.json")
+BENCH_MIN_DELTA_MS = 2.0
+BENCH_REPEATS = 5
+BENCH_FRAMES = 600
+
+def motion(x, y):
+    return pygame.event.Event(pygame.MOUSEMOTION, pos=(x, y), rel=(0, 0), buttons=(0, 0, 0))
+
+def click(x, y):
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(x, y), button=1)
+
+def keypress(key, unicode=""):
+    return pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode, mod=0)
+
+def hover_script(frames):
+    return [[motion(60 + (i * 37) % 880, 120 + (i * 53) % 560)] for i in range(frames)]
+
+def click_script(frames, *points):
+    # Alternates hovering with clicks on points that only flip a highlight.
+    return [[click(*points[i // 2 % len(points)])] if i % 2 else [motion(500, 650)] for i in range(frames)]
+
+def typing_script(frames, focus):
+    script = [[click(*focus)]]
+    for i in range(frames - 1):
+        if i % 20 < 14:
+            script.append([keypress(pygame.K_a, "abcdefgh12!A"[i % 12])])
+        else:
+            script.append([keypress(pygame.K_BACKSPACE)])
+    return script
+
+def feedback_screen():
+    # Dismissing it shows the same screen again.
+    return FeedbackScene(repeat(("Not quite.", ("Never click suspicious links or reply. Verify independently.",
+                                                          "Grant only permissions essential for the app to work."), False)))
+
+BENCH_SCREENS = [
+    ("main_menu", MenuScene, hover_script),
+    ("level_1_phishing", PhishingScene, lambda n: click_script(n, (100, 430), (100, 470))),
+    ("level_2_roboscam", RoboscamScene, hover_script),
+    ("level_3_passwords", PasswordScene, lambda n: typing_script(n, (100, 380))),
+    ("level_4_malware", MalwareScene, hover_script),
+    ("level_5_social_engineering", SocialScene, hover_script),
+    ("level_6_public_wifi", WifiScene, lambda n: click_script(n, (70, 170), (100, 340))),
+    ("level_7_firewall_rules", FirewallScene, lambda n: click_script(n, (530, 150), (690, 150))),
+    ("level_8_data_privacy", lambda: PrivacyScene(seen=None), hover_script),
+    ("level_9_2fa", TwoFAScene, lambda n: typing_script(n, (300, 240))),
+    ("level_10_ransomware", RansomwareScene, lambda n: click_script(n, (100, 280), (100, 330))),
+    ("show_feedback", feedback_screen, lambda n: [[keypress(pygame.K_SPACE, " ")] for _ in range(n)]),
+]
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+class FrameRecorder:
+    def __init__(self, track_alloc=False):
+        self.track_alloc = track_alloc
+        self.frame_ms = []
+        self.renders = []
+        self.alloc_kb = []
+
+    def begin_frame(self):
+        self.t0 = time.perf_counter()
+        self.misses0 = TEXT_CACHE.misses
+        if self.track_alloc:
+            tracemalloc.reset_peak()
+            self.mem0 = tracemalloc.get_traced_memory()[0]
+
+    def end_frame(self):
+        self.frame_ms.append((time.perf_counter() - self.t0) * 1000.0)
+        self.renders.append(TEXT_CACHE.misses - self.misses0)
+        if self.track_alloc:
+            self.alloc_kb.append((tracemalloc.get_traced_memory()[1] - self.mem0) / 1024.0)
+
+def record_screen(name, make_scene, script, track_alloc=False):
+    recorder = FrameRecorder(track_alloc)
+    RENDERER.observers.append(recorder)
+    SCHEDULER.script = iter(script)
+    random.seed(0)
+    try:
+        SCENES.run(make_scene())
+    except ScriptFinished:
+        pass
+    finally:
+        SCHEDULER.script = None
+        SCHEDULER.stop_countdown()
+        RENDERER.observers.remove(recorder)
+    return recorder
+
+def run_benchmarks(frames=BENCH_FRAMES, warmup=10, alloc_frames=60, repeats=BENCH_REPEATS):
+    fps, SCHEDULER.fps = SCHEDULER.fps, 0
+    results = {}
+    try:
+        for name, make_scene, make_script in BENCH_SCREENS:
+            runs = []
+            renders = []
+            for _ in range(repeats):
+                rec = record_screen(name, make_scene, make_script(frames + warmup))
+                runs.append(rec.frame_ms[warmup:])
+                renders += rec.renders[warmup:]
+            tracemalloc.start()
+            try:
+                alloc = record_screen(name, make_scene, make_script(alloc_frames + warmup), track_alloc=True).alloc_kb[warmup:]
+            finally:
+                tracemalloc.stop()
+            results[name] = {
+                "frames": frames,
+                "repeats": repeats,
+                "p50_ms": round(percentile([percentile(t, 50) for t in runs], 50), 4),
+                "p95_ms": round(percentile([percentile(t, 95) for t in runs], 50), 4),
+                "p99_ms": round(percentile([percentile(t, 99) for t in runs], 50), 4),
+                "renders_per_frame": round(sum(renders) / len(renders), 3) if renders else 0.0,
+                "alloc_kb_per_frame": round(percentile(alloc, 50), 2),
+            }
+    finally:
+        SCHEDULER.fps = fps
+    return results
+
+def compare_to_baseline(results, baseline, threshold=1.5, min_delta_ms=BENCH_MIN_DELTA_MS):
+    failures = []
+    for name, base in baseline.items():
+        cur = results.get(name)
+        if cur is None:
+            continue
+        if cur["p50_ms"] > base["p50_ms"] * threshold and cur["p50_ms"] - base["p50_ms"] > min_delta_ms:
+            failures.append(f"{name}: p50 {cur['p50_ms']:.3f} ms > {threshold}x baseline {base['p50_ms']:.3f} ms (+{cur['p50_ms'] - base['p50_ms']:.3f} ms)")
+        if cur["renders_per_frame"] > base["renders_per_frame"] + 0.5:
+            failures.append(f"{name}: {cur['renders_per_frame']} Font.render calls/frame, baseline {base['renders_per_frame']}")
+    return failures
+
+def benchmark_main(baseline_path, update=False, threshold=1.5, frames=BENCH_FRAMES, repeats=BENCH_REPEATS):
+    results = run_benchmarks(frames, repeats=repeats)
+    print("backend: " + ("texture" if RENDERER.backend is not None else "surface"))
+    print(f"{'screen':30} {'p50':>8} {'p95':>8} {'p99':>8} {'renders':>8} {'alloc KB':>9}")
+    for name, r in results.items():
+        print(f"{name:30} {r['p50_ms']:8.3f} {r['p95_ms']:8.3f} {r['p99_ms']:8.3f} {r['renders_per_frame']:8.2f} {r['alloc_kb_per_frame']:9.1f}")
+    if update or not os.path.exists(baseline_path):
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {baseline_path}")
+        return 0
+    with open(baseline_path, encoding="utf-8") as f:
+        failures = compare_to_baseline(results, json.load(f), threshold)
+    for msg in failures:
+        print("REGRESSION " + msg)
+    return 1 if failures else 0
 
 # =========================
 # Run
 # =========================
-if __name__ == "__main__":
+def parse_size(text):
+    try:
+        w, h = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    return w, h
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cybersecurity Awareness game")
+    parser.add_argument("--simulate", type=int, metavar="N", help="play N level sequences headlessly with a bot and print stats")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="perfect", help="bot policy for --simulate")
+    parser.add_argument("--seed", type=int, help="RNG seed for --simulate")
+    parser.add_argument("--start-level", type=int, choices=range(1, 11), metavar="LEVEL", help="first level for --simulate (default 1) or --tty (default: ask)")
+    parser.add_argument("--benchmark", action="store_true", help="measure per-screen frame cost against a baseline")
+    parser.add_argument("--baseline", help="baseline JSON for --benchmark (default frame_baseline[.texture].json)")
+    parser.add_argument("--update-baseline", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--threshold", type=float, default=1.5, help="allowed p50 slowdown factor for --benchmark")
+    parser.add_argument("--frames", type=int, default=BENCH_FRAMES, help="frames measured per screen and run for --benchmark")
+    parser.add_argument("--repeats", type=int, default=BENCH_REPEATS, help="runs per screen for --benchmark; the median run is kept")
+    parser.add_argument("--backend", choices=("surface", "texture"), help="draw with window-surface blits or an SDL2 texture renderer (default CYBERQUIZ_BACKEND or surface)")
+    parser.add_argument("--fullscreen", action="store_true", default=None, help="fill the display (scaled, letterboxed)")
+    parser.add_argument("--window-size", type=parse_size, metavar="WxH", help="initial window size; the game is scaled to fit")
+    parser.add_argument("--trace", metavar="PATH", help="write a Chrome trace-event JSON on exit")
+    parser.add_argument("--startup-report", action="store_true", help="print where launch time went after the first frame")
+    parser.add_argument("--build-packs", metavar="DIR", help="write the built-in content as scenario packs into DIR")
+    parser.add_argument("--tty", action="store_true", help="play in the terminal (curses) instead of a window")
+    parser.add_argument("--serve", nargs="?", const=SERVER_ADDR, metavar="[HOST:]PORT", help=f"run the multi-trainee quiz server (default {SERVER_ADDR})")
+    parser.add_argument("--load-test", type=int, metavar="SESSIONS", help="play SESSIONS random sessions against a running --serve")
+    parser.add_argument("--server", default=SERVER_ADDR, metavar="[HOST:]PORT", help="server address for --load-test")
+    parser.add_argument("--requests", type=int, default=20, help="requests per session for --load-test")
+    parser.add_argument("--concurrency", type=int, default=1000, help="sessions open at once for --load-test")
+    parser.add_argument("--websocket", action="store_true", help="drive --load-test over WebSockets instead of HTTP")
+    parser.add_argument("--grade", metavar="SHEETS", help="grade an answer-sheet CSV/Parquet export and print per-question stats")
+    parser.add_argument("--grade-out", metavar="CSV", help="write per-sheet results of --grade to CSV")
+    parser.add_argument("--report", metavar="DIR", help="write attempt analytics (CSV and HTML) from the results store into DIR")
+    parser.add_argument("--results", default=RESULTS_PATH, help="results database for --report")
+    parser.add_argument("--full-report", action="store_true", help="read every attempt for --report, ignoring the column snapshot")
+    parser.add_argument("--replay", metavar="PATH", help="replay a recorded session headlessly and check its results")
+    parser.add_argument("--build-breach-filter", nargs=2, metavar=("LIST", "OUT"), help="compile a breached-password list (one per line) into a Bloom filter")
+    args = parser.parse_args(argv)
+    if args.trace:
+        PROFILER.enable_trace(args.trace)
+    if args.startup_report:
+        STARTUP.enabled = True
+    if args.build_packs:
+        build_packs(args.build_packs)
+        return
+    if args.build_breach_filter:
+        build_breach_filter(*args.build_breach_filter)
+        return
+    if args.benchmark:
+        # Headless: frames go to SDL's dummy driver, no window is shown.
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        init_display(args.backend, args.fullscreen, args.window_size)
+        baseline = args.baseline or (BENCH_BASELINE if RENDERER.backend is None else BENCH_BASELINE_TEXTURE)
+        sys.exit(benchmark_main(baseline, args.update_baseline, args.threshold, args.frames, args.repeats))
+    if args.report:
+        report_main(args.report, args.results, not args.full_report)
+        return
+    if args.grade:
+        grade_main(args.grade, args.grade_out)
+        return
+    if args.replay:
+        report = replay_session(args.replay)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if all(r["match"] for r in report["levels"]) else 1)
+    if args.load_test:
+        load_test_main(args.server, args.load_test, args.requests, args.concurrency, args.websocket, args.seed)
+        return
+    if args.simulate:
+        stats = BotRunner(POLICIES[args.policy], seed=args.seed).run(args.simulate, args.start_level or 1)
+        print(json.dumps(stats, indent=2))
+        return
+    # Everything below is played by people, so timed levels need the real clock.
+    real_level_clock()
+    if args.tty:
+        tty_main(args.start_level)
+        return
+    if args.serve:
+        serve_main(args.serve)
+        return
+    init_display(args.backend, args.fullscreen, args.window_size)
     main_menu()
+
+if __name__ == "__main__":
+    main()
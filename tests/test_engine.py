@@ -0,0 +1,156 @@
+# Regression tests for the headless level engine: grading of every level, the
+# timed levels on the virtual clock, and session record/replay.
+#
+#   python -m pytest -q tests
+
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+
+import pytest
+
+# Set before import: the module-level singletons read these once.
+HOME = tempfile.mkdtemp(prefix="cyberquiz-test-")
+os.environ.update({
+    "HOME": HOME,
+    "SDL_VIDEODRIVER": "dummy",
+    "CYBERQUIZ_RECORD": "0",
+    "CYBERQUIZ_STORE_RESULTS": "0",
+    "CYBERQUIZ_VIRTUAL_CLOCK": "1",
+    "CYBERQUIZ_TRAINEE": "tester",
+})
+
+GAME_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "# cybersecurity_game_full.py")
+spec = importlib.util.spec_from_file_location("cyberquiz_game", GAME_PATH)
+game = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = game
+spec.loader.exec_module(game)
+
+LEVELS = range(1, 11)
+
+
+def wrong_scripts():
+    # A first answer per level that the level must grade as wrong.
+    bad_call = next(i for i, (_, good) in enumerate(game.ROBOSCAM_STAGES[0]["options"]) if not good)
+    return {
+        1: [game.SUBMIT],
+        2: [("choose", bad_call)],
+        3: [("text", "password", "abc"), game.SUBMIT],
+        4: [game.SUBMIT],
+        5: [("choose", 1)],
+        6: [game.SUBMIT],
+        7: [game.SUBMIT],
+        8: game.toggle_actions(len(game.PRIVACY_OPTIONS)) + [game.SUBMIT],
+        10: [game.SUBMIT],
+    }
+
+
+def play(rules, state, policy, rng, max_steps=500):
+    feedback = []
+    for _ in range(max_steps):
+        state, out = rules.step(state, policy(rules, state, rng))
+        feedback.extend(out.feedback)
+        if out.done:
+            return state, out.passed, feedback
+    raise AssertionError(f"level {rules.number} did not finish in {max_steps} steps")
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("level", LEVELS)
+def test_perfect_policy_passes(level, seed):
+    result = game.BotRunner(game.perfect_policy, seed=seed).play_level(level)
+    assert result.passed
+    assert all(ok for _, _, ok in result.feedback)
+
+
+@pytest.mark.parametrize("level", sorted(wrong_scripts()))
+def test_wrong_answer_is_graded_wrong(level):
+    policy = game.ScriptedPolicy(wrong_scripts(), fallback=game.perfect_policy)
+    result = game.BotRunner(policy, seed=3).play_level(level)
+    title, _, ok = result.feedback[0]
+    assert not ok, title
+
+
+def test_wrong_2fa_code_is_rejected():
+    rules = game.LEVEL_RULES[9]
+    state = rules.initial(random.Random(4))
+    for action in [game.SUBMIT, ("text", "username", "trainee"), ("text", "password", "pw"), game.SUBMIT]:
+        state, out = rules.step(state, action)
+        assert not out.done
+    assert state.stage == 2
+    state, out = rules.step(state, ("text", "entry", "000000"))
+    state, out = rules.step(state, game.SUBMIT)
+    assert not out.done
+    assert state.message == "Incorrect code. Try again."
+    state, passed, _ = play(rules, state, game.perfect_policy, random.Random(4))
+    assert passed
+
+
+def expire(limit):
+    assert game.LEVEL_CLOCK.virtual
+    countdown = game.LEVEL_CLOCK.countdown(limit)
+    game.LEVEL_CLOCK.advance(limit - 0.5)
+    assert not countdown.expired()
+    assert countdown.left() == 1
+    game.LEVEL_CLOCK.advance(0.5)
+    assert countdown.expired()
+    assert countdown.left() == 0
+
+
+def test_2fa_times_out_on_virtual_clock():
+    rules = game.LEVEL_RULES[9]
+    state = rules.initial(random.Random(5))
+    for action in rules.solution(state):
+        state, _ = rules.step(state, action)
+    assert state.stage == 2
+    expire(game.TWO_FA_TIME_LIMIT)
+    _, out = rules.step(state, game.TIMEOUT)
+    assert out.done and not out.passed
+    assert out.feedback[0][0] == "Time expired!"
+
+
+def test_ransomware_times_out_on_virtual_clock():
+    rules = game.LEVEL_RULES[10]
+    state = rules.initial(random.Random(6))
+    expire(game.RANSOMWARE_TIME_LIMIT)
+    _, out = rules.step(state, game.TIMEOUT)
+    assert out.done and not out.passed
+    assert out.feedback[0][0] == "Clock ran out."
+
+
+def test_server_session_expires_on_virtual_clock():
+    sess = game.QuizSession("t", 10)
+    sess.reply()
+    assert not sess.expired()
+    game.LEVEL_CLOCK.advance(game.RANSOMWARE_TIME_LIMIT)
+    assert sess.expired()
+    msg = sess.reply()
+    assert msg["finished"] and msg["summary"]["passed"] == 0
+    assert [fb["title"] for fb in msg["feedback"]] == ["Clock ran out."]
+
+
+@pytest.mark.parametrize("record_secrets", [False, True])
+def test_session_round_trip(tmp_path, record_secrets):
+    recorder = game.SessionRecorder(str(tmp_path), enabled=True, record_secrets=record_secrets)
+    policy = game.ScriptedPolicy(wrong_scripts(), fallback=game.perfect_policy)
+    rng = random.Random(7)
+    recorder.begin(1)
+    played = {}
+    for level in LEVELS:
+        rules = recorder.rules(level)
+        state = rules.initial(rng)
+        _, played[level], _ = play(rules, state, policy, rng)
+        recorder.end_level(played[level])
+    recorder.flush()
+
+    with open(recorder.path, "rb") as f:
+        assert (b"abc" in f.read()) == record_secrets
+
+    report = game.replay_session(recorder.path)
+    assert [r["level"] for r in report["levels"]] == list(LEVELS)
+    for r in report["levels"]:
+        assert r["match"], r
+        assert r["recorded"] == played[r["level"]]
+    assert not all(played.values())